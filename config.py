@@ -131,7 +131,9 @@ class Config:
         'HUMIDITY_MIN_RANGE': float(os.getenv('HUMIDITY_MIN_RANGE', 0.0)),
         'HUMIDITY_MAX_RANGE': float(os.getenv('HUMIDITY_MAX_RANGE', 100.0)),
         # 最小预测数据天数
-        'MIN_FORECAST_DATA_DAYS': int(os.getenv('MIN_FORECAST_DATA_DAYS', 3))
+        'MIN_FORECAST_DATA_DAYS': int(os.getenv('MIN_FORECAST_DATA_DAYS', 3)),
+        # 批量决策时传感器数据的并发获取数
+        'BATCH_MAX_WORKERS': int(os.getenv('BATCH_MAX_WORKERS', 8))
     }
     
     # 多田块-设备配置（支持多个田块和设备的管理）
@@ -155,6 +157,9 @@ class Config:
             'crop_type': '小麦（百农1316）',
             'area': 12,  # 面积（亩）
             'description': '大户试验地（对照）',
+            # 田块坐标（可选，未设置时使用 WEATHER_CONFIG 中的经纬度；启用 multi_location_enabled 后按天气网格分别模拟）
+            # 'latitude': 35.0,
+            # 'longitude': 113.0,
             # 是否使用手动配置的土壤参数（True=手动配置，False或不设置=统计方法）
             'use_manual_soil_params': True,  # 设置为 True 时使用下面的 soil_params，False 时使用统计方法
             # 手动配置的土壤参数（仅在 use_manual_soil_params=True 时生效）
@@ -309,6 +314,20 @@ class Config:
                 return field
         return None
     
+    @classmethod
+    def get_field_location(cls, field_id):
+        """获取田块坐标
+        
+        返回:
+            tuple: (latitude, longitude)，田块未配置坐标时使用 WEATHER_CONFIG 中的经纬度
+        """
+        field_config = cls.get_field_config(field_id) or {}
+        latitude = field_config.get('latitude')
+        longitude = field_config.get('longitude')
+        if latitude is None or longitude is None:
+            return cls.WEATHER_CONFIG['latitude'], cls.WEATHER_CONFIG['longitude']
+        return float(latitude), float(longitude)
+    
     @classmethod
     def get_field_data_periods(cls, field_id):
         """获取田块的历史数据查询时间段配置
@@ -456,6 +475,23 @@ class Config:
         'API_MAX_RETRIES': int(os.getenv('API_MAX_RETRIES', 3)),
         'API_MAX_WAIT_TIME': int(os.getenv('API_MAX_WAIT_TIME', 10)),
         'HEALTH_CHECK_TIMEOUT': int(os.getenv('HEALTH_CHECK_TIMEOUT', 5)),
+        'FETCH_DEADLINE': float(os.getenv('SOIL_FETCH_DEADLINE', 30)),#get_soil_parameters并发拉取的总时限(秒)
+        'FETCH_MAX_WORKERS': int(os.getenv('SOIL_FETCH_MAX_WORKERS', 16)),#并发拉取线程数
+        'HTTP_POOL_CONNECTIONS': int(os.getenv('SOIL_HTTP_POOL_CONNECTIONS', 10)),#连接池数量(按主机)
+        'HTTP_POOL_MAXSIZE': int(os.getenv('SOIL_HTTP_POOL_MAXSIZE', 32)),#每个连接池保持的最大keep-alive连接数
+        'HTTP_POOL_BLOCK': os.getenv('SOIL_HTTP_POOL_BLOCK', 'false').lower() == 'true',#连接池耗尽时是否阻塞等待
+        'REQUEST_COALESCING': os.getenv('SOIL_REQUEST_COALESCING', 'true').lower() == 'true',#相同的在途请求只向上游发起一次
+        
+        # 每日平均数据本地存储
+        'DAILY_AVG_STORE_ENABLED': os.getenv('DAILY_AVG_STORE_ENABLED', 'true').lower() == 'true',#已拉取的日均值保存在本地,只请求缺失日期
+        'DAILY_AVG_STORE_PATH': os.getenv('DAILY_AVG_STORE_PATH', 'data/sensor/daily_avg.sqlite3'),
+        'DAILY_AVG_REFRESH_DAYS': int(os.getenv('DAILY_AVG_REFRESH_DAYS', 1)),#最近几天(含当天)的日均值仍在变化,每次重新拉取
+        
+        # 传感器数据缓存(路由与灌溉服务共用)
+        'SENSOR_CACHE_TTL': float(os.getenv('SENSOR_CACHE_TTL', 600)),#数据保持新鲜的秒数
+        'SENSOR_CACHE_STALE_TTL': float(os.getenv('SENSOR_CACHE_STALE_TTL', 1800)),#过期后先返回旧值并后台刷新的秒数
+        'SENSOR_CACHE_FALLBACK_TTL': float(os.getenv('SENSOR_CACHE_FALLBACK_TTL', 60)),#降级默认值的缓存秒数
+        'SENSOR_CACHE_MAX_ENTRIES': int(os.getenv('SENSOR_CACHE_MAX_ENTRIES', 256)),#最大缓存条目数
         
         # 熔断器配置
         'CIRCUIT_BREAKER_FAILURE_THRESHOLD': int(os.getenv('CIRCUIT_BREAKER_FAILURE_THRESHOLD', 5)),
@@ -485,7 +521,10 @@ class Config:
         # API查询参数配置
         'MAX_DAYS_RANGE': int(os.getenv('API_MAX_DAYS_RANGE', 365)),  # 最大查询天数范围
         'DEFAULT_DAYS': int(os.getenv('API_DEFAULT_DAYS', 30)),       # 默认查询天数
-        'ET_DATA_MIN_COLUMNS': int(os.getenv('ET_DATA_MIN_COLUMNS', 20))  # ET数据文件最小列数要求
+        'ET_DATA_MIN_COLUMNS': int(os.getenv('ET_DATA_MIN_COLUMNS', 20)),  # ET数据文件最小列数要求
+        # 只读接口(天气数据/ET历史/生育阶段)响应缓存
+        'RESPONSE_CACHE_ENABLED': os.getenv('API_RESPONSE_CACHE_ENABLED', 'true').lower() == 'true',  # 是否缓存预编码的JSON响应
+        'RESPONSE_CACHE_MAX_ENTRIES': int(os.getenv('API_RESPONSE_CACHE_MAX_ENTRIES', 128))  # 最大缓存条目数
     }
 
     # 墒情传感器数据查询范围-默认值兜底
@@ -537,6 +576,12 @@ class Config:
         'OUTPUT_DIR': os.getenv('AQUACROP_OUTPUT_DIR', 'data/model_output'),
         'IMAGES_DIR': os.getenv('AQUACROP_IMAGES_DIR', 'src/static/images'),
         'STATIC_URL_PREFIX': os.getenv('AQUACROP_STATIC_URL_PREFIX', '/static/'),
+        'REUSE_PREVIOUS_RUN': os.getenv('AQUACROP_REUSE_PREVIOUS_RUN', 'true').lower() == 'true',  # 气象、土壤、作物与灌溉输入未变化时复用上次的模拟结果
+        'WARM_START_ENABLED': os.getenv('AQUACROP_WARM_START_ENABLED', 'true').lower() == 'true',  # 保存最后实测日(昨天)的模型状态,下次从该状态继续模拟
+        # 多田块模拟:土壤参数相同的田块共用一次模拟,结果写入 FIELD_OUTPUT_DIR/<field_id>
+        'PER_FIELD_ENABLED': os.getenv('AQUACROP_PER_FIELD_ENABLED', 'false').lower() == 'true',  # 后台刷新时是否按田块分别模拟
+        'FIELD_OUTPUT_DIR': os.getenv('AQUACROP_FIELD_OUTPUT_DIR', 'data/model_output/fields'),
+        'FIELD_MAX_WORKERS': int(os.getenv('AQUACROP_FIELD_MAX_WORKERS', 4)),  # 多田块模拟的进程数
         
         # ETo估算方法配置
         'ETO_METHOD': os.getenv('AQUACROP_ETO_METHOD', 'hargreaves_simplified'),  # 'observed'|'hargreaves_simplified'|'hargreaves_fao56'
@@ -591,13 +636,42 @@ class Config:
         'FIXED_WEATHER_FILE': os.getenv('FAO_FIXED_WEATHER_FILE', 'data/weather/drought_irrigation_fixed.wth'),
         'SOIL_FILE': os.getenv('FAO_SOIL_FILE', 'data/soil/irrigation_soilprofile_sim.csv'),
         'SOIL_OUTPUT_FILE': os.getenv('FAO_SOIL_OUTPUT_FILE', 'data/soil/drought_irrigation.sol'),
+        'PERSIST_WEATHER_DATA': os.getenv('FAO_PERSIST_WEATHER_DATA', 'true').lower() == 'true',  # 是否将准备好的天气数据写入WEATHER_FILE
+        'EXPORT_WEATHER_FILES': os.getenv('FAO_EXPORT_WEATHER_FILES', 'false').lower() == 'true',  # 是否导出.wth中间文件(调试用)
+        'AUTOIRR_SCENARIO_FILE': os.getenv('FAO_AUTOIRR_SCENARIO_FILE', 'data/autoirr/scenarios.json'),  # 自动灌溉场景注册表
+        
+        # 模型结果缓存配置
+        'RESULT_CACHE_ENABLED': os.getenv('FAO_RESULT_CACHE_ENABLED', 'true').lower() == 'true',  # 是否启用基于输入内容哈希的结果缓存
+        'RESULT_CACHE_DIR': os.getenv('FAO_RESULT_CACHE_DIR', 'data/model_output/cache'),  # 缓存目录
+        'RESULT_CACHE_MAX_ENTRIES': int(os.getenv('FAO_RESULT_CACHE_MAX_ENTRIES', 20)),  # 最多保留的缓存条目数(LRU淘汰)
         
         # ETref数据集成配置
         'FAO_OUTPUT_FILE': os.getenv('FAO_ETREF_OUTPUT_FILE', 'wheat2024.out'),  # FAO模型输出文件路径
         'USE_FAO_ETREF': os.getenv('USE_FAO_ETREF', 'true').lower() == 'true',  # 是否使用FAO模型的ETref数据
         'ETREF_FALLBACK_METHOD': os.getenv('ETREF_FALLBACK_METHOD', 'hargreaves_simplified')  # FAO数据不可用时的回退方法
     }
-    
+
+    # 模型后台刷新配置
+    MODEL_REFRESH_CONFIG = {
+        'ENABLED': os.getenv('MODEL_REFRESH_ENABLED', 'false').lower() == 'true',  # 是否在应用内启动后台刷新线程
+        'INTERVAL_MINUTES': float(os.getenv('MODEL_REFRESH_INTERVAL_MINUTES', 180)),  # 刷新间隔(分钟),天气预报更新后下一轮即生效
+        'RUN_ON_START': os.getenv('MODEL_REFRESH_RUN_ON_START', 'true').lower() == 'true',  # 启动后是否立即刷新一次
+        'REFRESH_AQUACROP': os.getenv('MODEL_REFRESH_AQUACROP', 'true').lower() == 'true',  # 是否同时刷新AquaCrop输出
+        'MAX_MODEL_AGE_HOURS': float(os.getenv('MODEL_REFRESH_MAX_AGE_HOURS', 24)),  # 超过该时长未刷新时健康检查标记为过期
+        # FAO/AquaCrop运行共用的锁文件,后台刷新、模型任务、请求内联运行与独立刷新进程互斥
+        'RUN_LOCK_FILE': os.getenv('MODEL_RUN_LOCK_FILE', 'data/model_output/.model_run.lock'),
+        'RUN_LOCK_TIMEOUT_MINUTES': float(os.getenv('MODEL_RUN_LOCK_TIMEOUT_MINUTES', 30)),  # 等待其他模型运行完成的最长时间
+    }
+
+    # 模型运行任务配置(/api/jobs)
+    MODEL_JOB_CONFIG = {
+        'MAX_WORKERS': int(os.getenv('MODEL_JOB_MAX_WORKERS', 1)),  # 后台执行模型任务的线程数,模型共用输出文件,默认串行
+        'DEDUP_SECONDS': float(os.getenv('MODEL_JOB_DEDUP_SECONDS', 600)),  # 相同任务成功完成后在该时长内直接复用结果
+        'RETENTION_MINUTES': float(os.getenv('MODEL_JOB_RETENTION_MINUTES', 60)),  # 已结束任务的保留时长(分钟)
+        'MAX_JOBS': int(os.getenv('MODEL_JOB_MAX_JOBS', 200)),  # 最多保留的任务记录数
+        'ASYNC_DECISIONS': os.getenv('MODEL_JOB_ASYNC_DECISIONS', 'false').lower() == 'true',  # /make_decision 是否默认以任务方式执行
+    }
+
     # 天气模块配置
     WEATHER_CONFIG = {
         # 基础参数
@@ -633,7 +707,19 @@ class Config:
         # 通用配置
         'history_years': int(os.getenv('WEATHER_HISTORY_YEARS', 5)),
         'api_timeout': int(os.getenv('WEATHER_API_TIMEOUT', 15)),
-        'max_retries': int(os.getenv('WEATHER_MAX_RETRIES', 3))
+        'max_retries': int(os.getenv('WEATHER_MAX_RETRIES', 3)),
+
+        # 本地缓存配置
+        'archive_enabled': os.getenv('WEATHER_ARCHIVE_ENABLED', 'true').lower() == 'true',  # 历史天气按(经纬度,日期)归档,只获取缺失日期
+        'archive_path': os.getenv('WEATHER_ARCHIVE_PATH', 'data/weather/weather_archive.sqlite3'),
+        'archive_refresh_days': int(os.getenv('WEATHER_ARCHIVE_REFRESH_DAYS', 2)),  # 最近几天(含当天)的历史数据可能被修订,每次重新获取
+        'forecast_cache_ttl_minutes': float(os.getenv('WEATHER_FORECAST_CACHE_TTL', 60)),  # 天气预报缓存时间(分钟)
+
+        # 多地点天气配置
+        'multi_location_enabled': os.getenv('WEATHER_MULTI_LOCATION', 'false').lower() == 'true',  # 按田块坐标所在天气网格分别运行FAO模型
+        'grid_resolution': float(os.getenv('WEATHER_GRID_RESOLUTION', 0.1)),  # 天气网格分辨率(度),同一网格内的田块共用一份天气与模型输出
+        'cell_max_workers': int(os.getenv('WEATHER_CELL_MAX_WORKERS', 4)),  # 各网格FAO模型并行运行的进程数
+        'cell_output_dir': os.getenv('WEATHER_CELL_OUTPUT_DIR', 'data/model_output/cells')  # 各网格模型输出目录
     }
 
     
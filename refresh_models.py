@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+project_root = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(project_root)
+
+from config import current_config
+from src.services.model_refresh import ModelRefreshService
+from src.utils.logger import logger
+
+def main():
+    """独立进程刷新FAO/AquaCrop模型输出,Web应用直接读取最新的输出文件"""
+    parser = argparse.ArgumentParser(description='定时刷新FAO/AquaCrop模型输出')
+    parser.add_argument('--once', action='store_true', help='只刷新一次后退出')
+    parser.add_argument('--interval', type=float, default=None, help='刷新间隔(分钟),默认读取MODEL_REFRESH_CONFIG')
+    parser.add_argument('--skip-aquacrop', action='store_true', help='只刷新FAO模型')
+    args = parser.parse_args()
+
+    config = current_config()
+    refresher = ModelRefreshService(config)
+    if args.interval is not None:
+        refresher.interval = max(1.0, args.interval) * 60
+    if args.skip_aquacrop:
+        refresher.refresh_aquacrop = False
+
+    logger.info("=" * 50)
+    logger.info(f"模型刷新进程启动 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info("=" * 50)
+
+    if args.once:
+        snapshot = refresher.refresh_now()
+        return 0 if snapshot is not None and not snapshot.errors else 1
+
+    refresher.run_on_start = True
+    refresher.start()
+    try:
+        while refresher.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("收到中断信号，停止模型刷新")
+        refresher.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
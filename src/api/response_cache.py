@@ -0,0 +1,96 @@
+"""
+只读接口响应缓存
+仪表盘轮询的接口(天气数据、ET历史、生育阶段)只在模型运行或天气数据更新后才会变化,
+响应按 (接口路径, 查询参数, 当天日期, 输入文件版本) 缓存为已编码的JSON字节:
+- 输入文件版本由各文件的 (修改时间, 大小) 计算,文件更新后自动生成新的缓存条目
+- 每个条目带ETag,客户端携带匹配的 If-None-Match 时直接返回304
+- 超过 max_entries 时淘汰最久未使用的条目
+"""
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'etag', 'mimetype'])
+
+def file_generation(paths):
+    """由输入文件的修改时间与大小计算版本号,不存在的文件同样参与计算"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((path, None, None))
+    return hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()[:16]
+
+class ResponseCache:
+    """按输入文件版本失效的预编码JSON响应缓存"""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'evictions': 0}
+
+    def make_key(self, endpoint, args, input_files):
+        """生成缓存键
+
+        参数:
+            endpoint: 接口路径
+            args: 查询参数,(名称, 值) 对的可迭代对象
+            input_files: 响应依赖的输入文件路径列表
+        """
+        return (endpoint, tuple(sorted(args)), date.today().isoformat(), file_generation(input_files))
+
+    def get(self, key):
+        """获取缓存条目,未命中时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry
+
+    def put(self, key, body, mimetype='application/json'):
+        """保存已编码的响应体并返回缓存条目"""
+        entry = CachedResponse(body, hashlib.sha1(body).hexdigest(), mimetype)
+        with self._lock:
+            # 同一接口的旧版本条目不会再被命中,直接清除
+            for stale in [k for k in self._entries if k[:3] == key[:3] and k != key]:
+                del self._entries[stale]
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+        return entry
+
+    def record_not_modified(self):
+        with self._lock:
+            self.stats['not_modified'] += 1
+
+    def invalidate(self, endpoint=None):
+        """清除指定接口或全部接口的缓存,返回清除的条目数"""
+        with self._lock:
+            keys = [k for k in self._entries if endpoint is None or k[0] == endpoint]
+            for k in keys:
+                del self._entries[k]
+        if keys:
+            logger.info(f"已清除 {len(keys)} 条接口响应缓存 (endpoint={endpoint})")
+        return len(keys)
+
+    def get_stats(self):
+        """获取缓存命中统计"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self._entries)
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / total if total else 0.0
+        stats['max_entries'] = self.max_entries
+        return stats
@@ -2,7 +2,7 @@ import os
 import sys
 import json
 import traceback
-from flask import Blueprint, request, jsonify, render_template, abort, current_app, redirect, Response, url_for
+from flask import Blueprint, request, jsonify, render_template, abort, current_app, redirect, Response, url_for, g
 import io
 from datetime import datetime, timedelta
 import pandas as pd
@@ -10,7 +10,7 @@ import numpy as np
 import logging
 from src.utils.auth import token_required, api_key_required  
 from functools import wraps
-from src.aquacrop.aquacrop_modeling import run_model_and_save_results
+from src.api.response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +49,9 @@ except Exception as e:
 
 try:
     from src.services.irrigation_service import IrrigationService
+    from src.services.model_refresh import get_model_refresher
+    from src.services.model_jobs import get_model_job_service
+    from src.models.model_output import get_model_output_repository
 except ImportError as e:
     logger.error(f"无法导入服务类: {e}")
 
@@ -63,7 +66,7 @@ except Exception as e:
     logger.warning(f"无法从配置获取device/field ID,使用备用值: {e}")
 
 try:
-    from src.devices.soil_sensor import SoilSensor
+    from src.devices.soil_sensor import SoilSensor, SensorSnapshot, sensor_cache, api_client as sensor_api_client
     logger.info("成功导入SoilSensor类")
 except ImportError as e:
     logger.error(f"无法导入SoilSensor类: {e}")
@@ -84,11 +87,20 @@ def create_routes(config):
         try:
             irrigation_service = IrrigationService(config)
             logger.info("成功实例化灌溉服务")
+            # 决策任务与请求共用同一个灌溉服务实例
+            get_model_job_service(config, irrigation_service)
         except Exception as e:
             logger.error(f"实例化服务出错: {e}")
             logger.error(traceback.format_exc())
             return api
         
+        # 启动模型后台刷新,请求处理只读取最近一次完成的模型输出
+        try:
+            if getattr(config, 'MODEL_REFRESH_CONFIG', {}).get('ENABLED', False):
+                get_model_refresher(config).start()
+        except Exception as e:
+            logger.error(f"启动模型后台刷新失败: {e}")
+        
         # 辅助函数：根据 field_id 获取对应的 device_id
         def get_device_id_by_field(requested_field_id):
             """根据田块ID获取对应的设备ID
@@ -132,8 +144,18 @@ def create_routes(config):
             response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-API-Key'
             return response
         
+        def open_sensor_snapshot(request_device_id, request_field_id):
+            """创建本次请求共用的传感器快照,路由与灌溉服务都从中读取传感器数据"""
+            g.sensor_snapshot = SensorSnapshot(request_device_id, request_field_id)
+            return g.sensor_snapshot
+        
         @api.after_request
         def after_request(response):
+            snapshot = g.pop('sensor_snapshot', None)
+            if snapshot is not None:
+                stats = snapshot.get_stats()
+                response.headers['X-Sensor-Upstream-Calls'] = str(stats['upstream_calls'])
+                logger.info(f"[田块 {stats['field_id']}] 本次请求传感器拉取: 快照读取{stats['fetches']}次, 上游调用{stats['upstream_calls']}次 {stats['upstream_calls_by_endpoint']}")
             return add_cors_headers(response)
             
         def api_error_handler(f):
@@ -151,6 +173,58 @@ def create_routes(config):
                     }), 500
             return decorated
         
+        # 只读接口响应缓存,输入文件更新后自动失效
+        response_cache = ResponseCache(max_entries=config.API_CONFIG.get('RESPONSE_CACHE_MAX_ENTRIES', 128))
+        response_cache_enabled = config.API_CONFIG.get('RESPONSE_CACHE_ENABLED', True)
+        
+        def cached_response(input_files):
+            """缓存接口的成功响应(已编码的JSON字节)并支持ETag/If-None-Match
+            
+            Args:
+                input_files: 返回响应所依赖文件路径列表的函数,文件变化后缓存失效
+            """
+            def decorator(f):
+                @wraps(f)
+                def decorated(*args, **kwargs):
+                    if not response_cache_enabled:
+                        return f(*args, **kwargs)
+                    key = response_cache.make_key(request.path, request.args.items(multi=True), input_files())
+                    entry = response_cache.get(key)
+                    if entry is None:
+                        response = current_app.make_response(f(*args, **kwargs))
+                        if response.status_code != 200:
+                            return response
+                        entry = response_cache.put(key, response.get_data(), response.mimetype)
+                    if request.if_none_match.contains(entry.etag):
+                        response_cache.record_not_modified()
+                        response = Response(status=304)
+                    else:
+                        response = Response(entry.body, status=200, mimetype=entry.mimetype)
+                    response.set_etag(entry.etag)
+                    response.headers['Cache-Control'] = 'no-cache'
+                    return response
+                return decorated
+            return decorator
+        
+        def model_output_path():
+            model_output_file = config.FILE_PATHS.get('model_output', os.path.join('data', 'model_output', 'wheat2024.out'))
+            return os.path.join(project_root, model_output_file)
+        
+        def weather_input_files():
+            return [os.path.join(project_root, path) for path in (
+                'data/weather/drought_irrigation.wth',
+                'data/weather/irrigation_weather.csv',
+                'data/weather/weather_history_data.csv',
+                'weather_history_data.csv',
+                'irrigation_weather.csv')]
+        
+        def growth_stage_input_files():
+            growth_stages_file = config.FILE_PATHS.get('growth_stages', os.path.join('data', 'model_output', 'growth_stages.csv'))
+            aquacrop_output_dir = os.path.join(project_root, config.AQUACROP_CONFIG.get('OUTPUT_DIR', 'data/model_output'))
+            return [model_output_path(),
+                    os.path.join(project_root, growth_stages_file),
+                    os.path.join(aquacrop_output_dir, 'daily_crop_growth.csv')]
+        
         # 根路径路由
         @api.route('/')
         @api_error_handler
@@ -197,26 +271,38 @@ def create_routes(config):
         @api.route('/dashboard')
         @api_error_handler
         def dashboard():
-            """仪表盘页面"""
+            """仪表盘页面
+
+            不在请求内运行AquaCrop:直接使用已生成的冠层覆盖度图;后台刷新未运行且AquaCrop输出缺失或过期时
+            提交(去重后的)模型任务,页面通过 /api/jobs/<job_id> 查询任务进度并在完成后刷新图片
+            """
+            default_img = 'images/placeholder.png'
             try:
-                # 调用模型或获取最新结果
-                logger.info("开始调用run_model_and_save_results函数")
-                model_results = run_model_and_save_results()
-                logger.info(f"模型结果: {model_results}")
-                default_img = 'images/placeholder.png'
-                canopy_cover_img = model_results.get('canopy_cover_img', default_img)
-                
-                logger.info(f"从模型结果获取的图片路径: {model_results.get('canopy_cover_img', '未找到')}")
+                canopy_cover_img = default_img
+                images_dir = os.path.join(project_root, config.AQUACROP_CONFIG.get('IMAGES_DIR', 'src/static/images'))
+                if os.path.exists(os.path.join(images_dir, 'canopy_cover.png')):
+                    canopy_cover_img = 'images/canopy_cover.png'
+
+                model_job_id = None
+                refresher = get_model_refresher(config)
+                if not refresher.running and refresher.aquacrop_output_stale():
+                    job, deduplicated = get_model_job_service(config).submit('aquacrop')
+                    if job.status != 'succeeded':
+                        model_job_id = job.job_id
+                    logger.info(f"仪表盘模型任务: job_id={job.job_id}, status={job.status}, deduplicated={deduplicated}")
+
                 logger.info(f"最终传递给模板的冠层覆盖度图片路径: {canopy_cover_img}")
                 return render_template('dashboard.html', 
                                       title='作物智能灌溉仪表盘',
-                                      canopy_cover_img=canopy_cover_img)
+                                      canopy_cover_img=canopy_cover_img,
+                                      model_job_id=model_job_id)
             except Exception as e:
                 logger.error(f"渲染仪表盘时出错: {str(e)}", exc_info=True)
                 logger.info("使用默认placeholder.png图片")
                 return render_template('dashboard.html', 
                                       title='作物智能灌溉仪表盘',
-                                      canopy_cover_img='images/placeholder.png')
+                                      canopy_cover_img=default_img,
+                                      model_job_id=None)
 
         # 实际含水量API路由
         @api.route('/soil_data')
@@ -295,8 +381,8 @@ def create_routes(config):
                 
                 logger.info(f"API 触发灌溉决策: field_id={request_field_id}, device_id={request_device_id}, field_name={field_name}")
                 
-                soil_sensor = SoilSensor(request_device_id, request_field_id)
-                sensor_data = soil_sensor.get_current_data()
+                sensor_snapshot = open_sensor_snapshot(request_device_id, request_field_id)
+                sensor_data = sensor_snapshot.get()
 
                 # 检查是否有可用的数据
                 real_humidity = sensor_data.get('real_humidity', 0)
@@ -324,11 +410,29 @@ def create_routes(config):
                 if not is_real_data:
                     logger.warning(f"[田块 {request_field_id}] 部分数据可能不完整 (is_real_data=False)，但将尝试生成决策")
                 
+                # 异步模式:提交决策任务后立即返回任务ID
+                payload = request.get_json(silent=True) or {}
+                async_requested = str(request.args.get('async', payload.get('async', ''))).lower() in ('1', 'true', 'yes')
+                if async_requested or getattr(config, 'MODEL_JOB_CONFIG', {}).get('ASYNC_DECISIONS', False):
+                    job, deduplicated = get_model_job_service(config).submit('decision', {
+                        'field_id': request_field_id,
+                        'device_id': request_device_id,
+                        'real_humidity': real_humidity
+                    })
+                    return jsonify({
+                        'status': 'accepted',
+                        'message': '灌溉决策任务已提交',
+                        'job_id': job.job_id,
+                        'deduplicated': deduplicated,
+                        'status_url': url_for('api.get_model_job', job_id=job.job_id)
+                    }), 202
+
                 # 生成灌溉决策（SAT/FC/PWP 自动从传感器获取）
                 result = irrigation_service.make_irrigation_decision(
                     request_field_id,
                     request_device_id,
-                    real_humidity
+                    real_humidity,
+                    sensor_snapshot
                 )
 
                 if result and isinstance(result, dict):
@@ -349,6 +453,127 @@ def create_routes(config):
                 logger.error(traceback.format_exc())
                 return create_error_response('生成灌溉决策时发生意外错误', 500)
         
+        # 批量灌溉决策路由
+        @api.route('/api/decisions', methods=['GET', 'POST'])
+        @api_error_handler
+        def batch_decisions():
+            """批量生成多个田块的灌溉决策
+
+            GET参数 field_ids=id1,id2 或 POST JSON {"field_ids": [...]}；未指定时计算 FIELDS_CONFIG 中的全部田块
+            """
+            try:
+                if request.method == 'POST':
+                    payload = request.get_json(silent=True) or {}
+                    requested_ids = payload.get('field_ids')
+                else:
+                    requested_ids = [i for i in request.args.get('field_ids', '').split(',') if i]
+
+                fields = None
+                if requested_ids:
+                    fields = []
+                    for requested_field_id in requested_ids:
+                        request_device_id, field_name = get_device_id_by_field(requested_field_id)
+                        fields.append({
+                            'field_id': requested_field_id,
+                            'device_id': request_device_id,
+                            'field_name': field_name
+                        })
+
+                result = irrigation_service.make_batch_irrigation_decisions(fields)
+                logger.info(f"批量灌溉决策: 成功={result['count']}, 失败={len(result['errors'])}")
+                return jsonify({
+                    'status': 'success',
+                    'data': result,
+                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                })
+            except FileNotFoundError as e:
+                logger.error(f"批量灌溉决策失败: 缺少必要文件 - {str(e)}")
+                return create_error_response(f'缺少模型文件: {str(e)}', 500)
+            except ValueError as e:
+                logger.error(f"批量灌溉决策失败: 数据错误 - {str(e)}")
+                return create_error_response(f'数据错误: {str(e)}', 400)
+            except Exception as e:
+                logger.error(f"批量灌溉决策时出错: {str(e)}")
+                logger.error(traceback.format_exc())
+                return create_error_response('批量生成灌溉决策时发生意外错误', 500)
+
+        # 传感器数据缓存失效路由
+        @api.route('/api/sensor_cache/invalidate', methods=['POST'])
+        @api_error_handler
+        def invalidate_sensor_cache():
+            """清除传感器数据缓存
+
+            POST JSON {"field_id": ...} 或 {"device_id": ...}；都未指定时清空全部缓存
+            """
+            payload = request.get_json(silent=True) or {}
+            requested_field_id = payload.get('field_id') or request.args.get('field_id')
+            requested_device_id = payload.get('device_id') or request.args.get('device_id')
+            removed = sensor_cache.invalidate(field_id=requested_field_id, device_id=requested_device_id)
+            return jsonify({
+                'status': 'success',
+                'data': {
+                    'removed': removed,
+                    'cache': sensor_cache.get_stats()
+                },
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            })
+
+        # 模型任务路由
+        @api.route('/api/jobs', methods=['GET', 'POST'])
+        @api_error_handler
+        def model_jobs():
+            """提交或列出模型运行任务
+
+            POST JSON {"kind": "aquacrop|fao|decision", "params": {...}, "force": false},立即返回任务ID;
+            相同类型和参数的任务正在执行或刚完成时返回已有任务
+            GET 参数 kind、limit 列出最近的任务
+            """
+            job_service = get_model_job_service(config)
+            if request.method == 'GET':
+                limit = request.args.get('limit', default=20, type=int)
+                jobs = job_service.list_jobs(request.args.get('kind'), limit)
+                return jsonify({
+                    'status': 'success',
+                    'data': [job.to_dict() for job in jobs],
+                    'stats': job_service.get_stats(),
+                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                })
+
+            payload = request.get_json(silent=True) or {}
+            kind = payload.get('kind', 'aquacrop')
+            params = payload.get('params') or {}
+            if kind not in job_service.kinds:
+                return create_error_response(f'未知的任务类型: {kind}', 400, {'kinds': job_service.kinds})
+            if not isinstance(params, dict):
+                return create_error_response('params 必须是JSON对象', 400)
+            if kind == 'decision':
+                params.setdefault('field_id', field_id)
+                params.setdefault('device_id', get_device_id_by_field(params['field_id'])[0])
+            try:
+                job, deduplicated = job_service.submit(kind, params, force=bool(payload.get('force', False)))
+            except ValueError as e:
+                return create_error_response(str(e), 400)
+            return jsonify({
+                'status': 'accepted',
+                'job_id': job.job_id,
+                'deduplicated': deduplicated,
+                'job': job.to_dict(),
+                'status_url': url_for('api.get_model_job', job_id=job.job_id)
+            }), 202
+
+        @api.route('/api/jobs/<job_id>')
+        @api_error_handler
+        def get_model_job(job_id):
+            """查询模型任务的状态、进度与结果"""
+            job = get_model_job_service(config).get(job_id)
+            if job is None:
+                return create_error_response(f'任务不存在或已过期: {job_id}', 404)
+            return jsonify({
+                'status': 'success',
+                'data': job.to_dict(),
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            })
+
         # 系统健康状态路由
         @api.route('/health')
         @api_error_handler
@@ -358,24 +583,37 @@ def create_routes(config):
                 data_dir_exists = os.path.exists(os.path.join(project_root, 'data'))
                 static_dir_exists = os.path.exists(os.path.join(project_root, 'src/static'))
                 
+                model_status = get_model_refresher(config).get_status()
+
                 status = 'ok' if (data_dir_exists and static_dir_exists) else 'error'
-                
+
                 if request.headers.get('Accept', '').find('application/json') != -1 or request.args.get('format') == 'json':
                     return jsonify({
                         'status': status,
                         'message': '系统健康检查完成',
                         'checks': {
                             'data_directory': data_dir_exists,
-                            'static_directory': static_dir_exists
+                            'static_directory': static_dir_exists,
+                            'model_output': model_status['updated_at'] is not None,
+                            'model_fresh': not model_status['stale']
+                        },
+                        'model': model_status,
+                        'model_output_repository': get_model_output_repository().get_stats(),
+                        'sensor_api': {
+                            'circuit_breaker': sensor_api_client.get_circuit_breaker_status(),
+                            'latency': sensor_api_client.get_latency_stats()
                         },
+                        'sensor_cache': sensor_cache.get_stats(),
+                        'response_cache': response_cache.get_stats(),
+                        'model_jobs': get_model_job_service(config).get_stats(),
                         'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                     })
-                
+
                 return render_template('health.html',
                                       data_dir=data_dir_exists,
                                       static_dir=static_dir_exists,
                                       templates=True,
-                                      model_output=True,
+                                      model_output=model_status['updated_at'] is not None,
                                       timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
             except Exception as e:
                 logger.error(f"健康检查失败: {str(e)}")
@@ -426,8 +664,8 @@ def create_routes(config):
                 request_device_id, field_name = get_device_id_by_field(request_field_id)
                 logger.info(f"API请求土壤数据: field_id={request_field_id}, device_id={request_device_id}, field_name={field_name}")
                 
-                request_sensor = SoilSensor(request_device_id, request_field_id)
-                sensor_data = request_sensor.get_current_data()
+                sensor_snapshot = open_sensor_snapshot(request_device_id, request_field_id)
+                sensor_data = sensor_snapshot.get()
                 
                 # 即使is_real_data为False，如果SAT、FC、PWP等参数可用，也应该返回数据
                 max_humidity = sensor_data.get('max_humidity', 0) or 0
@@ -469,7 +707,7 @@ def create_routes(config):
                     
                     # 使用irrigation_service计算差异参数（用于决策）
                     SAT, FC, PWP, diff_max_real_mm, diff_min_real_mm, diff_com_real_mm = irrigation_service.calculate_soil_humidity_differences(
-                        request_field_id, request_device_id, real_humidity
+                        request_field_id, request_device_id, real_humidity, sensor_snapshot
                     )
                     
                     logger.info(f"irrigation_service计算结果: SAT={SAT}mm, FC={FC}mm, PWP={PWP}mm")
@@ -531,6 +769,7 @@ def create_routes(config):
         @api.route('/api/weather_data')
         @token_required
         @api_error_handler
+        @cached_response(weather_input_files)
         def weather_data():
             """天气数据端点"""
             try:
@@ -567,6 +806,11 @@ def create_routes(config):
                     start = end - timedelta(days=days)
                 
                 weather_file = os.path.join(project_root, 'data/weather/drought_irrigation.wth')
+                csv_weather_file = os.path.join(project_root, 'data/weather/irrigation_weather.csv')
+                # .wth文件仅在导出时更新,比CSV旧时视为过期
+                if os.path.exists(weather_file) and os.path.exists(csv_weather_file) and \
+                        os.path.getmtime(weather_file) < os.path.getmtime(csv_weather_file):
+                    weather_file = csv_weather_file
                 if not os.path.exists(weather_file):
                     alt_paths = [
                         os.path.join(project_root, 'data/weather/irrigation_weather.csv'),
@@ -661,6 +905,7 @@ def create_routes(config):
         # ET历史数据API接口
         @api.route('/api/et_history')
         @api_error_handler
+        @cached_response(lambda: [model_output_path()])
         def et_history():
             """获取ETref和ETc历史数据（整个生育期）"""
             try:
@@ -676,33 +921,25 @@ def create_routes(config):
                     logger.error(f"模型输出文件不存在: {model_output_path}")
                     return create_error_response('模型输出文件不存在', 404)
                 
-                # 读取模型输出文件
+                # 从共享的模型输出快照中读取
                 try:
-                    df = pd.read_csv(model_output_path, delim_whitespace=True, skiprows=10)
+                    output = get_model_output_repository().get(model_output_path)
                 except Exception as e:
                     logger.error(f"读取模型输出文件失败: {str(e)}")
                     return create_error_response(f'读取模型输出文件失败: {str(e)}', 500)
                 
-                if df.empty:
-                    return create_error_response('模型输出文件为空', 404)
+                if output is None or output.empty:
+                    return create_error_response('模型输出文件中没有有效的日期数据', 404)
                 
                 # 验证必要的列
-                required_columns = ['Date', 'ETc']
-                missing_columns = [col for col in required_columns if col not in df.columns]
+                missing_columns = output.has_columns(['Date', 'ETc'])
                 if missing_columns:
                     return create_error_response(f'模型输出文件缺少必要列: {missing_columns}', 400)
                 
-                # 解析日期
-                df['Date'] = pd.to_datetime(df['Date'], format='%m/%d/%y', errors='coerce')
-                df = df.dropna(subset=['Date'])
-                
-                if df.empty:
-                    return create_error_response('模型输出文件中没有有效的日期数据', 404)
-                
                 # 获取ETref列（如果存在），否则尝试从ET0列获取
-                if 'ETref' in df.columns:
+                if 'ETref' in output.columns:
                     etref_col = 'ETref'
-                elif 'ET0' in df.columns:
+                elif 'ET0' in output.columns:
                     etref_col = 'ET0'
                 else:
                     # 如果没有ETref列，尝试从天气数据计算或使用默认值
@@ -711,8 +948,7 @@ def create_routes(config):
                 
                 # 获取整个生育期的数据（不限制天数）
                 # 筛选有效数据（去除NaN）
-                filtered_df = df.copy()
-                filtered_df = filtered_df.sort_values('Date')
+                filtered_df = output.frame(['ETc', etref_col] if etref_col else ['ETc'])
                 
                 if filtered_df.empty:
                     return jsonify({
@@ -764,6 +1000,7 @@ def create_routes(config):
         # 作物生长阶段API接口
         @api.route('/api/growth_stage')
         @api_error_handler
+        @cached_response(growth_stage_input_files)
         def growth_stage():
             """获取作物生长阶段数据"""
             try:
@@ -808,20 +1045,9 @@ def create_routes(config):
                 
                 try:
                     if os.path.exists(model_output_path):
-                        df = pd.read_csv(model_output_path, delim_whitespace=True, skiprows=10)
-                        if not df.empty and 'Date' in df.columns:
-                            df['Date'] = pd.to_datetime(df['Date'], format='%m/%d/%y', errors='coerce')
-                            df = df.dropna(subset=['Date'])
-                            
-                            now = pd.to_datetime(datetime.now().date())
-                            today_data = df[df['Date'] == now]
-                            
-                            if today_data.empty:
-                                # 使用最接近的日期
-                                df['date_diff'] = abs((df['Date'] - now).dt.days)
-                                closest_row = df.loc[df['date_diff'].idxmin()]
-                            else:
-                                closest_row = today_data.iloc[0]
+                        output = get_model_output_repository().get(model_output_path)
+                        if output is not None and not output.empty:
+                            closest_row = output.nearest_row(datetime.now().date())
                             
                             # 获取根系深度
                             if 'Zr' in closest_row:
@@ -905,8 +1131,8 @@ def create_routes(config):
                 logger.info(f"API请求灌溉决策: field_id={request_field_id}, device_id={request_device_id}, field_name={field_name}")
                 
                 # 尝试获取真实灌溉决策数据
-                soil_sensor = SoilSensor(request_device_id, request_field_id)
-                sensor_data = soil_sensor.get_current_data()
+                sensor_snapshot = open_sensor_snapshot(request_device_id, request_field_id)
+                sensor_data = sensor_snapshot.get()
                 
                 # 检查是否有可用的数据
                 max_humidity = sensor_data.get('max_humidity', 0) or 0
@@ -954,7 +1180,8 @@ def create_routes(config):
                     result = irrigation_service.make_irrigation_decision(
                         request_field_id,
                         request_device_id,
-                        real_humidity
+                        real_humidity,
+                        sensor_snapshot
                     )
                     
                     if result and isinstance(result, dict):
@@ -49,12 +49,14 @@ ETo估算配置:
 import pandas as pd
 import os
 import datetime
-import math
 import numpy as np
 from aquacrop import AquaCropModel, Soil, Crop, InitialWaterContent, IrrigationManagement
 from aquacrop.utils import prepare_weather, get_filepath
+from aquacrop.initialize.read_weather_inputs import read_weather_inputs
 import matplotlib.pyplot as plt
 import json
+import hashlib
+import pickle
 import logging
 import sys
 from typing import Dict, List, Optional, Union
@@ -206,42 +208,26 @@ def calculate_eto_hargreaves_fao56(weather_data, latitude, elevation):
     """
     使用FAO-56 Hargreaves方法计算参考蒸散量ETo
     """
+    from src.models.etref import hargreaves
     if 'Date' in weather_data.columns:
-        dates = pd.to_datetime(weather_data['Date'])
+        dates = pd.DatetimeIndex(pd.to_datetime(weather_data['Date']))
     else:
         dates = weather_data.index
         if not isinstance(dates, pd.DatetimeIndex):
             raise ValueError("需要Date列或DatetimeIndex来计算外辐射Ra")
-    ra_values = []
-    for date in dates:
-        day_of_year = date.timetuple().tm_yday
-        ra = calculate_extraterrestrial_radiation(latitude, day_of_year)
-        ra_values.append(ra)
-    ra_series = pd.Series(ra_values, index=weather_data.index)
-    tmean = (weather_data['Tmax'] + weather_data['Tmin']) / 2
-    temp_range = weather_data['Tmax'] - weather_data['Tmin']
     if elevation is not None and elevation > 0:
-        atmospheric_pressure = 101.3 * ((293 - 0.0065 * elevation) / 293) ** 5.26
-        pressure_correction = atmospheric_pressure / 101.3  # 相对于海平面的修正系数
-        logger.debug(f"海拔 {elevation}m 的大气压力修正系数: {pressure_correction:.4f}")
-    else:
-        pressure_correction = 1.0  
-        if elevation is None:
-            logger.debug("未提供海拔高度，使用海平面大气压力")
-    eto = 0.0023 * (tmean + 17.8) * np.sqrt(temp_range) * (ra_series / 2.45) * pressure_correction
-    return eto
+        logger.debug(f"海拔 {elevation}m 的大气压力修正系数: {((293 - 0.0065 * elevation) / 293) ** 5.26:.4f}")
+    elif elevation is None:
+        logger.debug("未提供海拔高度，使用海平面大气压力")
+    eto = hargreaves(weather_data['Tmax'].to_numpy(dtype=float), weather_data['Tmin'].to_numpy(dtype=float),
+                     dates.dayofyear.to_numpy(), latitude=latitude, elevation=elevation)
+    return pd.Series(eto, index=weather_data.index)
 
 def calculate_extraterrestrial_radiation(latitude, day_of_year):
     """计算外辐射Ra (MJ/m²/day)"""
-    lat_rad = math.radians(latitude)
-    delta = 0.409 * math.sin(2 * math.pi * day_of_year / 365 - 1.39)
-    dr = 1 + 0.033 * math.cos(2 * math.pi * day_of_year / 365)
-    ws = math.acos(-math.tan(lat_rad) * math.tan(delta))
-    ra = (24 * 60 / math.pi) * 0.082 * dr * (
-        ws * math.sin(lat_rad) * math.sin(delta) + 
-        math.cos(lat_rad) * math.cos(delta) * math.sin(ws)
-    )
-    return ra
+    from src.models.etref import extraterrestrial_radiation
+    ra = extraterrestrial_radiation(latitude, day_of_year)
+    return float(ra) if np.ndim(ra) == 0 else ra
 
 def setup_logger(name: str = __name__, level: int = logging.INFO, log_file: Optional[str] = None) -> logging.Logger:
     """设置日志器配置"""
@@ -686,38 +672,16 @@ def load_etref_from_fao_output(fao_output_file: str) -> Optional[pd.DataFrame]:
         if not os.path.exists(fao_output_file):
             logger.warning(f"FAO输出文件不存在: {fao_output_file}")
             return None
-        with open(fao_output_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        data_start_line = None
-        for i, line in enumerate(lines):
-            if 'Year-DOY' in line and 'ETref' in line:
-                data_start_line = i
-                break
-        if data_start_line is None:
+        from src.models.model_output import read_out_file
+        data = read_out_file(fao_output_file, ['Date', 'ETref'])
+        if not data:
             logger.error("在FAO输出文件中未找到数据开始行")
             return None
-        data_lines = lines[data_start_line + 1:]  
-        dates = []
-        etref_values = []
-        
-        for line in data_lines:
-            line = line.strip()
-            if not line or line.startswith('*'): 
-                continue
-            parts = line.split()
-            if len(parts) < 6: 
-                continue
-            try:
-                date_str = parts[4]  
-                date_obj = pd.to_datetime(date_str, format='%m/%d/%y')
-                etref_value = float(parts[5])
-                dates.append(date_obj)
-                etref_values.append(etref_value)
-            except (ValueError, IndexError) as e:
-                logger.warning(f"解析数据行时出错: {line[:50]}..., 错误: {e}")
-                continue
+        valid = ~np.isnat(data['Date']) & ~np.isnan(data['ETref'])
+        dates = data['Date'][valid].astype('datetime64[ns]')
+        etref_values = data['ETref'][valid]
         
-        if not dates:
+        if len(dates) == 0:
             logger.error("未能从FAO输出文件中解析到有效数据")
             return None
         etref_df = pd.DataFrame({
@@ -1133,158 +1097,189 @@ def analyze_growth_stages(daily_crop_growth):
     
     return stage_results
 
-def run_model_and_save_results() -> Dict:
-    """运行模型并保存结果"""
+# 模拟输入指纹包含的配置项;修改模型输入处理方式时递增版本号使已有结果失效
+RUN_FINGERPRINT_VERSION = 1
+RUN_FINGERPRINT_KEYS = [
+    'CROP_NAME', 'PLANTING_DATE', 'SIM_START_TIME', 'SIM_END_TIME',
+    'SOIL_TEXTURE', 'SOIL_KSAT', 'SOIL_PENETRABILITY',
+    'INITIAL_WC_TYPE', 'INITIAL_WC_METHOD', 'INITIAL_WC_DEPTH_LAYER', 'INITIAL_WC_VALUE',
+    'IRRIGATION_METHOD', 'SMT', 'MAX_IRRIGATION_DEPTH', 'IRRIGATION_EFFICIENCY',
+    'IRR_FREQUENCY', 'IRR_DEPTH'
+]
+RUN_MANIFEST_FILE = 'aquacrop_run_manifest.json'
+RUN_RESULT_FILES = {
+    'daily_crop_growth': 'daily_crop_growth.csv',
+    'daily_water_storage': 'daily_water_storage.csv',
+    'daily_water_flux': 'aquacrop_daily_water_flux.csv'
+}
+
+def compute_run_fingerprint(weather_data: Optional[pd.DataFrame], soil_values: tuple, config: dict, irr_config: dict) -> str:
+    """计算模拟输入指纹
+
+    Args:
+        weather_data: prepare_weather转换后的气象数据；为None时只计算土壤、作物与灌溉输入的指纹
+        soil_values: (thS, thFC, thWP)
+        config: AQUACROP_CONFIG
+        irr_config: 合并后的AquaCrop灌溉配置
+    """
+    digest = hashlib.sha1()
+    if weather_data is not None:
+        digest.update(pd.util.hash_pandas_object(weather_data, index=False).values.tobytes())
+    inputs = {key: irr_config.get(key, config.get(key)) for key in RUN_FINGERPRINT_KEYS}
+    inputs['soil'] = [round(float(value), 6) for value in soil_values]
+    inputs['soil_layers'] = ModelConfig().SOIL_LAYERS
+    inputs['version'] = RUN_FINGERPRINT_VERSION
+    digest.update(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+def load_previous_run(output_dir: str, fingerprint: str) -> Optional[Dict]:
+    """读取与指纹一致的上次模拟结果，指纹不同或结果文件缺失/被修改时返回None"""
+    manifest_path = os.path.join(output_dir, RUN_MANIFEST_FILE)
     try:
-        logger.info("开始运行模型并保存结果")
-        model_irr_dir = os.path.dirname(__file__)
-        project_root = os.path.abspath(os.path.join(model_irr_dir, '../../'))
-        sys.path.append(project_root)
-        from config import current_config
-        config = current_config().AQUACROP_CONFIG
-        fao_config = current_config().FAO_CONFIG
-        validate_config(config)
-        images_dir = os.path.join(project_root, config['IMAGES_DIR'])
-        os.makedirs(images_dir, exist_ok=True)
-        output_txt_path = os.path.join(project_root, config['WEATHER_OUTPUT_TXT'])
-        input_wth_path = os.path.join(project_root, fao_config['TEMP_WEATHER_FILE'])
-        if os.path.exists(input_wth_path):
-            logger.info(f"使用.wth格式气象文件: {input_wth_path}")
-            converted_file = convert_irrigation_weather_to_aquacrop_format(input_wth_path, output_txt_path, config)
-        else:
-            input_csv_path = os.path.join(project_root, config['WEATHER_INPUT_CSV'])
-            if not os.path.exists(input_csv_path):
-                raise FileNotFoundError(f"未找到任何有效的气象数据文件: 既不存在.wth文件 {input_wth_path} 也不存在CSV文件 {input_csv_path}")
-            logger.info(f"使用CSV格式气象文件: {input_csv_path}")
-            converted_file = convert_irrigation_weather_to_aquacrop_format(input_csv_path, output_txt_path, config)
-        try:
-            filepath = get_filepath(converted_file)
-            logger.debug(f"获取到气象文件路径: {filepath}")
-        except Exception as e:
-            logger.error(f"获取气象文件路径失败: {str(e)}")
-            # 如果get_filepath失败，直接使用转换后的文件路径
-            filepath = converted_file
-            logger.info(f"使用转换后的文件路径: {filepath}")
-        
-        if not os.path.exists(filepath):
-            raise FileNotFoundError(f"气象文件不存在: {filepath}")
-        try:
-            weather_data = prepare_weather(filepath)
-            logger.info(f"成功加载气象数据，共 {len(weather_data)} 条记录")
-        except Exception as e:
-            logger.error(f"准备气象数据失败: {str(e)}")
-            raise
-        weather_data["Date"] = pd.to_datetime(weather_data["Date"])
-        initWC = InitialWaterContent(
-            wc_type=config['INITIAL_WC_TYPE'],
-            method=config['INITIAL_WC_METHOD'],
-            depth_layer=config['INITIAL_WC_DEPTH_LAYER'],
-            value=config['INITIAL_WC_VALUE']
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('fingerprint') != fingerprint:
+        logger.info("模型输入已变化，需要重新运行模拟")
+        return None
+    results = {'yield': manifest.get('yield', 0.0)}
+    for name, filename in RUN_RESULT_FILES.items():
+        path = os.path.join(output_dir, filename)
+        if not os.path.exists(path) or os.path.getsize(path) != manifest.get('files', {}).get(filename):
+            logger.warning(f"上次的模拟结果文件缺失或已被修改: {path}")
+            return None
+        results[name] = pd.read_csv(path, parse_dates=['Date'])
+    return results
+
+def save_run_results(output_dir: str, fingerprint: str, run_results: Dict) -> None:
+    """保存模拟结果CSV，并记录输入指纹供下次复用"""
+    files = {}
+    for name, filename in RUN_RESULT_FILES.items():
+        path = os.path.join(output_dir, filename)
+        run_results[name].to_csv(path, index=False)
+        files[filename] = os.path.getsize(path)
+    manifest = {
+        'fingerprint': fingerprint,
+        'yield': run_results['yield'],
+        'files': files,
+        'created_at': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    with open(os.path.join(output_dir, RUN_MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+MODEL_CHECKPOINT_FILE = 'aquacrop_checkpoint.pkl'
+
+def get_checkpoint_date(config: dict, today: Optional[datetime.date] = None) -> Optional[pd.Timestamp]:
+    """获取模型状态检查点日期：最后一个实测气象日(昨天)，今天及以后为预报数据
+
+    昨天不在模拟期内(季前或最后一天之后)时返回None
+    """
+    today = today or datetime.date.today()
+    checkpoint_date = pd.Timestamp(today) - pd.Timedelta(days=1)
+    if pd.to_datetime(config['SIM_START_TIME']) <= checkpoint_date < pd.to_datetime(config['SIM_END_TIME']):
+        return checkpoint_date
+    return None
+
+def load_model_checkpoint(checkpoint_path: str, fingerprint: str, weather_data: pd.DataFrame) -> Optional[AquaCropModel]:
+    """读取模型状态检查点，换上新的气象数据后返回可继续运行的模型
+
+    土壤、作物或灌溉输入已变化，或检查点之前的气象数据已被修正时返回None
+    """
+    try:
+        with open(checkpoint_path, 'rb') as f:
+            checkpoint = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"读取模型状态检查点失败: {str(e)}")
+        return None
+    if checkpoint.get('fingerprint') != fingerprint:
+        logger.info("土壤、作物或灌溉输入已变化，不使用模型状态检查点")
+        return None
+    model = checkpoint['model']
+    steps = model._clock_struct.time_step_counter
+    try:
+        season_weather = read_weather_inputs(model._clock_struct, weather_data)
+    except ValueError as e:
+        logger.warning(f"气象数据未覆盖模拟期，不使用模型状态检查点: {str(e)}")
+        return None
+    observed = season_weather.iloc[:steps].reset_index(drop=True)
+    if len(season_weather) != len(model.weather_df) or not observed.equals(model.weather_df.iloc[:steps].reset_index(drop=True)):
+        logger.info(f"检查点({checkpoint['date']})之前的气象数据已变化，不使用模型状态检查点")
+        return None
+    model.weather_df = season_weather
+    model._weather = season_weather.values
+    return model
+
+def save_model_checkpoint(checkpoint_path: str, fingerprint: str, model: AquaCropModel, checkpoint_date: pd.Timestamp) -> None:
+    """保存模型状态检查点，先写临时文件再替换，避免并发读取到不完整的文件"""
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({'fingerprint': fingerprint, 'date': checkpoint_date.strftime('%Y-%m-%d'), 'model': model},
+                    f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, checkpoint_path)
+    logger.info(f"模型状态检查点已保存: {checkpoint_path} ({checkpoint_date.strftime('%Y-%m-%d')})")
+
+def simulate_season(config: dict, weather_data: pd.DataFrame, soil_values: tuple, aquacrop_irr_config: dict,
+                    checkpoint_path: Optional[str] = None, checkpoint_date: Optional[pd.Timestamp] = None) -> Dict:
+    """构建土壤、作物与灌溉管理并运行整季模拟
+
+    提供checkpoint_path与checkpoint_date时,从上次保存的模型状态继续模拟(输入一致时),
+    并在checkpoint_date当天结束后保存新的模型状态
+
+    Args:
+        config: AQUACROP_CONFIG
+        weather_data: prepare_weather转换后的气象数据
+        soil_values: (thS, thFC, thWP)
+        aquacrop_irr_config: 合并后的AquaCrop灌溉配置
+        checkpoint_path: 模型状态检查点文件路径
+        checkpoint_date: 检查点日期(最后一个实测气象日)
+
+    Returns:
+        dict: daily_crop_growth、daily_water_storage、daily_water_flux、yield(吨/公顷)
+              与 warm_start(继续模拟的起始日期，从头模拟时为None)
+    """
+    thS, thFC, thWP = soil_values
+    initWC = InitialWaterContent(
+        wc_type=config['INITIAL_WC_TYPE'],
+        method=config['INITIAL_WC_METHOD'],
+        depth_layer=config['INITIAL_WC_DEPTH_LAYER'],
+        value=config['INITIAL_WC_VALUE']
+    )
+    soil_texture = Soil(soil_type=config['SOIL_TEXTURE'])
+    total_depth = soil_texture.zSoil
+    model_config = ModelConfig()
+    layer_thickness = total_depth / model_config.SOIL_LAYERS
+    
+    for i in range(model_config.SOIL_LAYERS):
+        soil_texture.add_layer(
+            thickness=layer_thickness,
+            thWP=thWP,
+            thFC=thFC,
+            thS=thS,
+            Ksat=config['SOIL_KSAT'],
+            penetrability=config['SOIL_PENETRABILITY']
         )
+    set_crop = Crop(config['CROP_NAME'], planting_date=config['PLANTING_DATE'])
+    
+    # 根据配置选择灌溉方法
+    irrigation_method = aquacrop_irr_config.get('IRRIGATION_METHOD', 1)
+    
+    if irrigation_method == 1:  # 阈值触发灌溉
+        logger.info("使用阈值触发灌溉模式")
         try:
-            from src.devices.soil_sensor import SoilSensor
-            irrigation_config = current_config().IRRIGATION_CONFIG
-            device_id = irrigation_config.get('DEFAULT_DEVICE_ID', '16031600028481')
-            field_id = irrigation_config.get('DEFAULT_FIELD_ID', '1810564502987649024')
-            soil_sensor = SoilSensor(device_id, field_id)
-            soil_params = soil_sensor.get_current_data()
-            raw_sat = soil_params.get('sat', config['SOIL_SATURATION'])
-            raw_fc = soil_params.get('fc', config['SOIL_FIELD_CAPACITY'])
-            raw_pwp = soil_params.get('pwp', config['SOIL_WILTING_POINT'])
-            
-            def convert_to_decimal(value):
-                """将百分比值转换为小数（如果值大于1则除以100）
-                
-                Args:
-                    value: 可能是百分比值或小数，也可能是 None
-                    
-                Returns:
-                    float: 转换后的小数值
-                """
-                if value is None:
-                    logger.warning("接收到 None 值，使用默认值 0.25")
-                    return 0.25  # 默认田间持水量
-                
-                try:
-                    value = float(value)
-                    if value > 1:
-                        return value / 100.0
-                    return value
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"无法转换值 {value} 为数值，使用默认值 0.25: {e}")
-                    return 0.25
-            
-            thS = convert_to_decimal(raw_sat)
-            thFC = convert_to_decimal(raw_fc)
-            thWP = convert_to_decimal(raw_pwp)      
-            logger.info(f"使用土壤传感器参数(转换后): 饱和含水量={thS:.3f}, 田间持水量={thFC:.3f}, 凋萎点={thWP:.3f}")
-        except Exception as e:
-            logger.warning(f"获取土壤传感器数据失败，使用配置文件默认值: {str(e)}")
-            thS = config['SOIL_SATURATION']
-            thFC = config['SOIL_FIELD_CAPACITY']
-            thWP = config['SOIL_WILTING_POINT']
-            logger.info(f"使用配置文件参数: 饱和含水量={thS}, 田间持水量={thFC}, 凋萎点={thWP}")
-        if not (0 <= thWP < thFC < thS < 1):
-            logger.warning(f"土壤参数不符合物理规律 (0 ≤ PWP({thWP:.3f}) < FC({thFC:.3f}) < SAT({thS:.3f}) < 1)，使用配置文件默认值")
-            thS = config['SOIL_SATURATION']
-            thFC = config['SOIL_FIELD_CAPACITY']
-            thWP = config['SOIL_WILTING_POINT']
-            logger.info(f"使用配置文件默认参数: 饱和含水量={thS}, 田间持水量={thFC}, 凋萎点={thWP}")
-        soil_texture = Soil(soil_type=config['SOIL_TEXTURE'])
-        total_depth = soil_texture.zSoil
-        model_config = ModelConfig()
-        layer_thickness = total_depth / model_config.SOIL_LAYERS
-        
-        for i in range(model_config.SOIL_LAYERS):
-            soil_texture.add_layer(
-                thickness=layer_thickness,
-                thWP=thWP,
-                thFC=thFC,
-                thS=thS,
-                Ksat=config['SOIL_KSAT'],
-                penetrability=config['SOIL_PENETRABILITY']
+            # 尝试使用SMT参数初始化
+            irr_mngt = IrrigationManagement(
+                irrigation_method=1,
+                SMT=aquacrop_irr_config['SMT'],
+                MaxIrrSeason=aquacrop_irr_config['MAX_IRRIGATION_DEPTH'],
+                AppEff=aquacrop_irr_config['IRRIGATION_EFFICIENCY'] / 100.0
             )
-        set_crop = Crop(config['CROP_NAME'], planting_date=config['PLANTING_DATE'])
-        
-        # 合并AquaCrop灌溉配置
-        aquacrop_irr_config = {**config, **model_config.AQUACROP_IRRIGATION_CONFIG}
-        
-        # 根据配置选择灌溉方法
-        irrigation_method = aquacrop_irr_config.get('IRRIGATION_METHOD', 1)
-        
-        if irrigation_method == 1:  # 阈值触发灌溉
-            logger.info("使用阈值触发灌溉模式")
-            try:
-                # 尝试使用SMT参数初始化
-                irr_mngt = IrrigationManagement(
-                    irrigation_method=1,
-                    SMT=aquacrop_irr_config['SMT'],
-                    MaxIrrSeason=aquacrop_irr_config['MAX_IRRIGATION_DEPTH'],
-                    AppEff=aquacrop_irr_config['IRRIGATION_EFFICIENCY'] / 100.0
-                )
-                logger.info(f"成功配置阈值触发灌溉: SMT={aquacrop_irr_config['SMT']}")
-            except Exception as e:
-                logger.warning(f"阈值触发灌溉初始化失败: {e}，回退到预定义计划")
-                # 回退到预定义计划
-                irr_freq = normalize_irr_frequency(config['IRR_FREQUENCY'])
-                irr_dates = pd.date_range(
-                    start=config['SIM_START_TIME'],
-                    end=config['SIM_END_TIME'],
-                    freq=irr_freq
-                )
-                irr_schedule = pd.DataFrame({
-                    "Date": irr_dates,
-                    "Depth": [config['IRR_DEPTH']] * len(irr_dates)
-                })
-                irr_schedule["Date"] = pd.to_datetime(irr_schedule["Date"]).dt.date
-                try:
-                    irr_mngt = IrrigationManagement(irrigation_method=3, Schedule=irr_schedule)
-                except TypeError:
-                    irr_mngt = IrrigationManagement(irrigation_method=3)
-                    if hasattr(irr_mngt, 'schedule'):
-                        irr_mngt.schedule = irr_schedule
-        else:  # 预定义计划灌溉
-            logger.info("使用预定义计划灌溉模式")
+            logger.info(f"成功配置阈值触发灌溉: SMT={aquacrop_irr_config['SMT']}")
+        except Exception as e:
+            logger.warning(f"阈值触发灌溉初始化失败: {e}，回退到预定义计划")
+            # 回退到预定义计划
             irr_freq = normalize_irr_frequency(config['IRR_FREQUENCY'])
             irr_dates = pd.date_range(
                 start=config['SIM_START_TIME'],
@@ -1299,13 +1294,46 @@ def run_model_and_save_results() -> Dict:
             try:
                 irr_mngt = IrrigationManagement(irrigation_method=3, Schedule=irr_schedule)
             except TypeError:
-                logger.warning("IrrigationManagement不支持Schedule参数,使用标准irrigation_method=3")
                 irr_mngt = IrrigationManagement(irrigation_method=3)
                 if hasattr(irr_mngt, 'schedule'):
                     irr_mngt.schedule = irr_schedule
-                elif hasattr(irr_mngt, 'set_schedule'):
-                    irr_mngt.set_schedule(irr_schedule)
-    
+    else:  # 预定义计划灌溉
+        logger.info("使用预定义计划灌溉模式")
+        irr_freq = normalize_irr_frequency(config['IRR_FREQUENCY'])
+        irr_dates = pd.date_range(
+            start=config['SIM_START_TIME'],
+            end=config['SIM_END_TIME'],
+            freq=irr_freq
+        )
+        irr_schedule = pd.DataFrame({
+            "Date": irr_dates,
+            "Depth": [config['IRR_DEPTH']] * len(irr_dates)
+        })
+        irr_schedule["Date"] = pd.to_datetime(irr_schedule["Date"]).dt.date
+        try:
+            irr_mngt = IrrigationManagement(irrigation_method=3, Schedule=irr_schedule)
+        except TypeError:
+            logger.warning("IrrigationManagement不支持Schedule参数,使用标准irrigation_method=3")
+            irr_mngt = IrrigationManagement(irrigation_method=3)
+            if hasattr(irr_mngt, 'schedule'):
+                irr_mngt.schedule = irr_schedule
+            elif hasattr(irr_mngt, 'set_schedule'):
+                irr_mngt.set_schedule(irr_schedule)
+
+    # 积温型作物历法按整季气温换算生育期天数,预报数据变化会影响检查点之前的参数,只对日历型作物使用检查点
+    if set_crop.CalendarType != 1:
+        checkpoint_path = None
+    checkpoint_steps = 0
+    if checkpoint_path and checkpoint_date is not None:
+        checkpoint_steps = (checkpoint_date - pd.to_datetime(config['SIM_START_TIME'])).days + 1
+        fingerprint = compute_run_fingerprint(None, soil_values, config, aquacrop_irr_config)
+    model = None
+    if checkpoint_steps > 0:
+        model = load_model_checkpoint(checkpoint_path, fingerprint, weather_data)
+        if model is not None and model._clock_struct.time_step_counter > checkpoint_steps:
+            model = None
+    warm_start = None
+    if model is None:
         model = AquaCropModel(
             sim_start_time=config['SIM_START_TIME'],
             sim_end_time=config['SIM_END_TIME'],
@@ -1315,48 +1343,232 @@ def run_model_and_save_results() -> Dict:
             initial_water_content=initWC,
             irrigation_management=irr_mngt
         )
-        
         logger.info("开始运行模型仿真")
-        model.run_model(till_termination=True)
-        logger.info("模型仿真完成")
-        daily_water_flux = model.get_water_flux()
-        daily_water_storage = model.get_water_storage()
-        daily_crop_growth = model.get_crop_growth()
-        model_result = model.get_simulation_results()
-        output_dir = os.path.join(project_root, config['OUTPUT_DIR'])
-        os.makedirs(output_dir, exist_ok=True)
-        start_date = pd.to_datetime(config['SIM_START_TIME'])
-        daily_crop_growth = _ensure_date_col(daily_crop_growth, start_date)
-        daily_water_storage = _ensure_date_col(daily_water_storage, start_date)
-        daily_water_flux = _ensure_date_col(daily_water_flux, start_date)
+        if checkpoint_steps > 0:
+            model.run_model(num_steps=checkpoint_steps)
+    else:
+        warm_start = model._clock_struct.time_span[model._clock_struct.time_step_counter].strftime('%Y-%m-%d')
+        logger.info(f"从模型状态检查点继续模拟: {warm_start} 起")
+        if checkpoint_steps > model._clock_struct.time_step_counter:
+            model.run_model(num_steps=checkpoint_steps - model._clock_struct.time_step_counter, initialize_model=False)
+    if checkpoint_steps > 0:
+        try:
+            save_model_checkpoint(checkpoint_path, fingerprint, model, checkpoint_date)
+        except Exception as e:
+            logger.warning(f"保存模型状态检查点失败: {str(e)}")
+    model.run_model(till_termination=True, initialize_model=checkpoint_steps == 0)
+    logger.info("模型仿真完成")
+    daily_water_flux = model.get_water_flux()
+    daily_water_storage = model.get_water_storage()
+    daily_crop_growth = model.get_crop_growth()
+    model_result = model.get_simulation_results()
+    start_date = pd.to_datetime(config['SIM_START_TIME'])
+    daily_crop_growth = _ensure_date_col(daily_crop_growth, start_date)
+    daily_water_storage = _ensure_date_col(daily_water_storage, start_date)
+    daily_water_flux = _ensure_date_col(daily_water_flux, start_date)
+    
+    yield_col = 'Dry yield (tonne/ha)'
+    if isinstance(model_result, pd.DataFrame) and yield_col in model_result.columns:
+        yield_output = model_result[yield_col].mean()
+        logger.info(f"预计产量: {yield_output:.2f} 吨/公顷")
+    else:
+        possible_yield_cols = [
+            'Dry yield (tonne/ha)',
+            'Dry yield',
+            'Yield (tonne/ha)',
+            'Yield',
+            'dry_yield',
+            'yield_tonne_ha'
+        ]
+        yield_output = float('nan')
+        for col in possible_yield_cols:
+            if isinstance(model_result, pd.DataFrame) and col in model_result.columns:
+                yield_output = model_result[col].mean()
+                logger.info(f"预计产量: {yield_output:.2f} 吨/公顷 (使用列: {col})")
+                break
         
-        daily_crop_growth.to_csv(os.path.join(output_dir, "daily_crop_growth.csv"), index=False)
-        daily_water_storage.to_csv(os.path.join(output_dir, "daily_water_storage.csv"), index=False)
-        daily_water_flux.to_csv(os.path.join(output_dir, "aquacrop_daily_water_flux.csv"), index=False)
+        if pd.isna(yield_output):
+            logger.warning(f"未找到有效的产量列，可用列: {list(model_result.columns) if isinstance(model_result, pd.DataFrame) else 'N/A'}")
+            yield_output = 0.0
+    return {
+        'daily_crop_growth': daily_crop_growth,
+        'daily_water_storage': daily_water_storage,
+        'daily_water_flux': daily_water_flux,
+        'yield': float(yield_output),
+        'warm_start': warm_start
+    }
+
+def prepare_aquacrop_weather_file(app_config) -> str:
+    """将FAO模型的气象数据转换为AquaCrop格式并返回转换后的文件路径
+
+    FAO模型默认不再导出.wth文件,仅当其不早于CSV时才使用,避免读取过期数据
+    """
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
+    config = app_config.AQUACROP_CONFIG
+    fao_config = app_config.FAO_CONFIG
+    output_txt_path = os.path.join(project_root, config['WEATHER_OUTPUT_TXT'])
+    input_wth_path = os.path.join(project_root, fao_config['TEMP_WEATHER_FILE'])
+    input_csv_path = os.path.join(project_root, config['WEATHER_INPUT_CSV'])
+    wth_is_current = os.path.exists(input_wth_path) and (
+        not os.path.exists(input_csv_path) or
+        os.path.getmtime(input_wth_path) >= os.path.getmtime(input_csv_path))
+    if wth_is_current:
+        logger.info(f"使用.wth格式气象文件: {input_wth_path}")
+        converted_file = convert_irrigation_weather_to_aquacrop_format(input_wth_path, output_txt_path, config)
+    else:
+        if not os.path.exists(input_csv_path):
+            raise FileNotFoundError(f"未找到任何有效的气象数据文件: 既不存在.wth文件 {input_wth_path} 也不存在CSV文件 {input_csv_path}")
+        logger.info(f"使用CSV格式气象文件: {input_csv_path}")
+        converted_file = convert_irrigation_weather_to_aquacrop_format(input_csv_path, output_txt_path, config)
+    try:
+        filepath = get_filepath(converted_file)
+        logger.debug(f"获取到气象文件路径: {filepath}")
+    except Exception as e:
+        logger.error(f"获取气象文件路径失败: {str(e)}")
+        # 如果get_filepath失败，直接使用转换后的文件路径
+        filepath = converted_file
+        logger.info(f"使用转换后的文件路径: {filepath}")
+    
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"气象文件不存在: {filepath}")
+    return filepath
+
+def load_aquacrop_weather(filepath: str) -> pd.DataFrame:
+    """读取AquaCrop格式的气象文件"""
+    try:
+        weather_data = prepare_weather(filepath)
+        logger.info(f"成功加载气象数据，共 {len(weather_data)} 条记录")
+    except Exception as e:
+        logger.error(f"准备气象数据失败: {str(e)}")
+        raise
+    weather_data["Date"] = pd.to_datetime(weather_data["Date"])
+    return weather_data
+
+def resolve_soil_values(soil_params: Optional[Dict], config: dict) -> tuple:
+    """将传感器土壤参数换算为AquaCrop使用的体积含水量小数
+
+    Args:
+        soil_params: 传感器数据(含sat/fc/pwp，百分比或小数)；为None时使用配置文件默认值
+        config: AQUACROP_CONFIG
+
+    Returns:
+        tuple: (thS, thFC, thWP)，不符合 0 ≤ PWP < FC < SAT < 1 时使用配置文件默认值
+    """
+    def convert_to_decimal(value):
+        """将百分比值转换为小数（如果值大于1则除以100）
         
-        yield_col = 'Dry yield (tonne/ha)'
-        if isinstance(model_result, pd.DataFrame) and yield_col in model_result.columns:
-            yield_output = model_result[yield_col].mean()
-            logger.info(f"预计产量: {yield_output:.2f} 吨/公顷")
-        else:
-            possible_yield_cols = [
-                'Dry yield (tonne/ha)',
-                'Dry yield',
-                'Yield (tonne/ha)',
-                'Yield',
-                'dry_yield',
-                'yield_tonne_ha'
-            ]
-            yield_output = float('nan')
-            for col in possible_yield_cols:
-                if isinstance(model_result, pd.DataFrame) and col in model_result.columns:
-                    yield_output = model_result[col].mean()
-                    logger.info(f"预计产量: {yield_output:.2f} 吨/公顷 (使用列: {col})")
-                    break
+        Args:
+            value: 可能是百分比值或小数，也可能是 None
             
-            if pd.isna(yield_output):
-                logger.warning(f"未找到有效的产量列，可用列: {list(model_result.columns) if isinstance(model_result, pd.DataFrame) else 'N/A'}")
-                yield_output = 0.0
+        Returns:
+            float: 转换后的小数值
+        """
+        if value is None:
+            logger.warning("接收到 None 值，使用默认值 0.25")
+            return 0.25  # 默认田间持水量
+        
+        try:
+            value = float(value)
+            if value > 1:
+                return value / 100.0
+            return value
+        except (ValueError, TypeError) as e:
+            logger.warning(f"无法转换值 {value} 为数值，使用默认值 0.25: {e}")
+            return 0.25
+
+    if soil_params is None:
+        thS = config['SOIL_SATURATION']
+        thFC = config['SOIL_FIELD_CAPACITY']
+        thWP = config['SOIL_WILTING_POINT']
+        logger.info(f"使用配置文件参数: 饱和含水量={thS}, 田间持水量={thFC}, 凋萎点={thWP}")
+    else:
+        thS = convert_to_decimal(soil_params.get('sat', config['SOIL_SATURATION']))
+        thFC = convert_to_decimal(soil_params.get('fc', config['SOIL_FIELD_CAPACITY']))
+        thWP = convert_to_decimal(soil_params.get('pwp', config['SOIL_WILTING_POINT']))
+        logger.info(f"使用土壤传感器参数(转换后): 饱和含水量={thS:.3f}, 田间持水量={thFC:.3f}, 凋萎点={thWP:.3f}")
+    if not (0 <= thWP < thFC < thS < 1):
+        logger.warning(f"土壤参数不符合物理规律 (0 ≤ PWP({thWP:.3f}) < FC({thFC:.3f}) < SAT({thS:.3f}) < 1)，使用配置文件默认值")
+        thS = config['SOIL_SATURATION']
+        thFC = config['SOIL_FIELD_CAPACITY']
+        thWP = config['SOIL_WILTING_POINT']
+        logger.info(f"使用配置文件默认参数: 饱和含水量={thS}, 田间持水量={thFC}, 凋萎点={thWP}")
+    return thS, thFC, thWP
+
+def run_soil_simulation(config: dict, aquacrop_irr_config: dict, weather_data: pd.DataFrame, soil_values: tuple,
+                        output_dir: str, force_rerun: bool = False) -> tuple:
+    """运行一组土壤参数的整季模拟并保存到output_dir，输入与上次运行一致时直接使用上次的模拟结果
+
+    输入有变化时从output_dir中最后实测日的模型状态检查点继续模拟(WARM_START_ENABLED)，
+    force_rerun时删除检查点从头模拟
+
+    Returns:
+        tuple: (模拟结果dict, 是否复用了上次的结果)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    fingerprint = compute_run_fingerprint(weather_data, soil_values, config, aquacrop_irr_config)
+    if config.get('REUSE_PREVIOUS_RUN', True) and not force_rerun:
+        previous_run = load_previous_run(output_dir, fingerprint)
+        if previous_run is not None:
+            logger.info(f"模型输入未变化(指纹 {fingerprint[:12]})，复用上次的模拟结果: {output_dir}")
+            # 更新清单修改时间,记录结果在本次运行时仍是最新的(多田块输出按清单时间判断是否过期)
+            os.utime(os.path.join(output_dir, RUN_MANIFEST_FILE))
+            return previous_run, True
+    checkpoint_path, checkpoint_date = None, None
+    if config.get('WARM_START_ENABLED', True):
+        checkpoint_path = os.path.join(output_dir, MODEL_CHECKPOINT_FILE)
+        checkpoint_date = get_checkpoint_date(config)
+        if force_rerun and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+    run_results = simulate_season(config, weather_data, soil_values, aquacrop_irr_config,
+                                  checkpoint_path=checkpoint_path, checkpoint_date=checkpoint_date)
+    save_run_results(output_dir, fingerprint, run_results)
+    return run_results, False
+
+def save_growth_stages(daily_crop_growth: pd.DataFrame, output_dir: str) -> List[Dict]:
+    """划分生育期并保存到output_dir/growth_stages.csv，冠层覆盖度无法划分时使用基于DAP的标准生育期"""
+    stage_results = analyze_growth_stages(daily_crop_growth)
+    if not stage_results:
+        logger.warning("使用基于DAP的标准生育期")
+        stage_results = get_growth_stages_from_model(daily_crop_growth)
+    growth_stages_path = os.path.join(output_dir, 'growth_stages.csv')
+    pd.DataFrame(stage_results).to_csv(growth_stages_path, index=False)
+    logger.info(f"生育期数据已保存到: {growth_stages_path}")
+    return stage_results
+
+def run_model_and_save_results(force_rerun: bool = False) -> Dict:
+    """运行模型并保存结果
+
+    Args:
+        force_rerun: 为True时忽略上次的模拟结果，重新运行模拟
+    """
+    try:
+        logger.info("开始运行模型并保存结果")
+        model_irr_dir = os.path.dirname(__file__)
+        project_root = os.path.abspath(os.path.join(model_irr_dir, '../../'))
+        sys.path.append(project_root)
+        from config import current_config
+        app_config = current_config()
+        config = app_config.AQUACROP_CONFIG
+        validate_config(config)
+        images_dir = os.path.join(project_root, config['IMAGES_DIR'])
+        os.makedirs(images_dir, exist_ok=True)
+        weather_data = load_aquacrop_weather(prepare_aquacrop_weather_file(app_config))
+        try:
+            from src.devices.soil_sensor import SoilSensor
+            irrigation_config = app_config.IRRIGATION_CONFIG
+            device_id = irrigation_config.get('DEFAULT_DEVICE_ID', '16031600028481')
+            field_id = irrigation_config.get('DEFAULT_FIELD_ID', '1810564502987649024')
+            soil_params = SoilSensor(device_id, field_id).get_current_data()
+        except Exception as e:
+            logger.warning(f"获取土壤传感器数据失败，使用配置文件默认值: {str(e)}")
+            soil_params = None
+        soil_values = resolve_soil_values(soil_params, config)
+        # 合并AquaCrop灌溉配置
+        aquacrop_irr_config = {**config, **app_config.AQUACROP_IRRIGATION_CONFIG}
+        output_dir = os.path.join(project_root, config['OUTPUT_DIR'])
+        run_results, reused = run_soil_simulation(config, aquacrop_irr_config, weather_data, soil_values,
+                                                  output_dir, force_rerun=force_rerun)
+        daily_crop_growth = run_results['daily_crop_growth']
         daily_crop_growth_normalized = _normalize_column_names(daily_crop_growth)
         daily_crop_growth_filtered = daily_crop_growth_normalized[daily_crop_growth_normalized["_cc"] != 0]
         model_config = ModelConfig()
@@ -1366,7 +1578,10 @@ def run_model_and_save_results() -> Dict:
         })
         
         canopy_cover_img_path = os.path.join(images_dir, 'canopy_cover.png')
-        if daily_crop_growth_filtered.empty:
+        if reused and os.path.exists(canopy_cover_img_path):
+            # 冠层覆盖度图只取决于模拟结果,复用结果时无需重新绘制
+            logger.info(f"复用已有冠层覆盖度图表: {canopy_cover_img_path}")
+        elif daily_crop_growth_filtered.empty:
             logger.warning("冠层覆盖度全为0,创建空状态图表")
             with plt.rc_context(rc_params):
                 plt.figure(figsize=model_config.CHART_FIGSIZE)
@@ -1402,14 +1617,7 @@ def run_model_and_save_results() -> Dict:
         canopy_img_web_path = _get_web_path(canopy_cover_img_path, images_dir, static_url_prefix, static_root)
         logger.info(f"冠层覆盖度图表文件已保存到: {canopy_cover_img_path}")
         logger.info(f"冠层覆盖度图表Web路径: {canopy_img_web_path}")
-        stage_results = analyze_growth_stages(daily_crop_growth)
-        if not stage_results:
-            logger.warning("使用基于DAP的标准生育期")
-            stage_results = get_growth_stages_from_model(daily_crop_growth)
-        stage_df = pd.DataFrame(stage_results)
-        growth_stages_path = os.path.join(project_root, config['OUTPUT_DIR'], 'growth_stages.csv')
-        stage_df.to_csv(growth_stages_path, index=False)
-        logger.info(f"生育期数据已保存到: {growth_stages_path}")
+        stage_results = save_growth_stages(daily_crop_growth, output_dir)
         current_stage = get_current_growth_stage(stage_results)
         with open(os.path.join(images_dir, 'current_growth_stage.json'), 'w', encoding='utf-8') as f:
             json.dump(current_stage, f, ensure_ascii=False, indent=2)
@@ -1421,7 +1629,9 @@ def run_model_and_save_results() -> Dict:
             "stage_results": stage_results,
             "current_stage": current_stage,
             "canopy_cover_img": canopy_img_web_path,
-            "growth_stages_img": growth_stages_img_web_path
+            "growth_stages_img": growth_stages_img_web_path,
+            "reused": reused,
+            "warm_start": run_results.get('warm_start')
         }
         
     except Exception as e:
@@ -1,19 +1,25 @@
 from .soil_sensor import (
     SoilSensor,
+    SensorSnapshot,
+    sensor_cache,
     get_soil_parameters,
     save_real_humidity_data,
     get_history_humidity_data,
     fetch_daily_avg_df,
+    get_humidity_statistics,
     save_extremum_humidity_data,
     get_current_data
 )
 
 __all__ = [
     'SoilSensor',
+    'SensorSnapshot',
+    'sensor_cache',
     'get_soil_parameters',
     'save_real_humidity_data',
     'get_history_humidity_data',
     'fetch_daily_avg_df',
+    'get_humidity_statistics',
     'save_extremum_humidity_data',
     'get_current_data'
 ]
\ No newline at end of file
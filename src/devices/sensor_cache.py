@@ -0,0 +1,140 @@
+"""
+土壤传感器数据缓存
+按 (设备ID, 田块ID) 缓存 get_soil_parameters 的结果,由API路由与灌溉服务共用
+缓存策略:
+- TTL 内的数据直接返回(命中)
+- 超过 TTL 但未超过 TTL + STALE_TTL 的数据先返回旧值,同时在后台刷新(stale-while-revalidate)
+- 更旧或不存在的数据同步拉取,同一键的并发请求只拉取一次
+- 使用默认值降级的结果(is_real_data=False)只缓存 FALLBACK_TTL 秒,便于上游恢复后尽快更新
+- 超过 MAX_ENTRIES 时淘汰最久未使用的条目
+- 失效时同时作废该键的在途拉取,失效前发起的拉取结果不再写回缓存
+"""
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from loguru import logger
+
+class SensorDataCache:
+    """带TTL、后台刷新与按田块失效的传感器数据缓存"""
+
+    def __init__(self, loader, ttl=600, stale_ttl=1800, fallback_ttl=60, max_entries=256):
+        """
+        参数:
+            loader: 拉取函数 loader(device_id, field_id) -> dict
+            ttl: 数据保持新鲜的秒数
+            stale_ttl: 过期后仍可先返回旧值并后台刷新的秒数
+            fallback_ttl: 降级数据的缓存秒数
+            max_entries: 最大缓存条目数
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.fallback_ttl = fallback_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (数据, 写入时间, 有效秒数)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='sensor-refresh')
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'errors': 0, 'evictions': 0}
+
+    @staticmethod
+    def _key(device_id, field_id):
+        return (str(device_id), str(field_id))
+
+    def get(self, device_id, field_id):
+        """获取传感器数据
+
+        返回:
+            dict: 传感器数据(调用方可自由修改的副本)
+        """
+        key = self._key(device_id, field_id)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                data, stored_at, ttl = entry
+                age = now - stored_at
+                if age < ttl:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return dict(data)
+                if age < ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stats['stale_hits'] += 1
+                    if key not in self._inflight:
+                        future = self._inflight[key] = Future()
+                        self._executor.submit(self._load, key, future)
+                    return dict(data)
+            self.stats['misses'] += 1
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if owner:
+            self._load(key, future)
+        return dict(future.result())
+
+    def _load(self, key, future):
+        """拉取数据并写入缓存,结果同时交给等待同一键的调用方
+
+        拉取期间该键被失效(在途表中已不是本次的future)时,结果只交给等待方,不写回缓存
+        """
+        try:
+            data = self.loader(*key)
+            ttl = self.ttl if data.get('is_real_data', True) else min(self.ttl, self.fallback_ttl)
+            with self._lock:
+                self.stats['refreshes'] += 1
+                if self._inflight.get(key) is future:
+                    self._entries[key] = (dict(data), time.time(), ttl)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.stats['evictions'] += 1
+                else:
+                    logger.debug(f"传感器数据缓存已失效，丢弃失效前发起的拉取结果 device_id={key[0]}, field_id={key[1]}")
+            future.set_result(data)
+        except Exception as e:
+            logger.error(f"刷新传感器数据缓存失败 device_id={key[0]}, field_id={key[1]}: {str(e)}")
+            with self._lock:
+                self.stats['errors'] += 1
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+
+    def invalidate(self, field_id=None, device_id=None):
+        """使缓存失效,匹配键的在途拉取同时作废(结果不再写回缓存)
+
+        参数:
+            field_id: 只清除该田块的条目
+            device_id: 只清除该设备的条目;两者都为None时清空全部
+        返回:
+            int: 清除的条目数
+        """
+        def matches(key):
+            return ((device_id is None or key[0] == str(device_id))
+                    and (field_id is None or key[1] == str(field_id)))
+
+        with self._lock:
+            keys = [key for key in self._entries if matches(key)]
+            for key in keys:
+                del self._entries[key]
+            for key in [key for key in self._inflight if matches(key)]:
+                del self._inflight[key]
+        if keys:
+            logger.info(f"已清除 {len(keys)} 条传感器数据缓存 (field_id={field_id}, device_id={device_id})")
+        return len(keys)
+
+    def get_stats(self):
+        """获取缓存命中统计"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self._entries)
+        total = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['stale_hits']) / total if total else 0.0
+        stats['ttl'] = self.ttl
+        stats['stale_ttl'] = self.stale_ttl
+        stats['max_entries'] = self.max_entries
+        return stats
@@ -0,0 +1,236 @@
+"""
+传感器每日平均数据本地存储
+将 getDailyAvg 接口已拉取的逐日数据按 (设备, 日期) 保存在本地SQLite中,
+再次查询时只向上游请求本地尚未覆盖的日期,历史窗口越长节省越多
+表结构:
+- daily_avg: 每台设备每天一条原始记录(JSON)
+- coverage: 每台设备已完整拉取过的连续日期区间,区间内无记录的日期表示上游本身无数据
+- aggregates: 按 (设备, 起始日期, 截止日期) 累积的各深度湿度统计量(数量/总和/最大/最小/直方图),
+  新的日均值到达时只累加新增日期,SAT/PWP/FC 查询无需重新扫描整段历史
+最 REFRESH_DAYS 天(含当天)的日均值仍在变化,不计入已覆盖区间,每次都会重新拉取
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from loguru import logger
+
+DATE_FIELDS = ('msgTimeStr', 'dt')
+# 湿度直方图的分箱宽度(%),分位数误差不超过半个分箱
+HISTOGRAM_BIN_WIDTH = 0.1
+
+def _record_day(record):
+    """从原始记录中提取日期(YYYY-MM-DD),无法识别时返回None"""
+    for field in DATE_FIELDS:
+        value = record.get(field) if isinstance(record, dict) else None
+        if value:
+            try:
+                return datetime.strptime(str(value)[:10], '%Y-%m-%d').strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+    return None
+
+def _shift(day, days):
+    return (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=days)).strftime('%Y-%m-%d')
+
+def _accumulate(state, record):
+    """将一条日均值记录累加到统计状态中"""
+    for col, value in record.items():
+        if 'humidity' not in col.lower() or value is None or value == '':
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            continue
+        if value != value:
+            continue
+        entry = state.setdefault(col, {'n': 0, 'sum': 0.0, 'max': value, 'min': value, 'bins': {}})
+        entry['n'] += 1
+        entry['sum'] += value
+        entry['max'] = max(entry['max'], value)
+        entry['min'] = min(entry['min'], value)
+        key = str(int(round(value / HISTOGRAM_BIN_WIDTH)))
+        entry['bins'][key] = entry['bins'].get(key, 0) + 1
+
+def _quantile(entry, q):
+    """由直方图估算分位数"""
+    target = q * entry['n']
+    cumulative = 0
+    for key in sorted(entry['bins'], key=int):
+        cumulative += entry['bins'][key]
+        if cumulative >= target:
+            return min(max(round(int(key) * HISTOGRAM_BIN_WIDTH, 6), entry['min']), entry['max'])
+    return entry['max']
+
+def summarize_statistics(state):
+    """将统计状态转换为 {列名: {count, mean, max, min, p05, p50, p95}}"""
+    return {
+        col: {
+            'count': entry['n'],
+            'mean': entry['sum'] / entry['n'],
+            'max': entry['max'],
+            'min': entry['min'],
+            'p05': _quantile(entry, 0.05),
+            'p50': _quantile(entry, 0.5),
+            'p95': _quantile(entry, 0.95)
+        }
+        for col, entry in state.items() if entry['n'] > 0
+    }
+
+class SensorDailyStore:
+    """按设备和日期保存传感器每日平均数据的SQLite存储"""
+
+    def __init__(self, db_path, refresh_days=1):
+        """
+        参数:
+            db_path: SQLite文件路径
+            refresh_days: 最近多少天(含当天)的数据视为未定稿,每次重新拉取
+        """
+        self.db_path = db_path
+        self.refresh_days = max(1, int(refresh_days))
+        self.upstream_days = 0
+        self.local_days = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''CREATE TABLE IF NOT EXISTS daily_avg (
+                                device_id TEXT NOT NULL,
+                                day TEXT NOT NULL,
+                                record TEXT NOT NULL,
+                                fetched_at REAL NOT NULL,
+                                PRIMARY KEY (device_id, day))''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS coverage (
+                                device_id TEXT PRIMARY KEY,
+                                start_day TEXT NOT NULL,
+                                end_day TEXT NOT NULL)''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS aggregates (
+                                device_id TEXT NOT NULL,
+                                start_day TEXT NOT NULL,
+                                end_day TEXT NOT NULL,
+                                covered_to TEXT NOT NULL,
+                                state TEXT NOT NULL,
+                                PRIMARY KEY (device_id, start_day, end_day))''')
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _final_day(self):
+        """已定稿的最后一天,之后的数据每次重新拉取"""
+        return (datetime.now() - timedelta(days=self.refresh_days)).strftime('%Y-%m-%d')
+
+    def get_coverage(self, device_id):
+        """返回设备已覆盖的日期区间 (start_day, end_day),没有时返回None"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT start_day, end_day FROM coverage WHERE device_id = ?',
+                               (str(device_id),)).fetchone()
+        return tuple(row) if row else None
+
+    def missing_ranges(self, device_id, start_day, end_day):
+        """计算 [start_day, end_day] 中需要向上游请求的日期区间列表"""
+        coverage = self.get_coverage(device_id)
+        if coverage is None or coverage[0] > coverage[1]:
+            return [(start_day, end_day)]
+        covered_start, covered_end = coverage
+        ranges = []
+        if start_day < covered_start:
+            ranges.append((start_day, min(end_day, _shift(covered_start, -1))))
+        if end_day > covered_end:
+            ranges.append((max(start_day, _shift(covered_end, 1)), end_day))
+        return ranges
+
+    def save(self, device_id, start_day, end_day, records):
+        """保存一次上游拉取的结果并扩展覆盖区间
+
+        参数:
+            device_id: 设备ID
+            start_day, end_day: 本次拉取的日期区间
+            records: 上游返回的原始记录列表
+        返回:
+            bool: 所有记录都能识别日期并已保存时返回True
+        """
+        rows = []
+        for record in records or []:
+            day = _record_day(record)
+            if day is None:
+                logger.warning(f"设备 {device_id} 的每日平均数据缺少日期字段，不写入本地存储")
+                return False
+            rows.append((str(device_id), day, json.dumps(record, ensure_ascii=False), time.time()))
+
+        final_day = self._final_day()
+        with self._lock, self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO daily_avg VALUES (?, ?, ?, ?)', rows)
+            covered_end = min(end_day, final_day)
+            if start_day <= covered_end:
+                row = conn.execute('SELECT start_day, end_day FROM coverage WHERE device_id = ?',
+                                   (str(device_id),)).fetchone()
+                if row is None:
+                    new_range = (start_day, covered_end)
+                elif start_day <= _shift(row[1], 1) and covered_end >= _shift(row[0], -1):
+                    new_range = (min(start_day, row[0]), max(covered_end, row[1]))
+                else:
+                    # 与已有区间不相邻时保留较新的区间
+                    new_range = (start_day, covered_end) if covered_end > row[1] else tuple(row)
+                conn.execute('INSERT OR REPLACE INTO coverage VALUES (?, ?, ?)',
+                             (str(device_id), new_range[0], new_range[1]))
+        self.upstream_days += len(rows)
+        return True
+
+    def load(self, device_id, start_day, end_day):
+        """读取 [start_day, end_day] 内的原始记录,按日期升序"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT record FROM daily_avg WHERE device_id = ? AND day BETWEEN ? AND ? '
+                                'ORDER BY day', (str(device_id), start_day, end_day)).fetchall()
+        self.local_days += len(rows)
+        return [json.loads(row[0]) for row in rows]
+
+    def statistics(self, device_id, start_day, end_day):
+        """获取 [start_day, end_day] 内各深度湿度的统计量
+
+        已定稿日期的统计量持久化在aggregates表中,每次只累加上次之后新增的日期;
+        未定稿的最近几天在查询时临时合并,不写入累积状态
+        返回:
+            dict: {列名: {count, mean, max, min, p05, p50, p95}},列顺序与原始记录一致
+        """
+        device_id = str(device_id)
+        final_day = self._final_day()
+        # 截止日期已定稿的窗口固定不变,否则视为随时间增长的开放窗口
+        window_end = end_day if end_day <= final_day else ''
+        coverage = self.get_coverage(device_id)
+        persist = coverage is not None and coverage[0] <= start_day
+        aggregate_end = min(end_day, final_day, coverage[1]) if persist else _shift(start_day, -1)
+
+        with self._lock, self._connect() as conn:
+            row = conn.execute('SELECT covered_to, state FROM aggregates WHERE device_id = ? AND start_day = ? '
+                               'AND end_day = ?', (device_id, start_day, window_end)).fetchone() if persist else None
+            covered_to, state = (row[0], json.loads(row[1])) if row else (_shift(start_day, -1), {})
+            if aggregate_end > covered_to:
+                for (record,) in conn.execute('SELECT record FROM daily_avg WHERE device_id = ? AND day > ? '
+                                              'AND day <= ? ORDER BY day', (device_id, covered_to, aggregate_end)):
+                    _accumulate(state, json.loads(record))
+                covered_to = aggregate_end
+                conn.execute('INSERT OR REPLACE INTO aggregates VALUES (?, ?, ?, ?, ?)',
+                             (device_id, start_day, window_end, covered_to, json.dumps(state)))
+            # 未写入累积状态的日期(未定稿或尚未覆盖)在查询时临时合并
+            live_start = max(start_day, _shift(covered_to, 1))
+            if live_start <= end_day:
+                for (record,) in conn.execute('SELECT record FROM daily_avg WHERE device_id = ? AND day BETWEEN ? '
+                                              'AND ? ORDER BY day', (device_id, live_start, end_day)):
+                    _accumulate(state, json.loads(record))
+        return summarize_statistics(state)
+
+    def get_stats(self):
+        """获取存储统计"""
+        with self._connect() as conn:
+            records = conn.execute('SELECT COUNT(*) FROM daily_avg').fetchone()[0]
+            devices = conn.execute('SELECT COUNT(*) FROM coverage').fetchone()[0]
+            aggregates = conn.execute('SELECT COUNT(*) FROM aggregates').fetchone()[0]
+        return {
+            'records': records,
+            'devices': devices,
+            'aggregates': aggregates,
+            'upstream_days': self.upstream_days,
+            'local_days': self.local_days
+        }
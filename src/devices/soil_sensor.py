@@ -17,6 +17,20 @@ API配置:
 - API_MAX_RETRIES : API最大重试次数 (3次)
 - API_MAX_WAIT_TIME : API最大等待时间 (10秒)
 - HEALTH_CHECK_TIMEOUT : 健康检查超时时间 (5秒)
+- FETCH_DEADLINE : get_soil_parameters 并发拉取的总时限 (30秒)
+- FETCH_MAX_WORKERS : 并发拉取线程数 (16)
+- HTTP_POOL_CONNECTIONS / HTTP_POOL_MAXSIZE : HTTP连接池数量与每个池的最大连接数 (10 / 32)
+- REQUEST_COALESCING : 是否合并相同的在途请求 (True)
+每日平均数据本地存储：
+- DAILY_AVG_STORE_ENABLED : 是否启用本地存储，只向上游请求缺失的日期 (True)
+- DAILY_AVG_STORE_PATH : SQLite文件路径 (data/sensor/daily_avg.sqlite3)
+- DAILY_AVG_REFRESH_DAYS : 最近几天(含当天)的日均值每次重新拉取 (1)
+  SAT/PWP/FC 使用本地存储中按设备与日期窗口增量累积的统计量(get_humidity_statistics)
+传感器数据缓存(SoilSensor.get_current_data 共用 sensor_cache)：
+- SENSOR_CACHE_TTL : 数据保持新鲜的秒数 (600)
+- SENSOR_CACHE_STALE_TTL : 过期后先返回旧值并后台刷新的秒数 (1800)
+- SENSOR_CACHE_FALLBACK_TTL : 降级默认值的缓存秒数 (60)
+- SENSOR_CACHE_MAX_ENTRIES : 最大缓存条目数 (256)
 熔断器配置：
 - CIRCUIT_BREAKER_FAILURE_THRESHOLD : 熔断器失败阈值 (5次)
 - CIRCUIT_BREAKER_RECOVERY_TIMEOUT : 熔断器恢复超时时间 (60秒)
@@ -45,8 +59,13 @@ import os
 import sys
 import json
 import time
+import bisect
+import asyncio
+import contextvars
 import requests
+import threading
 import pandas as pd
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
@@ -58,6 +77,9 @@ import sys
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.insert(0, project_root)
 
+from src.devices.sensor_store import SensorDailyStore
+from src.devices.sensor_cache import SensorDataCache
+
 # ==================== 1. SoilSensorConfig（配置） ====================
 
 class SoilSensorConfig:
@@ -86,6 +108,12 @@ class SoilSensorConfig:
         logger.info("成功加载土壤传感器配置")
 
 config = SoilSensorConfig()
+
+# 当前请求的传感器快照，用于统计该请求实际发起的上游调用次数
+_upstream_recorder = contextvars.ContextVar('soil_upstream_recorder', default=None)
+
+# 延迟直方图的分桶上界（毫秒）
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 15000)
 # ==================== 2. APIClient（请求 + 重试） ====================
 class APIClient:
     """API客户端,负责处理所有外部API调用"""
@@ -100,61 +128,78 @@ class APIClient:
             'failure_threshold': defaults['CIRCUIT_BREAKER_FAILURE_THRESHOLD'],
             'recovery_timeout': defaults['CIRCUIT_BREAKER_RECOVERY_TIMEOUT']  # 秒
         }
+        # get_soil_parameters 会在多个线程中并发调用同一客户端，熔断器状态的读写需要加锁
+        self._cb_lock = threading.Lock()
         retry_strategy = Retry(
             total=defaults['RETRY_TOTAL'],  # 减少重试次数
             backoff_factor=defaults['RETRY_BACKOFF_FACTOR'],  # 增加退避时间
             status_forcelist=(429, 500, 502, 503, 504),
             allowed_methods=("POST",)
         )
-        # 挂载适配器
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # 挂载适配器，连接池大小需覆盖 get_soil_parameters 与批量决策的并发量
+        adapter = HTTPAdapter(
+            max_retries=retry_strategy,
+            pool_connections=defaults.get('HTTP_POOL_CONNECTIONS', 10),
+            pool_maxsize=defaults.get('HTTP_POOL_MAXSIZE', 32),
+            pool_block=defaults.get('HTTP_POOL_BLOCK', False)
+        )
         self.session.mount("https://", adapter)
         self.session.mount("http://", adapter)
         self.headers = {
             'Content-Type': 'application/x-www-form-urlencoded',
-            'Authorization': api_key or config.DEFAULT_API_KEY
+            'Authorization': api_key or config.DEFAULT_API_KEY,
+            'Connection': 'keep-alive'
         }
+        # 在途请求合并（single-flight）与各端点延迟统计
+        self.coalesce_requests = defaults.get('REQUEST_COALESCING', True)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._coalesced = {}
+        self._latency = {}
+        self._latency_lock = threading.Lock()
     
     def _check_circuit_breaker(self):
         """检查熔断器状态"""
-        cb = self.circuit_breaker
+        with self._cb_lock:
+            cb = self.circuit_breaker
         
-        if cb['state'] == 'open':
-            # 检查是否可以尝试恢复
-            if cb['last_failure_time'] and \
-               time.time() - cb['last_failure_time'] > cb['recovery_timeout']:
-                cb['state'] = 'half_open'
-                logger.info("熔断器进入半开状态，尝试恢复")
-                return True
-            else:
-                logger.warning("熔断器处于开启状态，跳过API调用")
-                return False
+            if cb['state'] == 'open':
+                # 检查是否可以尝试恢复
+                if cb['last_failure_time'] and \
+                   time.time() - cb['last_failure_time'] > cb['recovery_timeout']:
+                    cb['state'] = 'half_open'
+                    logger.info("熔断器进入半开状态，尝试恢复")
+                    return True
+                else:
+                    logger.warning("熔断器处于开启状态，跳过API调用")
+                    return False
         
-        return True
+            return True
     
     def _record_success(self):
         """记录成功调用"""
-        cb = self.circuit_breaker
-        if cb['state'] == 'half_open':
-            cb['state'] = 'closed'
-            cb['failure_count'] = 0
-            logger.info("熔断器恢复到关闭状态")
-        elif cb['state'] == 'closed':
-            cb['failure_count'] = max(0, cb['failure_count'] - 1)
+        with self._cb_lock:
+            cb = self.circuit_breaker
+            if cb['state'] == 'half_open':
+                cb['state'] = 'closed'
+                cb['failure_count'] = 0
+                logger.info("熔断器恢复到关闭状态")
+            elif cb['state'] == 'closed':
+                cb['failure_count'] = max(0, cb['failure_count'] - 1)
     
     def _record_failure(self):
         """记录失败调用"""
-        cb = self.circuit_breaker
-        cb['failure_count'] += 1
-        cb['last_failure_time'] = time.time()
+        with self._cb_lock:
+            cb = self.circuit_breaker
+            cb['failure_count'] += 1
+            cb['last_failure_time'] = time.time()
         
-        if cb['failure_count'] >= cb['failure_threshold']:
-            cb['state'] = 'open'
-            logger.error(f"熔断器开启，连续失败{cb['failure_count']}次")
+            if cb['failure_count'] >= cb['failure_threshold']:
+                cb['state'] = 'open'
+                logger.error(f"熔断器开启，连续失败{cb['failure_count']}次")
     
-    def make_request(self, endpoint, data, timeout=None, max_retries=None):
-        """统一的API请求方法，带有熔断器和智能重试"""
-        
+    def _prepare_request(self, endpoint, data, timeout, max_retries):
+        """补全默认参数与token，返回 (url, data, timeout, max_retries)"""
         # 从配置获取默认值
         defaults = config.soil_defaults
         if timeout is None:
@@ -162,10 +207,6 @@ class APIClient:
         if max_retries is None:
             max_retries = defaults['API_MAX_RETRIES']
         
-        # 检查熔断器
-        if not self._check_circuit_breaker():
-            return None
-        
         # 确保data是字典类型，并自动添加token参数
         if data is None:
             data = {}
@@ -180,69 +221,217 @@ class APIClient:
             logger.debug(f"自动添加token参数到POST数据中")
         
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        return url, data, timeout, max_retries
+    
+    @staticmethod
+    def _backoff_seconds(attempt):
+        """第attempt次重试前的指数退避等待时间"""
+        return min(2 ** attempt, config.soil_defaults['API_MAX_WAIT_TIME'])  # 最大等待时间从配置获取
+    
+    def _attempt(self, endpoint, url, data, timeout, attempt, max_retries):
+        """执行一次HTTP请求
         
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"调用API (尝试 {attempt + 1}/{max_retries}): url={url}")
-                
-                # 指数退避
-                if attempt > 0:
-                    max_wait = defaults['API_MAX_WAIT_TIME']
-                    wait_time = min(2 ** attempt, max_wait)  # 最大等待时间从配置获取
-                    logger.info(f"等待 {wait_time} 秒后重试...")
-                    time.sleep(wait_time)
-                
-                response = self.session.post(url, headers=self.headers, data=data, timeout=timeout)
-                
-                if response.status_code == 200:
-                    try:
-                        result = response.json()
-                        self._record_success()
-                        logger.info(f"API调用成功: {endpoint}")
-                        return result
-                    except json.JSONDecodeError as e:
-                        logger.error(f"JSON解析失败: {str(e)}")
-                        self._record_failure()
-                        if attempt == max_retries - 1:
-                            return None
-                        continue
-                
-                elif response.status_code in (429, 500, 502, 503, 504):
-                    logger.warning(f"API返回可重试错误: HTTP {response.status_code}")
-                    self._record_failure()
-                    if attempt == max_retries - 1:
-                        logger.error(f"API请求最终失败: HTTP {response.status_code}")
-                        return None
-                    continue
-                
-                else:
-                    logger.error(f"API请求失败: HTTP {response.status_code}")
+        Returns:
+            tuple: (result, retry) - retry为True时表示可以进行下一次尝试
+        """
+        is_last = attempt == max_retries - 1
+        recorder = _upstream_recorder.get()
+        if recorder is not None:
+            recorder.record_upstream_call(endpoint)
+        start = time.perf_counter()
+        try:
+            logger.info(f"调用API (尝试 {attempt + 1}/{max_retries}): url={url}")
+            response = self.session.post(url, headers=self.headers, data=data, timeout=timeout)
+            self._record_latency(endpoint, time.perf_counter() - start)
+            
+            if response.status_code == 200:
+                try:
+                    result = response.json()
+                    self._record_success()
+                    logger.info(f"API调用成功: {endpoint}")
+                    return result, False
+                except json.JSONDecodeError as e:
+                    logger.error(f"JSON解析失败: {str(e)}")
                     self._record_failure()
-                    return None
-                    
-            except requests.exceptions.Timeout:
-                logger.warning(f"API请求超时 (尝试 {attempt + 1}/{max_retries})")
+                    return None, not is_last
+            
+            elif response.status_code in (429, 500, 502, 503, 504):
+                logger.warning(f"API返回可重试错误: HTTP {response.status_code}")
                 self._record_failure()
-                if attempt == max_retries - 1:
-                    logger.error("API请求最终超时")
-                    return None
-                continue
-                
-            except requests.exceptions.ConnectionError as e:
-                logger.warning(f"连接错误 (尝试 {attempt + 1}/{max_retries}): {str(e)}")
+                if is_last:
+                    logger.error(f"API请求最终失败: HTTP {response.status_code}")
+                return None, not is_last
+            
+            else:
+                logger.error(f"API请求失败: HTTP {response.status_code}")
                 self._record_failure()
-                if attempt == max_retries - 1:
-                    logger.error(f"API连接最终失败: {str(e)}")
-                    return None
-                continue
+                return None, False
                 
-            except requests.exceptions.RequestException as e:
-                logger.error(f"API请求异常: {str(e)}")
-                self._record_failure()
-                return None
+        except requests.exceptions.Timeout:
+            self._record_latency(endpoint, time.perf_counter() - start)
+            logger.warning(f"API请求超时 (尝试 {attempt + 1}/{max_retries})")
+            self._record_failure()
+            if is_last:
+                logger.error("API请求最终超时")
+            return None, not is_last
+            
+        except requests.exceptions.ConnectionError as e:
+            self._record_latency(endpoint, time.perf_counter() - start)
+            logger.warning(f"连接错误 (尝试 {attempt + 1}/{max_retries}): {str(e)}")
+            self._record_failure()
+            if is_last:
+                logger.error(f"API连接最终失败: {str(e)}")
+            return None, not is_last
+            
+        except requests.exceptions.RequestException as e:
+            self._record_latency(endpoint, time.perf_counter() - start)
+            logger.error(f"API请求异常: {str(e)}")
+            self._record_failure()
+            return None, False
+    
+    def _execute(self, endpoint, url, data, timeout, max_retries):
+        """同步执行带重试的请求"""
+        for attempt in range(max_retries):
+            # 指数退避
+            if attempt > 0:
+                wait_time = self._backoff_seconds(attempt)
+                logger.info(f"等待 {wait_time} 秒后重试...")
+                time.sleep(wait_time)
+            result, retry = self._attempt(endpoint, url, data, timeout, attempt, max_retries)
+            if not retry:
+                return result
+        return None
+    
+    async def _execute_async(self, endpoint, url, data, timeout, max_retries):
+        """异步执行带重试的请求，退避等待不占用线程
         
+        HTTP请求在默认线程池中执行；run_in_executor不会传递contextvars，
+        在当前上下文的副本中运行，使请求级的上游调用统计同样覆盖异步调用
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(max_retries):
+            if attempt > 0:
+                wait_time = self._backoff_seconds(attempt)
+                logger.info(f"等待 {wait_time} 秒后重试...")
+                await asyncio.sleep(wait_time)
+            result, retry = await loop.run_in_executor(
+                None, contextvars.copy_context().run,
+                self._attempt, endpoint, url, data, timeout, attempt, max_retries)
+            if not retry:
+                return result
         return None
     
+    def _join_inflight(self, endpoint, data):
+        """合并相同的在途请求
+        
+        Returns:
+            tuple: (key, future, is_leader) - is_leader为True时由调用方发起上游请求并写入future
+        """
+        key = (endpoint, tuple(sorted((str(k), str(v)) for k, v in data.items())))
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self._coalesced[endpoint] = self._coalesced.get(endpoint, 0) + 1
+                return key, future, False
+            future = Future()
+            self._inflight[key] = future
+            return key, future, True
+    
+    def _finish_inflight(self, key, future, result=None, error=None):
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    
+    def make_request(self, endpoint, data, timeout=None, max_retries=None):
+        """统一的API请求方法，带有熔断器和智能重试
+        
+        相同端点、相同参数的并发请求只向上游发起一次，其余调用等待并共享同一结果
+        """
+        # 检查熔断器
+        if not self._check_circuit_breaker():
+            return None
+        
+        url, data, timeout, max_retries = self._prepare_request(endpoint, data, timeout, max_retries)
+        if not self.coalesce_requests:
+            return self._execute(endpoint, url, data, timeout, max_retries)
+        
+        key, future, is_leader = self._join_inflight(endpoint, data)
+        if not is_leader:
+            logger.debug(f"合并在途请求: {endpoint}")
+            return future.result()
+        try:
+            result = self._execute(endpoint, url, data, timeout, max_retries)
+        except Exception as e:
+            self._finish_inflight(key, future, error=e)
+            raise
+        self._finish_inflight(key, future, result)
+        return result
+    
+    async def make_request_async(self, endpoint, data, timeout=None, max_retries=None):
+        """make_request的异步版本，熔断器、重试与请求合并语义相同
+        
+        与同步调用共用在途请求表，相同请求无论来自同步还是异步调用都只向上游发起一次
+        """
+        if not self._check_circuit_breaker():
+            return None
+        
+        url, data, timeout, max_retries = self._prepare_request(endpoint, data, timeout, max_retries)
+        if not self.coalesce_requests:
+            return await self._execute_async(endpoint, url, data, timeout, max_retries)
+        
+        key, future, is_leader = self._join_inflight(endpoint, data)
+        if not is_leader:
+            logger.debug(f"合并在途请求: {endpoint}")
+            # shield: 当前协程被取消时不取消共享的future，其他等待方仍能拿到结果
+            return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            result = await self._execute_async(endpoint, url, data, timeout, max_retries)
+        except BaseException as e:
+            self._finish_inflight(key, future, error=e)
+            raise
+        self._finish_inflight(key, future, result)
+        return result
+    
+    def _record_latency(self, endpoint, seconds):
+        """记录一次HTTP调用耗时到对应端点的直方图"""
+        elapsed_ms = seconds * 1000
+        with self._latency_lock:
+            stats = self._latency.get(endpoint)
+            if stats is None:
+                stats = {'count': 0, 'sum_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+                self._latency[endpoint] = stats
+            stats['count'] += 1
+            stats['sum_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['buckets'][bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+    
+    def get_latency_stats(self):
+        """获取各端点的延迟直方图与请求合并次数
+        
+        Returns:
+            dict: {端点: {'count', 'avg_ms', 'max_ms', 'histogram': {'<=50ms': n, ..., '>15000ms': n}, 'coalesced'}}
+        """
+        labels = [f'<={bound}ms' for bound in LATENCY_BUCKETS_MS] + [f'>{LATENCY_BUCKETS_MS[-1]}ms']
+        with self._latency_lock:
+            latency = {endpoint: dict(stats, buckets=list(stats['buckets'])) for endpoint, stats in self._latency.items()}
+        with self._inflight_lock:
+            coalesced = dict(self._coalesced)
+        
+        result = {}
+        for endpoint in set(latency) | set(coalesced):
+            stats = latency.get(endpoint, {'count': 0, 'sum_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * len(labels)})
+            result[endpoint] = {
+                'count': stats['count'],
+                'avg_ms': round(stats['sum_ms'] / stats['count'], 1) if stats['count'] else 0.0,
+                'max_ms': round(stats['max_ms'], 1),
+                'histogram': dict(zip(labels, stats['buckets'])),
+                'coalesced': coalesced.get(endpoint, 0)
+            }
+        return result
+    
     def health_check(self):
         """API健康检查"""
         try:
@@ -335,8 +524,30 @@ class DataProcessor:
 
 # ==================== 4. fetch_daily_avg_df（统一拉取入口） ====================
 
-def fetch_daily_avg_df(device_id, start_day, end_day):
-    """统一的每日平均数据拉取入口"""
+_daily_store = None
+_daily_store_failed = False
+_daily_store_lock = threading.Lock()
+
+def _get_daily_store():
+    """获取每日平均数据本地存储，未启用或初始化失败时返回None"""
+    global _daily_store, _daily_store_failed
+    if not config.soil_defaults.get('DAILY_AVG_STORE_ENABLED', False) or _daily_store_failed:
+        return None
+    with _daily_store_lock:
+        if _daily_store is None and not _daily_store_failed:
+            try:
+                db_path = config.soil_defaults['DAILY_AVG_STORE_PATH']
+                if not os.path.isabs(db_path):
+                    db_path = os.path.join(project_root, db_path)
+                _daily_store = SensorDailyStore(db_path, config.soil_defaults.get('DAILY_AVG_REFRESH_DAYS', 1))
+                logger.info(f"每日平均数据本地存储已启用: {db_path}")
+            except Exception as e:
+                logger.error(f"初始化每日平均数据本地存储失败: {str(e)}，直接请求上游")
+                _daily_store_failed = True
+        return _daily_store
+
+def _request_daily_avg(device_id, start_day, end_day):
+    """向上游请求每日平均数据，返回原始记录列表，失败时返回None"""
     data = {
         'deviceCode': device_id,
         'startDay': start_day,
@@ -344,11 +555,77 @@ def fetch_daily_avg_df(device_id, start_day, end_day):
     }
     response = api_client.make_request(config.DAILY_AVG_ENDPOINT, data)
     if response and response.get('success'):
-        df, success = DataProcessor.validate_and_process_data(response.get('data', []))
+        return response.get('data') or []
+    return None
+
+def _sync_daily_store(store, device_id, start_day, end_day):
+    """向上游补齐本地存储中缺失的日期
+    
+    Returns:
+        bool: 上游记录无法写入本地存储(缺少日期字段)时返回False
+    """
+    for missing_start, missing_end in store.missing_ranges(device_id, start_day, end_day):
+        records = _request_daily_avg(device_id, missing_start, missing_end)
+        if records is None:
+            logger.warning(f"获取每日平均数据失败: {missing_start} 到 {missing_end}，使用本地已有数据")
+            continue
+        if not store.save(device_id, missing_start, missing_end, records):
+            return False
+    return True
+
+def fetch_daily_avg_df(device_id, start_day, end_day):
+    """统一的每日平均数据拉取入口
+    
+    启用本地存储时只向上游请求本地尚未覆盖的日期，其余日期从本地读取
+    """
+    store = _get_daily_store()
+    if store is not None:
+        try:
+            if _sync_daily_store(store, device_id, start_day, end_day):
+                df, success = DataProcessor.validate_and_process_data(store.load(device_id, start_day, end_day))
+                return df if success else pd.DataFrame()
+        except Exception as e:
+            logger.error(f"读取每日平均数据本地存储失败: {str(e)}，直接请求上游")
+
+    records = _request_daily_avg(device_id, start_day, end_day)
+    if records is not None:
+        df, success = DataProcessor.validate_and_process_data(records)
         return df if success else pd.DataFrame()
     logger.warning("获取每日平均数据失败")
     return pd.DataFrame()
 
+def get_humidity_statistics(device_id, start_day, end_day):
+    """获取日期范围内各深度湿度的统计量
+    
+    启用本地存储时使用增量累积的统计量，只补齐新增日期；否则拉取整段数据后计算
+    Returns:
+        dict: {湿度列名: {count, mean, max, min, p05, p50, p95}}，无数据时为空字典
+    """
+    store = _get_daily_store()
+    if store is not None:
+        try:
+            if _sync_daily_store(store, device_id, start_day, end_day):
+                return store.statistics(device_id, start_day, end_day)
+        except Exception as e:
+            logger.error(f"读取湿度累积统计失败: {str(e)}，使用完整数据计算")
+
+    df = fetch_daily_avg_df(device_id, start_day, end_day)
+    stats = {}
+    for col in [col for col in df.columns if 'humidity' in col.lower()]:
+        values = pd.to_numeric(df[col], errors='coerce').dropna()
+        if values.empty:
+            continue
+        stats[col] = {
+            'count': int(values.count()),
+            'mean': float(values.mean()),
+            'max': float(values.max()),
+            'min': float(values.min()),
+            'p05': float(values.quantile(0.05)),
+            'p50': float(values.quantile(0.5)),
+            'p95': float(values.quantile(0.95))
+        }
+    return stats
+
 # ==================== 5. save_real_humidity_data（实时湿度） ====================
 def save_real_humidity_data(field_id):
     """获取实时土壤湿度数据"""
@@ -420,20 +697,15 @@ def get_sat_pwp_data(device_id, field_id=None):
             start_day = start_date.strftime('%Y-%m-%d')
             end_day = end_date.strftime('%Y-%m-%d')
             logger.info(f"获取饱和含水量(SAT)和凋萎点(PWP)数据: 使用默认日期范围 {start_day} 到 {end_day}")
-        df = fetch_daily_avg_df(device_id, start_day, end_day)
-        if df.empty:
-            logger.warning("无法获取SAT/PWP历史数据,使用默认值")
-            defaults = config.soil_defaults
-            return defaults['DEFAULT_SAT'], defaults['DEFAULT_PWP']
-        humidity_cols = [col for col in df.columns if 'humidity' in col.lower()]
-        if humidity_cols:
-            col = humidity_cols[0]
-            sat = float(df[col].max())  #
-            pwp = float(df[col].min())  
+        stats = get_humidity_statistics(device_id, start_day, end_day)
+        if stats:
+            col = next(iter(stats))
+            sat = float(stats[col]['max'])
+            pwp = float(stats[col]['min'])
             logger.info(f"计算得到 SAT: {sat}, PWP: {pwp}")
             return sat, pwp
         else:
-            logger.warning("无湿度数据,使用默认SAT/PWP值")
+            logger.warning("无法获取SAT/PWP历史湿度数据,使用默认值")
             defaults = config.soil_defaults
             return defaults['DEFAULT_SAT'], defaults['DEFAULT_PWP']
             
@@ -478,19 +750,14 @@ def get_field_capacity_data(device_id, field_id=None):
             
             logger.info(f"获取田间持水量(FC)数据: 使用默认日期范围 {start_day} 到 {end_day}")
         
-        df = fetch_daily_avg_df(device_id, start_day, end_day)
-        if df.empty:
-            logger.warning("无法获取FC历史数据,使用默认值")
-            defaults = config.soil_defaults
-            return defaults['DEFAULT_FC']
-        humidity_cols = [col for col in df.columns if 'humidity' in col.lower()]
-        if humidity_cols:
-            col = humidity_cols[0]
-            fc = float(df[col].mean()) 
+        stats = get_humidity_statistics(device_id, start_day, end_day)
+        if stats:
+            col = next(iter(stats))
+            fc = float(stats[col]['mean'])
             logger.info(f"计算得到 FC: {fc}")
             return fc
         else:
-            logger.warning("无湿度数据,使用默认FC值")
+            logger.warning("无法获取FC历史湿度数据,使用默认值")
             defaults = config.soil_defaults
             return defaults['DEFAULT_FC']
             
@@ -501,6 +768,46 @@ def get_field_capacity_data(device_id, field_id=None):
 
 # ==================== 7. get_soil_parameters（聚合指标：max/min、SAT/PWP、FC、real） ====================
 
+_fetch_executor = None
+_fetch_executor_lock = threading.Lock()
+
+def _get_fetch_executor():
+    """获取传感器数据并发拉取共用的线程池"""
+    global _fetch_executor
+    with _fetch_executor_lock:
+        if _fetch_executor is None:
+            max_workers = config.soil_defaults.get('FETCH_MAX_WORKERS', 8)
+            _fetch_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='soil-fetch')
+        return _fetch_executor
+
+def _run_concurrently(tasks, deadline=None):
+    """并发执行相互独立的拉取任务
+    
+    Args:
+        tasks: {名称: (无参可调用对象, 默认值)}
+        deadline: 总时限(秒)，None表示不限
+    Returns:
+        dict: {名称: 结果}，抛出异常或超过总时限的任务返回其默认值
+    """
+    executor = _get_fetch_executor()
+    # 每个任务复制一份上下文，使请求级的上游调用统计在线程池中依然生效
+    futures = {name: executor.submit(contextvars.copy_context().run, func) for name, (func, _) in tasks.items()}
+    done, not_done = wait(futures.values(), timeout=deadline)
+    results = {}
+    for name, future in futures.items():
+        default = tasks[name][1]
+        if future in not_done:
+            future.cancel()
+            logger.warning(f"{name} 数据获取超过总时限 {deadline} 秒，使用默认值")
+            results[name] = default
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            logger.error(f"{name} 数据获取失败: {str(e)}，使用默认值")
+            results[name] = default
+    return results
+
 def get_soil_parameters(device_id, field_id):
     """获取所有土壤参数的聚合函数"""
     logger.info(f"获取土壤参数: device_id={device_id}, field_id={field_id}")
@@ -524,6 +831,20 @@ def get_soil_parameters(device_id, field_id):
         # 优先检查是否有手动配置的土壤参数
         from config import Config
         manual_params = Config.get_field_soil_params(field_id)
+        defaults = config.soil_defaults
+        start_day, end_day = DataProcessor.get_date_range()
+        
+        # 各项数据互不依赖，并发获取；超过总时限仍未返回的项按原逻辑降级为默认值
+        tasks = {
+            'real_humidity': (lambda: save_real_humidity_data(field_id),
+                              (defaults['DEFAULT_REAL_HUMIDITY'], False)),
+            'daily_avg': (lambda: fetch_daily_avg_df(device_id, start_day, end_day), pd.DataFrame())
+        }
+        if not manual_params:
+            tasks['sat_pwp'] = (lambda: get_sat_pwp_data(device_id, field_id),
+                                (defaults['DEFAULT_SAT'], defaults['DEFAULT_PWP']))
+            tasks['fc'] = (lambda: get_field_capacity_data(device_id, field_id), defaults['DEFAULT_FC'])
+        results = _run_concurrently(tasks, defaults.get('FETCH_DEADLINE'))
         
         if manual_params:
             # 使用手动配置的参数
@@ -533,17 +854,15 @@ def get_soil_parameters(device_id, field_id):
             pwp = manual_params['pwp']
         else:
             # 使用统计方法获取SAT/PWP和FC
-            sat, pwp = get_sat_pwp_data(device_id, field_id)
-            fc = get_field_capacity_data(device_id, field_id)
+            sat, pwp = results['sat_pwp']
+            fc = results['fc']
             logger.info(f"[田块 {field_id}] 使用统计方法获取的土壤参数: SAT={sat}%, FC={fc}%, PWP={pwp}%")
         
-        real_humidity, real_humidity_is_real = save_real_humidity_data(field_id)
-        start_day, end_day = DataProcessor.get_date_range()
-        df = fetch_daily_avg_df(device_id, start_day, end_day)
+        real_humidity, real_humidity_is_real = results['real_humidity']
+        df = results['daily_avg']
         
         # 判断数据是否真实：如果SAT、FC、PWP或实时湿度中至少有一个是真实获取的，就认为数据可用
         # 检查SAT、FC、PWP是否为默认值（如果是默认值，说明获取失败）
-        defaults = config.soil_defaults
         sat_is_real = sat != defaults['DEFAULT_SAT']
         fc_is_real = fc != defaults['DEFAULT_FC']
         pwp_is_real = pwp != defaults['DEFAULT_PWP']
@@ -637,6 +956,16 @@ def get_history_humidity_data(device_id, days=None):
         logger.error(f"获取历史湿度数据失败: {str(e)}")
         return pd.DataFrame()
 
+# 全局传感器数据缓存实例，API路由与灌溉服务共用
+_cache_defaults = config.soil_defaults
+sensor_cache = SensorDataCache(
+    lambda device_id, field_id: get_soil_parameters(device_id, field_id),
+    ttl=_cache_defaults.get('SENSOR_CACHE_TTL', 600),
+    stale_ttl=_cache_defaults.get('SENSOR_CACHE_STALE_TTL', 1800),
+    fallback_ttl=_cache_defaults.get('SENSOR_CACHE_FALLBACK_TTL', 60),
+    max_entries=_cache_defaults.get('SENSOR_CACHE_MAX_ENTRIES', 256)
+)
+
 # ==================== 8. SoilSensor（OO 封装） ====================
 
 class SoilSensor:
@@ -652,14 +981,68 @@ class SoilSensor:
             self.use_mock = False
             logger.info(f"SoilSensor初始化: 配置获取失败({str(e)}),默认使用真实API")
     
-    def get_current_data(self):
-        """获取当前土壤数据"""
+    def get_current_data(self, use_cache=True):
+        """获取当前土壤数据
+        
+        Args:
+            use_cache: 是否使用共享的传感器数据缓存，False时直接请求上游
+        """
+        if use_cache:
+            return sensor_cache.get(self.device_id, self.field_id)
         return get_soil_parameters(self.device_id, self.field_id)
     
     def get_history_humidity_data(self, days=None):
         """获取历史湿度数据 """
         return get_history_humidity_data(self.device_id, days)
 
+class SensorSnapshot:
+    """单次请求内共享的传感器读数
+    
+    同一请求中路由与灌溉服务都从该快照读取传感器数据，首次读取时拉取一次，
+    之后直接复用；同时统计为该请求实际发起的上游HTTP调用次数（缓存命中时为0）
+    """
+    def __init__(self, device_id, field_id, use_cache=True):
+        self.device_id = device_id
+        self.field_id = field_id
+        self.use_cache = use_cache
+        self.fetch_count = 0
+        self.upstream_calls = {}
+        self._data = None
+        self._lock = threading.Lock()
+    
+    def record_upstream_call(self, endpoint):
+        """记录一次上游HTTP调用（由APIClient在请求上下文中调用）"""
+        with self._lock:
+            self.upstream_calls[endpoint] = self.upstream_calls.get(endpoint, 0) + 1
+    
+    def get(self):
+        """获取传感器数据，同一快照只拉取一次"""
+        if self._data is None:
+            token = _upstream_recorder.set(self)
+            try:
+                self._data = SoilSensor(self.device_id, self.field_id).get_current_data(use_cache=self.use_cache)
+                self.fetch_count += 1
+            finally:
+                _upstream_recorder.reset(token)
+        return dict(self._data)
+    
+    @property
+    def upstream_call_count(self):
+        with self._lock:
+            return sum(self.upstream_calls.values())
+    
+    def get_stats(self):
+        """获取该快照的拉取统计"""
+        with self._lock:
+            by_endpoint = dict(self.upstream_calls)
+        return {
+            'device_id': self.device_id,
+            'field_id': self.field_id,
+            'fetches': self.fetch_count,
+            'upstream_calls': sum(by_endpoint.values()),
+            'upstream_calls_by_endpoint': by_endpoint
+        }
+
 # ==================== 兼容性函数（已弃用） ====================
 def save_extremum_humidity_data(device_id):
     """已弃用函数，保持向后兼容"""
@@ -2,5 +2,6 @@
 from .fao_model import FAOModel
 from .weather import WeatherET, Weather_wth
 from .soil import SoilProfile
+from .autoirr_scenarios import AutoirrScenario, load_scenarios
 
-__all__ = ['FAOModel', 'WeatherET', 'Weather_wth', 'SoilProfile']
\ No newline at end of file
+__all__ = ['FAOModel', 'WeatherET', 'Weather_wth', 'SoilProfile', 'AutoirrScenario', 'load_scenarios']
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+自动灌溉场景注册表
+场景定义保存在JSON文件中(FAO_CONFIG['AUTOIRR_SCENARIO_FILE']),新增灌溉策略只需增加一条记录:
+- id: 场景标识,原有的 autoirr_case 编号沿用为整数 id
+- description: 场景说明
+- autoirr: 是否启用自动灌溉,默认 true
+- sets: AutoIrrigate.addset 参数集列表;start_offset_days/end_offset_days 表示相对模拟起止日期
+  推后/提前的天数,其余键(mad、dsli、fpdep、ieff、imin、imax 等)原样传给 addset
+- grid: 需要展开的参数 {参数名: 取值列表 或 {start, stop, step}},按笛卡尔积生成
+  "{id}[参数=值,...]" 形式的多个场景,用于批量寻优
+"""
+import os
+import sys
+import json
+import itertools
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.append(project_root)
+
+from src.utils.logger import logger
+
+DEFAULT_SCENARIO_FILE = 'data/autoirr/scenarios.json'
+OFFSET_KEYS = ('start_offset_days', 'end_offset_days')
+
+@dataclass
+class AutoirrScenario:
+    """单个自动灌溉场景"""
+    scenario_id: str
+    description: str = ''
+    sets: List[dict] = field(default_factory=list)
+    autoirr: bool = True
+    group: Optional[str] = None
+    params: Dict[str, float] = field(default_factory=dict)
+
+    def build(self, start_date, end_date):
+        """构建场景的自动灌溉设置
+
+        参数:
+            start_date, end_date: 模拟起止日期(YYYY-DOY)
+        返回:
+            tuple: (AutoIrrigate实例, 传给fao.Model的灌溉参数dict)
+        """
+        from pyfao56 import AutoIrrigate
+        airr = AutoIrrigate()
+        if not self.autoirr:
+            return airr, {'irr': None}
+        start_dt = datetime.strptime(start_date, '%Y-%j')
+        end_dt = datetime.strptime(end_date, '%Y-%j')
+        for spec in self.sets:
+            kwargs = {key: value for key, value in spec.items() if key not in OFFSET_KEYS}
+            set_start = (start_dt + pd.Timedelta(days=spec.get('start_offset_days', 0))).strftime('%Y-%j')
+            set_end = (end_dt - pd.Timedelta(days=spec.get('end_offset_days', 0))).strftime('%Y-%j')
+            airr.addset(set_start, set_end, **kwargs)
+        return airr, {'autoirr': airr}
+
+def _grid_values(spec):
+    """将grid取值定义转换为列表,{start, stop, step} 包含stop"""
+    if isinstance(spec, dict):
+        start, stop, step = float(spec['start']), float(spec['stop']), float(spec['step'])
+        count = int(np.floor((stop - start) / step + 1e-9)) + 1
+        return [round(start + i * step, 6) for i in range(count)]
+    return list(spec) if isinstance(spec, (list, tuple)) else [spec]
+
+def expand_scenario(entry):
+    """将一条注册表记录展开为场景列表,没有grid时只有一个场景"""
+    scenario_id = str(entry['id'])
+    base = {
+        'description': entry.get('description', ''),
+        'sets': [dict(spec) for spec in entry.get('sets', [])],
+        'autoirr': entry.get('autoirr', True)
+    }
+    grid = entry.get('grid') or {}
+    if not grid:
+        return [AutoirrScenario(scenario_id, **base)]
+
+    names = list(grid)
+    scenarios = []
+    for values in itertools.product(*(_grid_values(grid[name]) for name in names)):
+        params = dict(zip(names, values))
+        label = ','.join(f"{name}={value:g}" if isinstance(value, (int, float)) else f"{name}={value}"
+                         for name, value in params.items())
+        sets = [dict(spec, **params) for spec in base['sets']]
+        scenarios.append(AutoirrScenario(f"{scenario_id}[{label}]", f"{base['description']} ({label})",
+                                         sets, base['autoirr'], scenario_id, params))
+    return scenarios
+
+_registry_cache = {}
+_registry_lock = threading.Lock()
+
+def _resolve_path(path=None):
+    if path is None:
+        from config import current_config
+        path = current_config.FAO_CONFIG.get('AUTOIRR_SCENARIO_FILE', DEFAULT_SCENARIO_FILE)
+    return path if os.path.isabs(path) else os.path.join(project_root, path)
+
+def load_scenarios(path=None):
+    """读取场景注册表并展开grid
+
+    文件修改时间不变时复用上次的解析结果
+    返回:
+        dict: {场景id: AutoirrScenario},按文件中的顺序
+    """
+    path = _resolve_path(path)
+    mtime = os.path.getmtime(path)
+    with _registry_lock:
+        cached = _registry_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f).get('scenarios', [])
+    registry = {}
+    for entry in entries:
+        for scenario in expand_scenario(entry):
+            if scenario.scenario_id in registry:
+                raise ValueError(f"自动灌溉场景id重复: {scenario.scenario_id}")
+            registry[scenario.scenario_id] = scenario
+    logger.info(f"已加载自动灌溉场景注册表: {path}, 场景数={len(registry)}")
+    with _registry_lock:
+        _registry_cache[path] = (mtime, registry)
+    return registry
+
+def select_scenarios(scenario_ids=None, registry=None):
+    """按id选择场景
+
+    参数:
+        scenario_ids: 场景id列表,grid记录的id选择其展开后的全部场景;None表示全部场景
+    返回:
+        list: AutoirrScenario列表
+    """
+    registry = registry if registry is not None else load_scenarios()
+    if scenario_ids is None:
+        return list(registry.values())
+    selected = []
+    for scenario_id in scenario_ids:
+        scenario_id = str(scenario_id)
+        if scenario_id in registry:
+            selected.append(registry[scenario_id])
+            continue
+        members = [scenario for scenario in registry.values() if scenario.group == scenario_id]
+        if not members:
+            raise KeyError(f"未定义的自动灌溉场景: {scenario_id}")
+        selected.extend(members)
+    return selected
+
+def get_scenario(scenario_id, registry=None):
+    """获取单个场景,未定义时返回None"""
+    registry = registry if registry is not None else load_scenarios()
+    return registry.get(str(scenario_id))
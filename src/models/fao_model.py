@@ -32,7 +32,6 @@
 """
 import os
 import time
-import subprocess
 import pandas as pd
 import pyfao56 as fao
 import sys
@@ -45,6 +44,7 @@ sys.path.append(project_root)
 from src.utils.logger import logger
 from src.models.soil import SoilProfile
 from src.models.weather import WeatherET, Weather_wth
+from src.models.model_cache import ModelResultCache
 from config import current_config
 
 class FAOModel:
@@ -59,11 +59,67 @@ class FAOModel:
         self.fao_config = self.config.FAO_CONFIG
         self.module_dir = os.path.dirname(os.path.abspath(__file__))
         self.project_root = project_root
+        self.result_cache = None
+        if self.fao_config.get('RESULT_CACHE_ENABLED', False):
+            cache_dir = self.fao_config.get('RESULT_CACHE_DIR', 'data/model_output/cache')
+            if not os.path.isabs(cache_dir):
+                cache_dir = os.path.join(self.project_root, cache_dir)
+            self.result_cache = ModelResultCache(cache_dir, self.fao_config.get('RESULT_CACHE_MAX_ENTRIES', 20))
         
-    def run_model(self):
-        """运行FAO模型"""
+    @staticmethod
+    def _location_filename(filename, location):
+        """为指定天气网格生成文件名: wheat2024.out -> wheat2024_<cell_id>.out"""
+        filename = os.path.basename(filename)
+        if location is None:
+            return filename
+        stem, ext = os.path.splitext(filename)
+        return f"{stem}_{location.cell_id}{ext}"
+        
+    def _prepare_weather_data(self, weather_file, location=None):
+        """在当前进程内准备天气数据
+
+        直接使用weather_api.prepare_weather_data返回的DataFrame,
+        仅在FAO_CONFIG['PERSIST_WEATHER_DATA']为True时写出CSV文件;
+        获取失败时回退到已有的天气文件
+        
+        参数:
+            weather_file: 天气CSV文件路径
+            location: 天气网格(WeatherCell),为None时使用 WEATHER_CONFIG 中的经纬度
+        返回:
+            pd.DataFrame: 天气数据
+        """
+        from src.models.weather_api import prepare_weather_data
+        persist = self.fao_config.get('PERSIST_WEATHER_DATA', True)
+        if location is None:
+            weather_data = prepare_weather_data(output_file=weather_file, persist=persist)
+        else:
+            history_file = os.path.join(os.path.dirname(weather_file),
+                                        self._location_filename('weather_history_data.csv', location))
+            weather_data = prepare_weather_data(lat=location.latitude, lon=location.longitude,
+                                                output_file=weather_file, history_file=history_file,
+                                                persist=persist)
+        if weather_data is None:
+            logger.warning(f"天气数据准备失败，使用已有天气文件: {weather_file}")
+            weather_data = pd.read_csv(weather_file)
+        return weather_data
+        
+    def run_model(self, location=None):
+        """运行FAO模型
+        
+        参数:
+            location: 天气网格(WeatherCell),指定时使用该网格的天气数据,
+                模型文件带网格后缀写入 WEATHER_CONFIG['cell_output_dir']
+        """
         try:
             start = time.time()
+            timings = {}
+            stage_start = [time.perf_counter()]
+            
+            def _mark(stage):
+                now = time.perf_counter()
+                timings[stage] = now - stage_start[0]
+                stage_start[0] = now
+            
             try:
                 
                 sim_start = datetime.strptime(self.config.AQUACROP_CONFIG['SIM_START_TIME'], '%Y/%m/%d')
@@ -97,17 +153,18 @@ class FAOModel:
                 
             # 创建输出目录
             output_dir = os.path.join(self.project_root, 'data/model_output')
+            if location is not None:
+                output_dir = self.config.WEATHER_CONFIG.get('cell_output_dir', 'data/model_output/cells')
+                if not os.path.isabs(output_dir):
+                    output_dir = os.path.join(self.project_root, output_dir)
             if not os.path.exists(output_dir):
                 os.makedirs(output_dir)
                 
             # 参数文件
-            par_file = os.path.join(output_dir, self.fao_config['PAR_FILE'])
+            par_file = os.path.join(output_dir, self._location_filename(self.fao_config['PAR_FILE'], location))
             par.savefile(par_file)
             logger.info(f"参数文件已保存到: {par_file}")
-            
-            # 气象数据
-            weather_api_path = os.path.join(self.module_dir, 'weather_api.py')
-            subprocess.run([sys.executable, weather_api_path])
+            _mark('模型参数准备')
             
             # 创建天气目录
             weather_dir = os.path.join(self.project_root, 'data/weather')
@@ -119,13 +176,17 @@ class FAOModel:
                 drought_weather = os.path.join(self.project_root, weather_file)
             else:
                 drought_weather = os.path.join(weather_dir, weather_file)
+            if location is not None:
+                drought_weather = os.path.join(os.path.dirname(drought_weather),
+                                               self._location_filename(drought_weather, location))
 
             # 打印调试信息
             logger.info(f"weather_dir: {weather_dir}")
             logger.info(f"weather_file: {weather_file}")
             logger.info(f"drought_weather: {drought_weather}")
 
-            drought_weather_data = pd.read_csv(drought_weather)
+            drought_weather_data = self._prepare_weather_data(drought_weather, location)
+            _mark('天气数据准备')
             logger.info(f"原始天气数据日期范围: {drought_weather_data['Date'].min()} 到 {drought_weather_data['Date'].max()}")
             logger.info(f"原始天气数据行数: {len(drought_weather_data)}")
             
@@ -173,19 +234,25 @@ class FAOModel:
                 raise ValueError(f"天气数据不完整，缺少 {len(missing_dates)} 天的数据")
             
             wth_et = WeatherET(comment='drought irrigation')
+            if location is not None:
+                # 天气网格的ETref(Ra、Rso)按网格中心纬度计算
+                wth_et.weather.lat = location.latitude
             wth_et.customload(drought_weather_data, start_date, weather_end_date)
             
-            temp_wth_file = os.path.join(weather_dir, os.path.basename(self.fao_config['TEMP_WEATHER_FILE']))
-            wth_et.savefile(temp_wth_file)
-            logger.info(f"中间格式天气文件已保存到: {temp_wth_file}")
+            wth = wth_et.to_fao_weather()
             
-            fixed_wth_file = os.path.join(weather_dir, os.path.basename(self.fao_config['FIXED_WEATHER_FILE']))
-            Weather_wth(temp_wth_file, fixed_wth_file)
-            logger.info(f"修复后的天气文件已保存到: {fixed_wth_file}")
+            # .wth中间文件仅在需要调试或导出时写出
+            if self.fao_config.get('EXPORT_WEATHER_FILES', False):
+                temp_wth_file = os.path.join(weather_dir, self._location_filename(self.fao_config['TEMP_WEATHER_FILE'], location))
+                wth_et.savefile(temp_wth_file)
+                logger.info(f"中间格式天气文件已保存到: {temp_wth_file}")
+                
+                fixed_wth_file = os.path.join(weather_dir, self._location_filename(self.fao_config['FIXED_WEATHER_FILE'], location))
+                Weather_wth(temp_wth_file, fixed_wth_file)
+                logger.info(f"修复后的天气文件已保存到: {fixed_wth_file}")
             
-            wth = fao.Weather()
-            wth.loadfile(fixed_wth_file)
             logger.info(f"加载到FAO模型的天气数据日期范围: {wth.wdata.index.min()} 到 {wth.wdata.index.max()}")
+            _mark('天气数据加载')
             
             soil_dir = os.path.join(self.project_root, 'data/soil')
             if not os.path.exists(soil_dir):
@@ -194,30 +261,66 @@ class FAOModel:
             drought_soil = os.path.join(soil_dir, os.path.basename(self.fao_config['SOIL_FILE']))
             soil = SoilProfile(comment='drought irrigation')
             soil.customload(drought_soil)
-            soil_file = os.path.join(soil_dir, os.path.basename(self.fao_config['SOIL_OUTPUT_FILE']))
+            soil_file = os.path.join(soil_dir, self._location_filename(self.fao_config['SOIL_OUTPUT_FILE'], location))
             soil.savefile(soil_file)
             logger.info(f"土壤数据文件已保存到: {soil_file}")
+            _mark('土壤数据准备')
+            
+            output_file = os.path.join(output_dir, self._location_filename(self.fao_config['OUTPUT_FILE'], location))
+            summary_file = os.path.join(output_dir, self._location_filename(self.fao_config['SUMMARY_FILE'], location))
+            cache_files = {
+                os.path.basename(output_file): output_file,
+                os.path.basename(summary_file): summary_file
+            }
+            
+            # 输入内容未变化时直接复用缓存结果
+            cache_key = None
+            if self.result_cache is not None:
+                cache_key = ModelResultCache.compute_key(
+                    self.config.CROP_PARAMS, self.config.SOIL_PARAMS,
+                    start_date, end_date, wth.wdata, soil.sdata,
+                    station={'lat': wth.lat, 'z': wth.z, 'wndht': wth.wndht, 'rfcrp': wth.rfcrp})
+                if self.result_cache.restore(cache_key, cache_files):
+                    _mark('缓存命中')
+                    logger.info(f"FAO模型输入未变化，复用缓存结果: {cache_key[:12]}，"
+                                f"耗时: {time.time() - start:.2f}秒")
+                    return {
+                        'output_file': output_file,
+                        'summary_file': summary_file,
+                        'timings': timings,
+                        'cache_hit': True,
+                        'cache_key': cache_key
+                    }
             
             # 运行模型
             logger.info("开始运行FAO模型...")
             mdl = fao.Model(start_date, end_date, par, wth, sol=soil)
             mdl.run()
+            _mark('模型运行')
             
-            # 模型输出
-            output_file = os.path.join(output_dir, self.fao_config['OUTPUT_FILE'])
-            summary_file = os.path.join(output_dir, self.fao_config['SUMMARY_FILE'])
-            mdl.savefile(output_file)
-            mdl.savesums(summary_file)
+            # 模型输出: 先写临时文件再原子替换,读取方始终看到完整的输出
+            mdl.savefile(output_file + '.tmp')
+            mdl.savesums(summary_file + '.tmp')
+            os.replace(output_file + '.tmp', output_file)
+            os.replace(summary_file + '.tmp', summary_file)
+            if cache_key is not None:
+                self.result_cache.put(cache_key, cache_files,
+                                      meta={'start_date': start_date, 'end_date': end_date})
+            _mark('结果保存')
             
             end = time.time()
             logger.info(f'FAO模型运行完成,耗时: {end - start:.2f}秒')
+            logger.info('各阶段耗时: ' + ', '.join(f"{stage} {seconds:.3f}秒" for stage, seconds in timings.items()))
             logger.info(f'模型输出已保存到: {output_file}')
             logger.info(f'模型摘要已保存到: {summary_file}')
             
             # 返回模型结果文件路径
             return {
                 'output_file': output_file,
-                'summary_file': summary_file
+                'summary_file': summary_file,
+                'timings': timings,
+                'cache_hit': False,
+                'cache_key': cache_key
             }
             
         except Exception as e:
@@ -32,12 +32,12 @@
 """
 import os
 import time
-import subprocess
 import pandas as pd
 import pyfao56 as fao
 import sys
 import numpy as np
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 from pyfao56 import AutoIrrigate  
 import matplotlib.pyplot as plt
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
@@ -45,10 +45,13 @@ sys.path.append(project_root)
 
 from src.utils.logger import logger
 from src.models.soil import SoilProfile
+from src.models.model_output import read_out_file
 from src.models.weather import WeatherET, Weather_wth
+from src.models.autoirr_scenarios import get_scenario, load_scenarios, select_scenarios
 from config import current_config
 plt.rcParams['font.sans-serif'] = ['SimHei'] 
 plt.rcParams['axes.unicode_minus'] = False
+
 class FAOModel:
     def __init__(self, config=None):
         """
@@ -69,17 +72,9 @@ class FAOModel:
             import os
             import numpy as np
             import pandas as pd
-            import tempfile
             
             output_file = os.path.join(output_dir, self.fao_config['OUTPUT_FILE'])
             
-            with open(output_file, 'r') as f:
-                header_line = None
-                for i, line in enumerate(f):
-                    if i == 11:  # 第12行是列名行
-                        header_line = line.strip()
-                        break
-            
             correct_columns = [
                 'Year-DOY', 'Year', 'DOY', 'DOW', 'Date', 'ETref', 'Kcm', 'ETcm', 'tKcb', 'Kcb', 
                 'ETcb', 'h', 'Kcmax', 'ETmax', 'fc', 'fw', 'few', 'De', 'Kr', 'Ke', 'E', 'DPe', 
@@ -88,44 +83,8 @@ class FAOModel:
                 'Rain', 'Runoff'
             ]
             
-            data_lines = []
-            with open(output_file, 'r') as f:
-                for i, line in enumerate(f):
-                    if i > 11:  # 跳过前12行
-                        data_lines.append(line.strip())
-            
-            temp_file = tempfile.NamedTemporaryFile(delete=False, mode='w', suffix='.csv')
-            
-            temp_file.write(','.join(correct_columns) + '\n')
-            
-            for line in data_lines:
-                parts = line.split()
-                if len(parts) >= 6:  
-                    year_doy = parts[0]
-                    try:
-                        if '-' in year_doy:
-                            year, doy = year_doy.split('-')
-                            year = int(year)
-                            doy = int(doy)
-                        else:
-                            year = int(parts[0])
-                            doy = int(parts[2])
-                    except:
-                        year = 2024
-                        doy = 1
-                    
-                    new_row = [year_doy, str(year), str(doy)]
-                    new_row.extend(parts[3:])
-                    while len(new_row) < len(correct_columns):
-                        new_row.append('NA')
-                    
-                    temp_file.write(','.join(new_row) + '\n')
-            
-            temp_file.close()
-            
-            results = pd.read_csv(temp_file.name)
-            
-            os.unlink(temp_file.name)
+            # 单遍读取输出文件,各列已按类型转换
+            results = pd.DataFrame(read_out_file(output_file, correct_columns, parse_dates=False))
             
             numeric_columns = ['ETref', 'Kcm', 'ETcm', 'tKcb', 'Kcb', 'ETcb', 'h', 'Kcmax', 'ETmax', 
                              'fc', 'fw', 'few', 'De', 'Kr', 'Ke', 'E', 'DPe', 'Kc', 'ETc', 'TAW', 
@@ -133,10 +92,6 @@ class FAOModel:
                              'Dinc', 'Dr', 'fDr', 'Drmax', 'fDrmax', 'Db', 'fDb', 'Irrig', 'IrrLoss', 
                              'Rain', 'Runoff']
             
-            for col in numeric_columns:
-                if col in results.columns:
-                    results[col] = pd.to_numeric(results[col], errors='coerce')
-            
             logger.info(f"结果数据列名: {list(results.columns)}")
             logger.info(f"数据前5行: {results.head()}")
             
@@ -356,107 +311,135 @@ class FAOModel:
             logger.error(traceback.format_exc())
             return None
         
-    def run_model(self, autoirr_case=0):
-        """运行FAO模型,引入自动灌溉逻辑"""
-        try:
-            start = time.time()
-            try:
-                
-                sim_start = datetime.strptime(self.config.AQUACROP_CONFIG['SIM_START_TIME'], '%Y/%m/%d')
-                sim_end = datetime.strptime(self.config.AQUACROP_CONFIG['SIM_END_TIME'], '%Y/%m/%d')
-                
-                start_year = sim_start.year
-                start_doy = sim_start.timetuple().tm_yday
-                end_year = sim_end.year
-                end_doy = sim_end.timetuple().tm_yday
-                
-                start_date = f"{start_year}-{start_doy}"
-                end_date = f"{end_year}-{end_doy}"
-                
-                logger.info(f"从AQUACROP配置获取模拟日期范围: {sim_start.strftime('%Y/%m/%d')} 到 {sim_end.strftime('%Y/%m/%d')}")
-                logger.info(f"转换为FAO模型日期格式: {start_date} 到 {end_date}")
-            except Exception as e:
-                default_start = datetime.strptime('2024/8/1', '%Y/%m/%d')
-                default_end = datetime.strptime('2025/7/31', '%Y/%m/%d')
-                start_date = f"{default_start.year}-{default_start.timetuple().tm_yday}"
-                end_date = f"{default_end.year}-{default_end.timetuple().tm_yday}"
-                logger.warning(f"无法从配置获取模拟日期范围，使用默认值: {e}")
-            
-            par = fao.Parameters(comment='2024 Wheat')
-            for key, value in self.config.CROP_PARAMS.items():
-                setattr(par, key, value)
-            for key, value in self.config.SOIL_PARAMS.items():
-                setattr(par, key, value)
-                
-            output_dir = os.path.join(self.project_root, 'data/autoirr')
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-                
-            par_file = os.path.join(output_dir, self.fao_config['PAR_FILE'])
-            par.savefile(par_file)
-            logger.info(f"参数文件已保存到: {par_file}")
-            
-            weather_api_path = os.path.join(self.module_dir, 'weather_api.py')
-            subprocess.run([sys.executable, weather_api_path])
-            
-            weather_dir = os.path.join(self.project_root, 'data/weather')
-            weather_file = self.fao_config['WEATHER_FILE']
-            
-            if os.path.isabs(weather_file):
-                drought_weather = weather_file
-            elif weather_file.startswith('data/weather'):
-                drought_weather = os.path.join(self.project_root, weather_file)
-            else:
-                drought_weather = os.path.join(weather_dir, weather_file)
+    def _prepare_weather_data(self, weather_file):
+        """在当前进程内准备天气数据
 
-            logger.info(f"weather_dir: {weather_dir}")
-            logger.info(f"weather_file: {weather_file}")
-            logger.info(f"drought_weather: {drought_weather}")
+        直接使用weather_api.prepare_weather_data返回的DataFrame,
+        仅在FAO_CONFIG['PERSIST_WEATHER_DATA']为True时写出CSV文件;
+        获取失败时回退到已有的天气文件
+        
+        参数:
+            weather_file: 天气CSV文件路径
+        返回:
+            pd.DataFrame: 天气数据
+        """
+        from src.models.weather_api import prepare_weather_data
+        persist = self.fao_config.get('PERSIST_WEATHER_DATA', True)
+        weather_data = prepare_weather_data(output_file=weather_file, persist=persist)
+        if weather_data is None:
+            logger.warning(f"天气数据准备失败，使用已有天气文件: {weather_file}")
+            weather_data = pd.read_csv(weather_file)
+        return weather_data
+        
+    def prepare_inputs(self, _mark=None):
+        """准备各灌溉场景共用的模型输入
 
-            drought_weather_data = pd.read_csv(drought_weather)
-            logger.info(f"原始天气数据日期范围: {drought_weather_data['Date'].min()} 到 {drought_weather_data['Date'].max()}")
-            
-            if start_date not in drought_weather_data['Date'].values:
-                logger.error(f"开始日期 {start_date} 不在天气数据中")
-                raise ValueError(f"天气数据缺少开始日期 {start_date}")
-            
-            weather_end_year = end_year
-            weather_end_doy = end_doy 
-            
-            if weather_end_year % 4 == 0 and (weather_end_year % 100 != 0 or weather_end_year % 400 == 0):
-                days_in_year = 366
-            else:
-                days_in_year = 365
-                
-            if weather_end_doy > days_in_year:
-                weather_end_year += 1
-                weather_end_doy = weather_end_doy - days_in_year
-                
-            weather_end_date = f"{weather_end_year}-{weather_end_doy:03d}"
-            
-            if weather_end_date not in drought_weather_data['Date'].values:
-                logger.error(f"结束日期 {weather_end_date} 不在天气数据中")
-                raise ValueError(f"天气数据缺少结束日期 {weather_end_date}")
-            
-            start_year = int(start_date.split('-')[0])
-            start_doy = int(start_date.split('-')[1])
+        参数:
+            _mark: 阶段计时回调,接收阶段名称
+        返回:
+            dict: start_date, end_date, par(Parameters), wth(Weather), soil(SoilProfile), output_dir
+        """
+        _mark = _mark or (lambda stage: None)
+        try:
             
-            start_dt = datetime(start_year, 1, 1) + pd.Timedelta(days=start_doy-1)
-            end_dt = datetime(weather_end_year, 1, 1) + pd.Timedelta(days=weather_end_doy-1)
+            sim_start = datetime.strptime(self.config.AQUACROP_CONFIG['SIM_START_TIME'], '%Y/%m/%d')
+            sim_end = datetime.strptime(self.config.AQUACROP_CONFIG['SIM_END_TIME'], '%Y/%m/%d')
             
-            date_range = pd.date_range(start=start_dt, end=end_dt, freq='D')
-            date_range_str = [(date.year, date.timetuple().tm_yday) for date in date_range]
-            date_range_str = [f"{year}-{doy:03d}" for year, doy in date_range_str]
+            start_year = sim_start.year
+            start_doy = sim_start.timetuple().tm_yday
+            end_year = sim_end.year
+            end_doy = sim_end.timetuple().tm_yday
             
-            missing_dates = [date for date in date_range_str if date not in drought_weather_data['Date'].values]
+            start_date = f"{start_year}-{start_doy}"
+            end_date = f"{end_year}-{end_doy}"
             
-            if missing_dates:
-                logger.error(f"天气数据缺少以下日期: {missing_dates}")
-                raise ValueError(f"天气数据不完整，缺少 {len(missing_dates)} 天的数据")
+            logger.info(f"从AQUACROP配置获取模拟日期范围: {sim_start.strftime('%Y/%m/%d')} 到 {sim_end.strftime('%Y/%m/%d')}")
+            logger.info(f"转换为FAO模型日期格式: {start_date} 到 {end_date}")
+        except Exception as e:
+            default_start = datetime.strptime('2024/8/1', '%Y/%m/%d')
+            default_end = datetime.strptime('2025/7/31', '%Y/%m/%d')
+            start_date = f"{default_start.year}-{default_start.timetuple().tm_yday}"
+            end_date = f"{default_end.year}-{default_end.timetuple().tm_yday}"
+            logger.warning(f"无法从配置获取模拟日期范围，使用默认值: {e}")
+        
+        par = fao.Parameters(comment='2024 Wheat')
+        for key, value in self.config.CROP_PARAMS.items():
+            setattr(par, key, value)
+        for key, value in self.config.SOIL_PARAMS.items():
+            setattr(par, key, value)
+            
+        output_dir = os.path.join(self.project_root, 'data/autoirr')
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+            
+        par_file = os.path.join(output_dir, self.fao_config['PAR_FILE'])
+        par.savefile(par_file)
+        logger.info(f"参数文件已保存到: {par_file}")
+        _mark('模型参数准备')
+        
+        weather_dir = os.path.join(self.project_root, 'data/weather')
+        weather_file = self.fao_config['WEATHER_FILE']
+        
+        if os.path.isabs(weather_file):
+            drought_weather = weather_file
+        elif weather_file.startswith('data/weather'):
+            drought_weather = os.path.join(self.project_root, weather_file)
+        else:
+            drought_weather = os.path.join(weather_dir, weather_file)
+
+        logger.info(f"weather_dir: {weather_dir}")
+        logger.info(f"weather_file: {weather_file}")
+        logger.info(f"drought_weather: {drought_weather}")
+
+        drought_weather_data = self._prepare_weather_data(drought_weather)
+        _mark('天气数据准备')
+        logger.info(f"原始天气数据日期范围: {drought_weather_data['Date'].min()} 到 {drought_weather_data['Date'].max()}")
+        
+        if start_date not in drought_weather_data['Date'].values:
+            logger.error(f"开始日期 {start_date} 不在天气数据中")
+            raise ValueError(f"天气数据缺少开始日期 {start_date}")
+        
+        weather_end_year = end_year
+        weather_end_doy = end_doy 
+        
+        if weather_end_year % 4 == 0 and (weather_end_year % 100 != 0 or weather_end_year % 400 == 0):
+            days_in_year = 366
+        else:
+            days_in_year = 365
             
-            wth_et = WeatherET(comment='drought irrigation')
-            wth_et.customload(drought_weather_data, start_date, weather_end_date)
+        if weather_end_doy > days_in_year:
+            weather_end_year += 1
+            weather_end_doy = weather_end_doy - days_in_year
             
+        weather_end_date = f"{weather_end_year}-{weather_end_doy:03d}"
+        
+        if weather_end_date not in drought_weather_data['Date'].values:
+            logger.error(f"结束日期 {weather_end_date} 不在天气数据中")
+            raise ValueError(f"天气数据缺少结束日期 {weather_end_date}")
+        
+        start_year = int(start_date.split('-')[0])
+        start_doy = int(start_date.split('-')[1])
+        
+        start_dt = datetime(start_year, 1, 1) + pd.Timedelta(days=start_doy-1)
+        end_dt = datetime(weather_end_year, 1, 1) + pd.Timedelta(days=weather_end_doy-1)
+        
+        date_range = pd.date_range(start=start_dt, end=end_dt, freq='D')
+        date_range_str = [(date.year, date.timetuple().tm_yday) for date in date_range]
+        date_range_str = [f"{year}-{doy:03d}" for year, doy in date_range_str]
+        
+        missing_dates = [date for date in date_range_str if date not in drought_weather_data['Date'].values]
+        
+        if missing_dates:
+            logger.error(f"天气数据缺少以下日期: {missing_dates}")
+            raise ValueError(f"天气数据不完整，缺少 {len(missing_dates)} 天的数据")
+
+        wth_et = WeatherET(comment='drought irrigation')
+        wth_et.customload(drought_weather_data, start_date, weather_end_date)
+        
+        wth = wth_et.to_fao_weather()
+        
+        # .wth中间文件仅在需要调试或导出时写出
+        if self.fao_config.get('EXPORT_WEATHER_FILES', False):
             temp_wth_file = os.path.join(weather_dir, os.path.basename(self.fao_config['TEMP_WEATHER_FILE']))
             wth_et.savefile(temp_wth_file)
             logger.info(f"中间格式天气文件已保存到: {temp_wth_file}")
@@ -464,136 +447,89 @@ class FAOModel:
             fixed_wth_file = os.path.join(weather_dir, os.path.basename(self.fao_config['FIXED_WEATHER_FILE']))
             Weather_wth(temp_wth_file, fixed_wth_file)
             logger.info(f"修复后的天气文件已保存到: {fixed_wth_file}")
+        
+        logger.info(f"加载到FAO模型的天气数据日期范围: {wth.wdata.index.min()} 到 {wth.wdata.index.max()}")
+        _mark('天气数据加载')
+        
+        soil_dir = os.path.join(self.project_root, 'data/soil')
+        if not os.path.exists(soil_dir):
+            os.makedirs(soil_dir)
+            
+        drought_soil = os.path.join(soil_dir, os.path.basename(self.fao_config['SOIL_FILE']))
+        soil = SoilProfile(comment='drought irrigation')
+        soil.customload(drought_soil)
+        soil_file = os.path.join(soil_dir, os.path.basename(self.fao_config['SOIL_OUTPUT_FILE']))
+        soil.savefile(soil_file)
+        logger.info(f"土壤数据文件已保存到: {soil_file}")
+        _mark('土壤数据准备')
+        
+
+        return {
+            'start_date': start_date,
+            'end_date': end_date,
+            'par': par,
+            'wth': wth,
+            'soil': soil,
+            'output_dir': output_dir
+        }
+
+    def build_scenario(self, autoirr_case, start_date, end_date):
+        """按场景注册表构建自动灌溉场景
+
+        参数:
+            autoirr_case: 场景id(原有场景编号或注册表中的id)
+            start_date, end_date: 模拟起止日期(YYYY-DOY)
+        返回:
+            tuple: (AutoIrrigate实例, 传给fao.Model的灌溉参数dict);场景未定义时返回None
+        """
+        registry = load_scenarios(self.fao_config.get('AUTOIRR_SCENARIO_FILE'))
+        scenario = get_scenario(autoirr_case, registry)
+        if scenario is None:
+            logger.error(f"未定义的自动灌溉场景: {autoirr_case}")
+            return None
+        logger.info(scenario.description)
+        return scenario.build(start_date, end_date)
+
+    @staticmethod
+    def fit_forecast_window(airr, wth):
+        """限制自动灌溉参数集的结束日期
+
+        pyfao56按未来fpday天(默认3天)的降雨决定是否灌溉,天气数据截止于模拟结束日期时,
+        最后几天的预报查询会越界,参数集结束日期需提前到天气数据仍能覆盖fpday天的日期
+        """
+        if airr is None or airr.aidata.empty:
+            return airr
+        last_day = datetime.strptime(max(wth.wdata.index), '%Y-%j')
+        for i in airr.aidata.index:
+            fpday = int(airr.aidata.loc[i, 'fpday'])
+            latest_end = last_day - pd.Timedelta(days=max(fpday - 1, 0))
+            if datetime.strptime(airr.aidata.loc[i, 'end'], '%Y-%j') > latest_end:
+                airr.aidata.loc[i, 'end'] = latest_end.strftime('%Y-%j')
+                logger.info(f"自动灌溉参数集{i}的结束日期调整为 {airr.aidata.loc[i, 'end']} (预报降雨天数fpday={fpday})")
+        return airr
+
+    def run_model(self, autoirr_case=0):
+        """运行FAO模型,引入自动灌溉逻辑"""
+        try:
+            start = time.time()
+            timings = {}
+            stage_start = [time.perf_counter()]
             
-            wth = fao.Weather()
-            wth.loadfile(fixed_wth_file)
-            logger.info(f"加载到FAO模型的天气数据日期范围: {wth.wdata.index.min()} 到 {wth.wdata.index.max()}")
+            def _mark(stage):
+                now = time.perf_counter()
+                timings[stage] = now - stage_start[0]
+                stage_start[0] = now
             
-            soil_dir = os.path.join(self.project_root, 'data/soil')
-            if not os.path.exists(soil_dir):
-                os.makedirs(soil_dir)
-                
-            drought_soil = os.path.join(soil_dir, os.path.basename(self.fao_config['SOIL_FILE']))
-            soil = SoilProfile(comment='drought irrigation')
-            soil.customload(drought_soil)
-            soil_file = os.path.join(soil_dir, os.path.basename(self.fao_config['SOIL_OUTPUT_FILE']))
-            soil.savefile(soil_file)
-            logger.info(f"土壤数据文件已保存到: {soil_file}")
-            
-            # 灌溉记录
-            irrfull = None  
-            irrhalf = None  
-            # 创建自动灌溉实例
-            airr = AutoIrrigate()
-
-            # 不同灌溉场景
-            if autoirr_case == 0:
-                logger.info("使用实际灌溉记录，无自动灌溉")
-                mdl = fao.Model(start_date, end_date, par, wth, irr=irrfull)
-            elif autoirr_case == 1:
-                logger.info("自动灌溉:Dr")
-                airr.addset(start_date, end_date)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 2:
-                logger.info("自动灌溉:一半手动灌溉,一半自动灌溉")
-                airr.addset(start_date, end_date)
-                mdl = fao.Model(start_date, end_date, par, wth, irr=irrhalf,autoirr=airr)               
-            elif autoirr_case == 3:
-                logger.info("自动灌溉:mad=0.5")
-                end_dt = datetime.strptime(end_date, '%Y-%j')
-                early_end_date = (end_dt - pd.Timedelta(days=100)).strftime('%Y-%j')
-                airr.addset(start_date, early_end_date, mad=0.3)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 4:
-                logger.info("自动灌溉:mad=0.5,每周二和周五")
-                airr.addset(start_date, end_date, mad=0.5, idow='25')
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 5:
-                logger.info("自动灌溉:mad=0.3,未来3天降雨超过25mm时取消灌溉")
-                airr.addset(start_date, end_date, mad=0.3, fpdep=25.0, fpday=3, fpact='cancel')
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 6:
-                logger.info("自动灌溉:mad=0.3,未来3天降雨超过25mm时减少对应灌溉量")
-                airr.addset(start_date, end_date, mad=0.3, fpdep=25.0, fpday=3, fpact='reduce')
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 7:
-                logger.info("自动灌溉:madDr=0.4")
-                airr.addset(start_date, end_date, madDr=40.)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 9:
-                logger.info("自动灌溉:Ks>0.6")
-                end_dt = datetime.strptime(end_date,'%Y-%j')
-                early_end_date = (end_dt - pd.Timedelta(days=100)).strftime('%Y-%j')
-                airr.addset(start_date, early_end_date, ksc=0.3)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 10:
-                logger.info("自动灌溉:每隔6天")
-                airr.addset(start_date, end_date, dsli=6)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 11:
-                logger.info("自动灌溉:每隔6天或mad=0.3")
-                airr.addset(start_date, end_date, dsli=6)
-                airr.addset(start_date, end_date, mad=0.3)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 12:
-                logger.info("自动灌溉:某次灌溉>14mm则触发每6天灌溉一次")
-                airr.addset(start_date, end_date, dsli=6, evnt=14.)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 13:
-                logger.info("自动灌溉:每隔6天恒定灌溉20mm")
-                airr.addset(start_date, end_date, dsli=6, icon=20.)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 14:
-                logger.info("自动灌溉:当Dr达到mad=0.5时启动灌溉,灌溉至Dr=15mm")
-                airr.addset(start_date, end_date, mad=0.5, itdr=15.)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 15:
-                logger.info("自动灌溉:当Dr达到mad=0.5时启动灌溉,灌溉至fdr=0.1")
-                airr.addset(start_date, end_date, mad=0.5, itfdr=0.1)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 16:
-                logger.info("自动灌溉:基于5日蒸散发(ETa)补偿自动灌溉")
-                airr.addset(start_date, end_date, dsli=5, ietrd=5)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 17:
-                logger.info("自动灌溉:当dr达到mad=0.5时启动灌溉,灌溉量为ETcadj-Pre")
-                airr.addset(start_date, end_date, mad=0.5,ietri=True)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 18:
-                logger.info("自动灌溉:当dr达到mad=0.5时启动灌溉,灌溉量为ETa-Pre")
-                airr.addset(start_date, end_date, mad=0.5,ietre=True)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 19:
-                logger.info("自动灌溉:基于5日蒸散发(ETc)补偿自动灌溉")
-                airr.addset(start_date, end_date, dsli=5,ietrd=5,ettyp='ETc')
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 20:
-                logger.info("自动灌溉:当dr达到mad=0.5时启动灌溉,灌溉补充90%Dr")
-                end_dt = datetime.strptime(end_date,'%Y-%j')
-                early_end_date = (end_dt- pd.Timedelta(days=10)).strftime('%Y-%j')
-                airr.addset(start_date, early_end_date, mad=0.5,iper=90.)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 21:
-                logger.info("自动灌溉:当dr达到mad=0.5时启动灌溉,考虑灌溉效率80%")
-                airr.addset(start_date, end_date, mad=0.5,ieff=80.)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 22:
-                logger.info("自动灌溉:当dr达到mad=0.5时启动灌溉,最小灌溉量为12mm")
-                airr.addset(start_date, end_date, mad=0.5,imin=12.)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 23:
-                logger.info("自动灌溉:当dr达到mad=0.5时启动灌溉,最小灌溉量为12mm,最大灌溉量为24mm")
-                end_dt = datetime.strptime(end_date,'%Y-%j')
-                early_end_date = (end_dt - pd.Timedelta(days=30)).strftime('%Y-%j')
-                airr.addset(start_date, early_end_date, mad=0.6,imin=12.,imax=50.)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            elif autoirr_case == 24:
-                logger.info("自动灌溉:当dr达到mad=0.5时启动灌溉,灌溉至fw=0.5")
-                airr.addset(start_date, end_date, mad=0.5,fw=0.5)
-                mdl = fao.Model(start_date, end_date, par, wth, autoirr=airr)
-            else:
-                logger.error(f"未定义的自动灌溉场景: {autoirr_case}")
+            inputs = self.prepare_inputs(_mark)
+            start_date, end_date = inputs['start_date'], inputs['end_date']
+            output_dir = inputs['output_dir']
+
+            scenario = self.build_scenario(autoirr_case, start_date, end_date)
+            if scenario is None:
                 return
+            airr, irr_kwargs = scenario
+            self.fit_forecast_window(irr_kwargs.get('autoirr'), inputs['wth'])
+            mdl = fao.Model(start_date, end_date, inputs['par'], inputs['wth'], **irr_kwargs)
 
             # 保存自动灌溉配置
             autoirr_file = os.path.join(self.project_root, 'data/autoirr/cotton2018.ati')
@@ -603,6 +539,7 @@ class FAOModel:
             # 运行模型
             logger.info("开始运行FAO模型...")
             mdl.run()
+            _mark('模型运行')
             
             # 模型输出
             output_file = os.path.join(output_dir, self.fao_config['OUTPUT_FILE'])
@@ -610,8 +547,10 @@ class FAOModel:
             mdl.savefile(output_file)
             mdl.savesums(summary_file)
             processed_data_file = self.plot_results(mdl, output_dir)
+            _mark('结果保存')
             end = time.time()
             logger.info(f'FAO模型运行完成,耗时: {end - start:.2f}秒')
+            logger.info('各阶段耗时: ' + ', '.join(f"{stage} {seconds:.3f}秒" for stage, seconds in timings.items()))
             logger.info(f'模型输出已保存到: {output_file}')
             logger.info(f'模型摘要已保存到: {summary_file}')
             
@@ -619,13 +558,122 @@ class FAOModel:
             return {
                 'output_file': output_file,
                 'summary_file': summary_file,
-                'processed_data_file': processed_data_file
+                'processed_data_file': processed_data_file,
+                'timings': timings
             }
             
         except Exception as e:
             logger.error(f"运行FAO模型时出错: {str(e)}")
             raise
 
+    def run_scenario_sweep(self, scenario_ids=None, worker_counts=None, save=True):
+        """批量运行自动灌溉场景并生成对比表
+
+        天气、参数与土壤只准备一次,各场景在进程池中并行运行;
+        worker_counts 包含多个进程数时依次以每个进程数完整运行一遍,用于评估并行加速比
+
+        参数:
+            scenario_ids: 场景id列表,grid记录的id运行其展开后的全部场景;默认运行注册表中全部场景
+            worker_counts: 进程数列表,默认 [os.cpu_count()];1 表示在当前进程内顺序运行
+            save: 是否将对比表保存到 data/autoirr/scenario_comparison.csv
+        返回:
+            dict: {'table': 场景对比表DataFrame, 'scaling': 各进程数耗时DataFrame,
+                   'output_file': 对比表路径, 'prepare_seconds': 输入准备耗时}
+        """
+        registry = load_scenarios(self.fao_config.get('AUTOIRR_SCENARIO_FILE'))
+        scenarios = select_scenarios(scenario_ids, registry)
+        worker_counts = list(worker_counts or [os.cpu_count() or 1])
+
+        prepare_start = time.perf_counter()
+        inputs = self.prepare_inputs()
+        prepare_seconds = time.perf_counter() - prepare_start
+        logger.info(f"场景批量运行: 场景数={len(scenarios)}, 输入准备耗时{prepare_seconds:.2f}秒")
+
+        rows, scaling = None, []
+        for workers in worker_counts:
+            wall_start = time.perf_counter()
+            if workers <= 1:
+                _init_sweep_worker(inputs)
+                results = [_run_sweep_case(scenario) for scenario in scenarios]
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker,
+                                         initargs=(inputs,)) as executor:
+                    results = list(executor.map(_run_sweep_case, scenarios))
+            wall_seconds = time.perf_counter() - wall_start
+            scaling.append({'workers': workers, 'wall_seconds': round(wall_seconds, 3)})
+            logger.info(f"场景批量运行完成: 进程数={workers}, 耗时{wall_seconds:.2f}秒")
+            if rows is None:
+                rows = results
+
+        table = pd.DataFrame(rows).set_index('scenario')
+        scaling = pd.DataFrame(scaling)
+        scaling['speedup'] = (scaling['wall_seconds'].iloc[0] / scaling['wall_seconds']).round(2)
+
+        output_file = None
+        if save:
+            output_file = os.path.join(inputs['output_dir'], 'scenario_comparison.csv')
+            table.to_csv(output_file, encoding='utf-8-sig')
+            logger.info(f"场景对比表已保存到: {output_file}")
+        return {
+            'table': table,
+            'scaling': scaling,
+            'output_file': output_file,
+            'prepare_seconds': prepare_seconds
+        }
+
+
+
+_sweep_inputs = None
+
+def _init_sweep_worker(inputs):
+    """进程池初始化:每个子进程只接收一次共用的模型输入"""
+    global _sweep_inputs
+    _sweep_inputs = inputs
+
+def summarize_scenario(mdl):
+    """汇总单个场景的模型结果
+
+    返回:
+        dict: 总灌溉量、灌溉次数、实际蒸散量、水分胁迫天数(Ks<1)、深层渗漏与降雨(mm)
+    """
+    odata = mdl.odata
+    irrig = pd.to_numeric(odata['Irrig'], errors='coerce').fillna(0)
+    ks = pd.to_numeric(odata['Ks'], errors='coerce')
+    return {
+        'irrigation_mm': round(float(irrig.sum()), 3),
+        'irrigation_events': int((irrig > 0).sum()),
+        'eta_mm': round(float(pd.to_numeric(odata['ETa'], errors='coerce').sum()), 3),
+        'ks_days': int((ks < 1.0).sum()),
+        'dp_mm': round(float(pd.to_numeric(odata['DP'], errors='coerce').sum()), 3),
+        'rain_mm': round(float(pd.to_numeric(odata['Rain'], errors='coerce').sum()), 3)
+    }
+
+def _run_sweep_case(scenario):
+    """运行单个场景并返回汇总指标"""
+    inputs = _sweep_inputs
+    case_start = time.perf_counter()
+    row = {'scenario': scenario.scenario_id, 'description': scenario.description}
+    row.update(scenario.params)
+    try:
+        airr, irr_kwargs = scenario.build(inputs['start_date'], inputs['end_date'])
+        FAOModel.fit_forecast_window(irr_kwargs.get('autoirr'), inputs['wth'])
+        mdl = fao.Model(inputs['start_date'], inputs['end_date'], inputs['par'], inputs['wth'], **irr_kwargs)
+        mdl.run()
+        row.update(summarize_scenario(mdl))
+        row['error'] = None
+    except Exception as e:
+        logger.error(f"自动灌溉场景 {scenario.scenario_id} 运行失败: {str(e)}")
+        row['error'] = str(e)
+    row['run_seconds'] = round(time.perf_counter() - case_start, 3)
+    return row
+
 if __name__ == "__main__":
     model = FAOModel()
-    model.run_model(autoirr_case=23)
+    if len(sys.argv) > 1 and sys.argv[1] == 'sweep':
+        # python fao_model_autoirr.py sweep [进程数1,进程数2,...] [场景id ...]
+        worker_counts = [int(n) for n in sys.argv[2].split(',')] if len(sys.argv) > 2 else None
+        sweep = model.run_scenario_sweep(sys.argv[3:] or None, worker_counts=worker_counts)
+        print(sweep['table'].to_string())
+        print(sweep['scaling'].to_string(index=False))
+    else:
+        model.run_model(autoirr_case=23)
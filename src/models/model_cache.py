@@ -0,0 +1,181 @@
+"""
+FAO模型结果缓存模块
+以模型输入内容的哈希值作为缓存键,输入完全相同时直接复用上一次的模拟结果
+缓存键组成:
+- CROP_PARAMS / SOIL_PARAMS 参数
+- 模拟开始、结束日期
+- 天气数据内容(pyfao56 wdata)
+- 土壤剖面数据
+- 气象站参数(纬度、海拔、风速测量高度、参考作物)
+每个缓存条目保存在 RESULT_CACHE_DIR/<key>/ 下:
+- 模型原始输出文件(.out / .sum),供现有读取逻辑直接使用
+缓存条目按最近访问时间进行LRU淘汰,条目数上限由 RESULT_CACHE_MAX_ENTRIES 控制
+多个进程(如各天气网格的FAO模型)共用缓存目录,索引的读写与条目替换在 index.lock 文件锁内进行;
+淘汰时按目录列表补全索引中缺失的条目,避免未登记的条目目录永远不被淘汰
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.append(project_root)
+
+from src.utils.logger import logger
+from src.utils.file_lock import get_file_lock
+
+INDEX_FILE = 'index.json'
+INDEX_LOCK_FILE = 'index.lock'
+
+class ModelResultCache:
+    """基于内容哈希的FAO模型结果缓存"""
+
+    def __init__(self, cache_dir, max_entries=20):
+        """
+        初始化结果缓存
+
+        参数:
+            cache_dir: 缓存目录
+            max_entries: 最多保留的缓存条目数
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index_lock = get_file_lock(os.path.join(self.cache_dir, INDEX_LOCK_FILE))
+
+    @staticmethod
+    def compute_key(crop_params, soil_params, start_date, end_date, weather_data, soil_data=None, station=None):
+        """计算模型输入的内容哈希
+
+        参数:
+            crop_params: 作物参数字典
+            soil_params: 土壤参数字典
+            start_date: 模拟开始日期
+            end_date: 模拟结束日期
+            weather_data: 天气数据DataFrame
+            soil_data: 土壤剖面DataFrame,可为None
+            station: 气象站参数字典(纬度、海拔等),可为None
+        返回:
+            str: 缓存键(sha256十六进制)
+        """
+        digest = hashlib.sha256()
+        params = {
+            'crop_params': crop_params,
+            'soil_params': soil_params,
+            'start_date': str(start_date),
+            'end_date': str(end_date),
+            'station': station,
+        }
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(weather_data.to_csv().encode('utf-8'))
+        if soil_data is not None:
+            digest.update(soil_data.to_csv().encode('utf-8'))
+        return digest.hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    @staticmethod
+    def _is_entry_name(name):
+        return len(name) == 64 and all(c in '0123456789abcdef' for c in name)
+
+    def _load_index(self):
+        index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        if not os.path.exists(index_path):
+            return {}
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"读取模型缓存索引失败，将重建索引: {str(e)}")
+            return {}
+
+    def _save_index(self, index):
+        index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        tmp_path = index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, index_path)
+
+    def restore(self, key, targets):
+        """命中缓存时将缓存的输出文件复制到目标路径
+
+        参数:
+            key: 缓存键
+            targets: {缓存文件名: 目标路径} 字典
+        返回:
+            bool: 命中并恢复成功返回True
+        """
+        with self._lock, self._index_lock:
+            index = self._load_index()
+            entry_dir = self._entry_dir(key)
+            # 条目以目录为准,索引中缺失(其他进程的索引更新丢失)时补登
+            if not all(os.path.exists(os.path.join(entry_dir, name)) for name in targets):
+                return False
+
+            try:
+                for name, target in targets.items():
+                    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+                    tmp_target = target + '.tmp'
+                    shutil.copyfile(os.path.join(entry_dir, name), tmp_target)
+                    os.replace(tmp_target, target)
+                index.setdefault(key, {'created': time.time(), 'meta': {}})['last_access'] = time.time()
+                self._save_index(index)
+                return True
+            except Exception as e:
+                logger.error(f"恢复模型缓存失败: {str(e)}")
+                return False
+
+    def put(self, key, files, meta=None):
+        """写入缓存条目并执行LRU淘汰
+
+        参数:
+            key: 缓存键
+            files: {缓存文件名: 源文件路径} 字典
+            meta: 附加说明信息
+        """
+        with self._lock, self._index_lock:
+            entry_dir = self._entry_dir(key)
+            tmp_dir = entry_dir + '.tmp'
+            try:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                os.makedirs(tmp_dir)
+                for name, source in files.items():
+                    shutil.copyfile(source, os.path.join(tmp_dir, name))
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(tmp_dir, entry_dir)
+
+                now = time.time()
+                index = self._load_index()
+                index[key] = {'created': now, 'last_access': now, 'meta': meta or {}}
+                self._evict(index)
+                self._save_index(index)
+            except Exception as e:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                logger.error(f"写入模型缓存失败: {str(e)}")
+
+    def _evict(self, index):
+        """按最近访问时间淘汰超出上限的缓存条目
+
+        索引中缺失的条目目录按目录修改时间补登后参与淘汰,索引中目录已不存在的条目直接移除
+        """
+        names = set(os.listdir(self.cache_dir))
+        for key in [k for k in index if k not in names]:
+            index.pop(key)
+        for name in names:
+            entry_dir = self._entry_dir(name)
+            if name not in index and self._is_entry_name(name) and os.path.isdir(entry_dir):
+                mtime = os.path.getmtime(entry_dir)
+                index[name] = {'created': mtime, 'last_access': mtime, 'meta': {}}
+                logger.info(f"模型缓存索引补登条目: {name[:12]}")
+        if len(index) <= self.max_entries:
+            return
+        expired = sorted(index, key=lambda k: index[k].get('last_access', 0))[:len(index) - self.max_entries]
+        for key in expired:
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            index.pop(key, None)
+            logger.info(f"模型缓存条目已淘汰: {key[:12]}")
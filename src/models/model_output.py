@@ -0,0 +1,198 @@
+"""
+FAO模型输出数据仓库
+模型输出文件(wheat2024.out)按 (路径, 修改时间, 文件大小) 只解析一次,解析结果常驻内存,
+灌溉服务与API路由从同一份快照中按日期查询切片,不再各自重复读取文件
+主要组件:
+- read_out_file: 单遍读取.out文件,按已知列类型直接转换为NumPy数组
+- ModelOutput: 一次解析得到的只读快照,各列为NumPy数组,按日期排序
+- ModelOutputRepository: 按文件修改时间/大小失效的快照仓库,统计命中/未命中次数
+- get_model_output_repository: 进程内共享的仓库实例
+"""
+import os
+import sys
+import threading
+import numpy as np
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.append(project_root)
+
+from src.utils.logger import logger
+
+# 非浮点列的类型,其余列均为float
+OUT_COLUMN_DTYPES = {'Year-DOY': str, 'Year': int, 'DOY': int, 'DOW': str, 'Date': str}
+
+def _column_array(name, tokens, parse_dates):
+    """将一列字符串转换为对应类型的NumPy数组"""
+    if name == 'Date' and parse_dates:
+        return pd.to_datetime(tokens, format='%m/%d/%y', errors='coerce').to_numpy(dtype='datetime64[D]')
+    dtype = OUT_COLUMN_DTYPES.get(name, float)
+    if dtype is str:
+        return tokens.astype(str)
+    try:
+        return tokens.astype(dtype)
+    except ValueError:
+        return pd.to_numeric(tokens, errors='coerce').astype(float)
+
+def read_out_file(path, columns=None, parse_dates=True):
+    """单遍读取pyfao56输出文件
+
+    跳过列名行之前的说明,之后逐行分词,按已知列类型直接转换,不经过临时文件;
+    行尾重复的 Year/DOY/DOW/Date 列只保留第一次出现,字段数与列名行不一致的行被忽略
+
+    参数:
+        path: 输出文件路径
+        columns: 需要的列名列表,为None时返回全部列
+        parse_dates: 是否将Date列转换为datetime64[D],否则保留原始字符串(MM/DD/YY)
+    返回:
+        dict: {列名: NumPy数组},按文件中的列顺序;找不到列名行时返回空dict
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        names = None
+        for line in f:
+            if line.startswith('Year-DOY'):
+                names = line.split()
+                break
+        if names is None:
+            return {}
+        width = len(names)
+        rows = [parts for parts in (line.split() for line in f) if len(parts) == width]
+
+    positions = {}
+    for i, name in enumerate(names):
+        positions.setdefault(name, i)
+    wanted = [name for name in (columns or positions) if name in positions]
+    table = np.array(rows, dtype=str).reshape(len(rows), width)
+    return {name: _column_array(name, table[:, positions[name]], parse_dates) for name in wanted}
+
+class ModelOutput:
+    """FAO模型输出的只读快照"""
+
+    def __init__(self, path, dates, columns):
+        """
+        参数:
+            path: 输出文件路径
+            dates: 日期数组(datetime64[D]),升序
+            columns: {列名: NumPy数组},与dates等长
+        """
+        self.path = path
+        self.dates = dates
+        self.columns = columns
+        for values in [self.dates, *self.columns.values()]:
+            values.setflags(write=False)
+
+    @classmethod
+    def from_file(cls, path):
+        """解析pyfao56输出文件"""
+        data = read_out_file(path)
+        if 'Date' not in data:
+            return cls(path, np.array([], dtype='datetime64[D]'), {})
+        dates = data.pop('Date')
+        valid = ~np.isnat(dates)
+        order = np.argsort(dates[valid], kind='stable')
+        columns = {col: values[valid][order] for col, values in data.items()}
+        return cls(path, dates[valid][order], columns)
+
+    @property
+    def empty(self):
+        return len(self.dates) == 0
+
+    def has_columns(self, names):
+        """返回names中缺失的列名列表"""
+        return [name for name in names if name != 'Date' and name not in self.columns]
+
+    def _range_mask(self, start=None, end=None):
+        mask = np.ones(len(self.dates), dtype=bool)
+        if start is not None:
+            mask &= self.dates >= np.datetime64(pd.Timestamp(start).date(), 'D')
+        if end is not None:
+            mask &= self.dates <= np.datetime64(pd.Timestamp(end).date(), 'D')
+        return mask
+
+    def frame(self, columns=None, start=None, end=None):
+        """按日期范围获取数据切片
+
+        参数:
+            columns: 需要的列名列表,为None时返回全部列
+            start, end: 日期范围(含端点),为None时不限制
+        返回:
+            pd.DataFrame: 包含Date列(datetime64)与所需列的新DataFrame,可自由修改
+        """
+        mask = self._range_mask(start, end)
+        names = [c for c in (columns or self.columns) if c != 'Date']
+        data = {'Date': pd.to_datetime(self.dates[mask])}
+        data.update({name: self.columns[name][mask] for name in names})
+        return pd.DataFrame(data, copy=True)
+
+    def nearest_row(self, date):
+        """获取指定日期的数据,不存在时返回日期最接近的一行
+
+        返回:
+            pd.Series: 含Date列的行数据;快照为空时返回None
+        """
+        if self.empty:
+            return None
+        target = np.datetime64(pd.Timestamp(date).date(), 'D')
+        idx = int(np.abs((self.dates - target).astype(np.int64)).argmin())
+        row = {'Date': pd.Timestamp(self.dates[idx])}
+        row.update({name: values[idx] for name, values in self.columns.items()})
+        return pd.Series(row)
+
+class ModelOutputRepository:
+    """按文件修改时间/大小缓存解析结果的模型输出仓库"""
+
+    def __init__(self):
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        """获取模型输出快照,文件变化后重新解析
+
+        参数:
+            path: 输出文件路径
+        返回:
+            ModelOutput: 快照;文件不存在时返回None
+        """
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._snapshots.get(path)
+            if cached is not None and cached[0] == version:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+            snapshot = ModelOutput.from_file(path)
+            self._snapshots[path] = (version, snapshot)
+            logger.info(f"已解析模型输出文件: {path}，共{len(snapshot.dates)}天")
+            return snapshot
+
+    def invalidate(self, path=None):
+        """清除指定文件或全部文件的快照"""
+        with self._lock:
+            if path is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(os.path.abspath(path), None)
+
+    def get_stats(self):
+        """获取命中统计"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'files': len(self._snapshots)
+        }
+
+_repository = ModelOutputRepository()
+
+def get_model_output_repository():
+    """获取进程内共享的模型输出仓库"""
+    return _repository
@@ -38,6 +38,8 @@ except ImportError:
             self.WEATHER_CONFIG = {}
     config = EmptyConfig()
 
+from src.models.etref import penman_monteith
+
 if not hasattr(config, 'WEATHER_CONFIG'):
     config.WEATHER_CONFIG = {
         'elevation': float(os.environ.get('WEATHER_STATION_ELEVATION', 100.0)),
@@ -282,44 +284,11 @@ def process_weather_data(input_file, output_file, auto_fix=True):
         weather.lat = weather_config.get('latitude', 35.0)
         weather.wndht = weather_config.get('wind_height', 2.0)
         
-        for _, row in df.iterrows():
-            try:
-                date_value = row['Date']
-                
-                # 如果Date列已经是datetime类型，直接计算year和doy
-                if pd.api.types.is_datetime64_any_dtype(df['Date']) or isinstance(date_value, pd.Timestamp):
-                    if pd.isna(date_value):
-                        logger.warning(f"跳过包含NaN日期的行")
-                        continue
-                    year = date_value.year
-                    doy = date_value.timetuple().tm_yday
-                else:
-                    # 如果是字符串或其他格式，使用解析函数
-                    date_str = str(date_value)
-                    year, doy = parse_date_to_year_doy(date_str)
-                
-                index = f"{year:04d}-{doy:03d}"
-            except (ValueError, AttributeError) as e:
-                logger.error(f"跳过无效日期行: {date_value}, 错误: {str(e)}")
-                continue
-            
-            data = [
-                row['Srad'],
-                row['Tmax'],
-                row['Tmin'],
-                row.get('Vapr', np.nan),
-                row.get('Tdew', np.nan),
-                row['RHmax'],
-                row['RHmin'],
-                row['Wndsp'],
-                row['Rain'],
-                np.nan,  
-                row.get('MorP', 'M')
-            ]
-            
-            weather.wdata.loc[index] = data
-            
-            weather.wdata.loc[index, 'ETref'] = weather.compute_etref(index)
+        # 输入中的ETref不参与计算,统一按站点参数重新计算
+        df['ETref'] = np.nan
+        weather.wdata = _build_wdata_frame(df)
+        if not weather.wdata.empty:
+            weather.wdata['ETref'] = _compute_etref_array(weather, weather.wdata)
         
         weather.savefile(output_file)
         logger.info(f"天气文件成功保存到: {output_file}")
@@ -436,6 +405,92 @@ def Weather_wth(input_file, output_file):
         logger.error(traceback.format_exc())
         return False
 
+WDATA_COLUMNS = ['Srad', 'Tmax', 'Tmin', 'Vapr', 'Tdew', 'RHmax', 'RHmin',
+                 'Wndsp', 'Rain', 'ETref', 'MorP']
+
+def _to_year_doy_index(dates):
+    """将Date列批量转换为pyfao56使用的Year-DOY索引
+    Args:
+        dates (pd.Series): 日期列,datetime类型或可被parse_date_to_year_doy解析的字符串
+    Returns:
+        pd.Series: 'YYYY-DDD'格式索引,无法解析的日期为None
+    """
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        invalid = dates.isna()
+        if invalid.any():
+            logger.warning(f"跳过{int(invalid.sum())}行包含NaN日期的数据")
+        return dates.dt.strftime('%Y-%j').where(~invalid, None)
+
+    # 已是'YYYY-DDD'格式的字符串直接作为索引,其余逐个解析
+    date_strs = dates.astype(str).str.strip()
+    doy_format = date_strs.str.fullmatch(r'\d{4}-\d{3}')
+    if doy_format.all():
+        doy = date_strs.str[-3:].astype(int)
+        if doy.between(1, 366).all():
+            return date_strs
+
+    def _parse(date_value):
+        try:
+            year, doy = parse_date_to_year_doy(str(date_value))
+            return f"{year:04d}-{doy:03d}"
+        except (ValueError, AttributeError) as e:
+            logger.error(f"跳过无效日期行: {date_value}, 错误: {str(e)}")
+            return None
+
+    return dates.map(_parse)
+
+def _keep_last_by_index(frame):
+    """按索引去重,保留最后一次出现的值和第一次出现的位置(与逐行loc赋值的覆盖语义一致)"""
+    if not frame.index.has_duplicates:
+        return frame
+    order = pd.unique(frame.index)
+    return frame[~frame.index.duplicated(keep='last')].reindex(order)
+
+def _build_wdata_frame(df):
+    """由天气DataFrame一次性构建pyfao56的wdata表
+    Args:
+        df (pd.DataFrame): 含Date及WDATA_COLUMNS各列的天气数据
+    Returns:
+        pd.DataFrame: 以'YYYY-DDD'为索引的wdata表(数值列为float64,与pyfao56逐行写入时一致)
+    """
+    index = _to_year_doy_index(df['Date'])
+    valid = index.notna().to_numpy()
+
+    frame = df.loc[valid, WDATA_COLUMNS].copy()
+    numeric_cols = WDATA_COLUMNS[:-1]
+    frame[numeric_cols] = frame[numeric_cols].apply(pd.to_numeric, errors='coerce').astype(float)
+    frame.index = pd.Index(index[valid].to_numpy(), dtype=object)
+    return _keep_last_by_index(frame)
+
+def _merge_wdata(existing, new):
+    """将新数据合并到已有wdata中,相同日期以新数据覆盖"""
+    return _keep_last_by_index(pd.concat([existing, new]))
+
+def _round_as_saved(values, decimals):
+    """按pyfao56文件格式化精度取整,结果与写出后再读回的数值完全一致"""
+    if np.ndim(values) == 0:
+        return float(f"{float(values):.{decimals}f}")
+    return np.char.mod(f'%.{decimals}f', np.asarray(values, dtype=float)).astype(float)
+
+def _compute_etref_array(weather, frame):
+    """按pyfao56天气对象的站点参数批量计算wdata片段的ETref
+    Args:
+        weather (pyfao56.Weather): 提供z/lat/wndht/rfcrp站点参数的天气对象
+        frame (pd.DataFrame): 以'YYYY-DDD'为索引的wdata片段
+    Returns:
+        np.ndarray: 每日ETref (mm)
+    """
+    def column(name):
+        return frame[name].to_numpy(dtype=float)
+
+    return penman_monteith(
+        column('Srad'), column('Tmax'), column('Tmin'),
+        frame.index.str[-3:].astype(float).to_numpy(),
+        vapr=column('Vapr'), tdew=column('Tdew'),
+        rhmax=column('RHmax'), rhmin=column('RHmin'), wndsp=column('Wndsp'),
+        elevation=weather.z, latitude=weather.lat,
+        wind_height=weather.wndht, reference_crop=weather.rfcrp)
+
 class WeatherET:
     """气象数据处理类,用于FAO模型"""
     
@@ -548,48 +603,44 @@ class WeatherET:
         if 'ETref' not in df.columns:
             df['ETref'] = np.nan
             
-        for _, row in df.iterrows():
-            try:
-                date_value = row['Date']
-                
-                # 如果Date列已经是datetime类型，直接计算year和doy
-                if pd.api.types.is_datetime64_any_dtype(df['Date']) or isinstance(date_value, pd.Timestamp):
-                    if pd.isna(date_value):
-                        logger.warning(f"跳过包含NaN日期的行")
-                        continue
-                    year = date_value.year
-                    doy = date_value.timetuple().tm_yday
-                else:
-                    # 如果是字符串或其他格式，使用解析函数
-                    date_str = str(date_value)
-                    year, doy = parse_date_to_year_doy(date_str)
-                
-                index = f"{year:04d}-{doy:03d}"
-            except (ValueError, AttributeError) as e:
-                logger.error(f"跳过无效日期行: {date_value}, 错误: {str(e)}")
-                continue
-            
-            data_row = [
-                row['Srad'],
-                row['Tmax'],
-                row['Tmin'],
-                row.get('Vapr', np.nan),
-                row.get('Tdew', np.nan),
-                row['RHmax'],
-                row['RHmin'],
-                row['Wndsp'],
-                row['Rain'],
-                row.get('ETref', np.nan),
-                row.get('MorP', 'M')
-            ]
-            
-            self.weather.wdata.loc[index] = data_row
-            
-            if pd.isna(self.weather.wdata.loc[index, 'ETref']):
-                self.weather.wdata.loc[index, 'ETref'] = self.weather.compute_etref(index)
+        # 一次性构建wdata,避免逐行loc扩展和逐行计算ETref
+        wdata = _build_wdata_frame(df)
+        loaded_index = wdata.index
+        if not self.weather.wdata.empty:
+            wdata = _merge_wdata(self.weather.wdata, wdata)
+        
+        # 仅对本次加载且ETref缺失的日期计算ETref
+        missing = wdata.index.isin(loaded_index) & wdata['ETref'].isna().to_numpy()
+        if missing.any():
+            wdata.loc[missing, 'ETref'] = _compute_etref_array(self.weather, wdata.loc[missing])
+        
+        self.weather.wdata = wdata
         
         logger.info(f"成功加载天气数据: {len(self.weather.wdata)}行, 日期范围: {start_date or '全部'} 到 {end_date or '全部'}")
         
+    def to_fao_weather(self):
+        """构建可直接传给pyfao56.Model的Weather对象,无需经过.wth文件往返
+        
+        数值按.wth文件的保存精度取整(站点参数7位、逐日数据2位小数),
+        与savefile后再loadfile得到的数据一致
+        
+        Returns:
+            pyfao56.Weather: 天气对象
+        """
+        wth = pyfao56.Weather(comment=self.comment)
+        wth.rfcrp = self.weather.rfcrp
+        wth.z = _round_as_saved(self.weather.z, 7)
+        wth.lat = _round_as_saved(self.weather.lat, 7)
+        wth.wndht = _round_as_saved(self.weather.wndht, 7)
+        
+        wdata = self.weather.wdata.copy()
+        numeric_cols = WDATA_COLUMNS[:-1]
+        for col in numeric_cols:
+            wdata[col] = _round_as_saved(wdata[col].to_numpy(dtype=float), 2)
+        wdata['MorP'] = wdata['MorP'].astype(str).str.strip()
+        wth.wdata = wdata
+        return wth
+        
     def savefile(self, output_file):
         """保存数据到文件
         
@@ -24,7 +24,11 @@
 - max_retries - API请求最大重试次数 (默认值: 3) 历史数据处理参数 (2个)
 - wheat_season_start_month - 用于历史数据筛选 (默认值: 8,在 is_after_forecast 函数中)
 - wheat_season_end_month - 用于历史数据筛选 (默认值: 7,在 is_after_forecast 函数中)
-- wheat_season_end_day - 用于历史数据筛选 (默认值: 31,在 is_after_forecast 函数中)
+- wheat_season_end_day - 用于历史数据筛选 (默认值: 31,在 is_after_forecast 函数中) 本地缓存参数 (4个)
+- archive_enabled - 是否启用本地天气归档,只获取尚未归档的历史日期 (默认值: True)
+- archive_path - 归档SQLite文件路径 (默认值: data/weather/weather_archive.sqlite3)
+- archive_refresh_days - 最近几天(含当天)的历史数据每次重新获取 (默认值: 2)
+- forecast_cache_ttl_minutes - 天气预报缓存时间 (默认值: 60分钟)
 """
 import os
 import sys
@@ -33,10 +37,17 @@ import pandas as pd
 import numpy as np
 import datetime
 import logging
+import time
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 sys.path.append(project_root)
 
+from src.models.weather_cache import WeatherArchive, location_key
+
 try:
     from src.config.config import get_config
     config = get_config()
@@ -71,7 +82,11 @@ if not hasattr(config, 'WEATHER_CONFIG'):
         'cotton_season_end_day': 31,      # 棉花生长季结束日期
         'history_years': 5,               # 历史数据年数
         'api_timeout': 15,                # API请求超时时间（秒）
-        'max_retries': 3                  # API请求最大重试次数
+        'max_retries': 3,                 # API请求最大重试次数
+        'archive_enabled': True,          # 是否启用本地天气归档
+        'archive_path': 'data/weather/weather_archive.sqlite3',
+        'archive_refresh_days': 2,        # 最近几天的历史数据每次重新获取
+        'forecast_cache_ttl_minutes': 60  # 天气预报缓存时间（分钟）
     }
     logger.info("在配置中添加天气模块默认配置")
 
@@ -199,9 +214,158 @@ def fetch_weather_forecast(lat, lon, max_retries=None):
                 return None
 
 
+_archive = None
+_archive_lock = threading.Lock()
+
+def get_weather_archive():
+    """获取本地天气归档，未启用或初始化失败时返回None"""
+    global _archive
+    if not config.WEATHER_CONFIG.get('archive_enabled', True):
+        return None
+    with _archive_lock:
+        if _archive is None:
+            try:
+                db_path = config.WEATHER_CONFIG.get('archive_path', 'data/weather/weather_archive.sqlite3')
+                if not os.path.isabs(db_path):
+                    db_path = os.path.join(project_root, db_path)
+                _archive = WeatherArchive(
+                    db_path,
+                    refresh_days=config.WEATHER_CONFIG.get('archive_refresh_days', 2),
+                    forecast_ttl=config.WEATHER_CONFIG.get('forecast_cache_ttl_minutes', 60) * 60)
+            except Exception as e:
+                logger.error(f"初始化天气归档失败: {str(e)}，直接请求天气接口")
+                return None
+        return _archive
+
+
+def fetch_weather_history_cached(lat, lon, start_date, end_date, archive=None):
+    """获取历史天气数据，只向接口请求本地归档中缺失的日期
+    
+    Args:
+        lat (float): 纬度
+        lon (float): 经度
+        start_date (str): 开始日期,格式YYYYMMDD
+        end_date (str): 结束日期,格式YYYYMMDD
+        archive (WeatherArchive, optional): 本地归档，为None时直接请求接口
+        
+    Returns:
+        dict: 与接口格式相同的 {'data': [...]},任一缺失区间请求失败时返回None
+    """
+    if archive is None:
+        return fetch_weather_history(lat, lon, start_date, end_date)
+    for missing_start, missing_end in archive.missing_ranges(lat, lon, start_date, end_date):
+        result = fetch_weather_history(lat, lon, missing_start, missing_end)
+        if not result:
+            return None
+        archive.save_history(lat, lon, missing_start, missing_end, result.get('data') or [])
+    return archive.load_history(lat, lon, start_date, end_date)
+
+
+def fetch_weather_forecast_cached(lat, lon, archive=None):
+    """获取天气预报，TTL内复用本地缓存
+    
+    Returns:
+        dict: 天气预报数据,请求失败时返回None
+    """
+    if archive is not None:
+        cached = archive.get_forecast(lat, lon)
+        if cached is not None:
+            logger.info(f"使用缓存的天气预报: 经度={lon}, 纬度={lat}")
+            return cached
+    result = fetch_weather_forecast(lat, lon)
+    if result and archive is not None:
+        archive.save_forecast(lat, lon, result)
+    return result
+
+
+def fetch_weather_sources(lat, lon, model_start_date, history_start_date, current_date_str):
+    """并发获取生长季实际数据、天气预报与多年历史数据
+    
+    启用本地归档时，生长季实际数据是多年历史数据的子区间，
+    在历史数据补齐后直接从归档中读取，不再单独请求接口
+    
+    Returns:
+        tuple: (weather_current, weather_forecast, weather_history)，失败的数据源为None
+    """
+    archive = get_weather_archive()
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix='weather-fetch') as executor:
+        forecast_future = executor.submit(fetch_weather_forecast_cached, lat, lon, archive)
+        history_future = executor.submit(fetch_weather_history_cached, lat, lon, history_start_date,
+                                         current_date_str, archive)
+        if archive is None:
+            current_future = executor.submit(fetch_weather_history, lat, lon, model_start_date, current_date_str)
+        weather_history = history_future.result()
+        if archive is None:
+            weather_current = current_future.result()
+        elif weather_history and history_start_date <= model_start_date:
+            weather_current = archive.load_history(lat, lon, model_start_date, current_date_str)
+        else:
+            weather_current = fetch_weather_history_cached(lat, lon, model_start_date, current_date_str, archive)
+        weather_forecast = forecast_future.result()
+    return weather_current, weather_forecast, weather_history
+
+
+_climatology_cache = {}
+_climatology_lock = threading.Lock()
+
+def _history_fingerprint(records):
+    """历史数据的内容指纹：全部记录的sha1
+
+    归档每次重新获取最近 archive_refresh_days 天的数据，修正的数值可能位于记录中间，
+    只比较记录数与首尾日期会在当天剩余时间内继续使用过期的日均值
+    """
+    payload = json.dumps(records, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def compute_climatology(lat, lon, weather_history, first_year, second_year):
+    """计算历史日均值（按位置记忆化）
+    
+    筛选结果只依赖位置、生长季年份、当天日期与历史数据本身，
+    同一天内相同位置的重复计算直接复用上次结果
+    
+    Args:
+        weather_history (dict): 接口格式的历史天气数据
+        
+    Returns:
+        tuple: (daily_avg, weather_history_data) 历史日均值与筛选后的历史数据(均为副本)
+    """
+    records = weather_history['data']
+    key = (location_key(lat, lon), first_year, second_year, datetime.date.today(),
+           config.WEATHER_CONFIG.get('history_years', 5), _history_fingerprint(records))
+    with _climatology_lock:
+        cached = _climatology_cache.get(key)
+    if cached is not None:
+        logger.info(f"复用位置({lat}, {lon})的历史日均值")
+        return cached[0].copy(), cached[1].copy()
+
+    weather_history_data = pd.DataFrame(records)
+    weather_history_data['datetime'] = pd.to_datetime(weather_history_data['datetime'], format='%Y%m%d')
+    
+    weather_history_data = weather_history_data[
+        after_forecast_mask(weather_history_data['datetime'], second_year)]
+    
+    daily_avg = weather_history_data.groupby([
+        weather_history_data['datetime'].dt.month, 
+        weather_history_data['datetime'].dt.day]).mean(numeric_only=True)
+    
+    daily_avg.index = climatology_index(daily_avg.index.get_level_values(0),
+                                        daily_avg.index.get_level_values(1), first_year, second_year)
+    daily_avg = daily_avg.sort_values(by="datetime")
+
+    with _climatology_lock:
+        # 只保留当天的结果，避免跨天累积
+        for stale_key in [k for k in _climatology_cache if k[3] != key[3]]:
+            del _climatology_cache[stale_key]
+        _climatology_cache[key] = (daily_avg, weather_history_data)
+    return daily_avg.copy(), weather_history_data.copy()
+
+
 def is_after_forecast(row, second_year):
     """判断日期是否在预报期之后（用于筛选历史数据）
     
+    逐行版本，prepare_weather_data 使用向量化的 after_forecast_mask
+    
     Args:
         row (pd.Series): 包含datetime字段的数据行
         second_year (int): 第二年年份（小麦生长季的第二年）
@@ -249,9 +413,70 @@ def is_after_forecast(row, second_year):
     return False
 
 
+def after_forecast_mask(datetimes, second_year, now=None):
+    """is_after_forecast 的向量化版本，返回与 datetimes 等长的布尔数组
+    
+    Args:
+        datetimes (pd.Series): 历史数据的日期列
+        second_year (int): 第二年年份（小麦生长季的第二年）
+        now (datetime, optional): 当前时间，默认取系统时间
+        
+    Returns:
+        np.ndarray: 需要保留的行为True
+    """
+    history_years = config.WEATHER_CONFIG.get('history_years', 5)
+    wheat_season_start_month = config.WEATHER_CONFIG.get('wheat_season_start_month', 8)
+    wheat_season_end_month = config.WEATHER_CONFIG.get('wheat_season_end_month', 7)
+    wheat_season_end_day = config.WEATHER_CONFIG.get('wheat_season_end_day', 31)
+    
+    now = now or datetime.datetime.now()
+    forecast_end_date = now + datetime.timedelta(days=14)
+    # 月日按 month*100+day 编码，比较结果与 (month, day) 元组比较一致
+    forecast_end_md = forecast_end_date.month * 100 + forecast_end_date.day
+    season_end_md = wheat_season_end_month * 100 + wheat_season_end_day
+    first_history_year = now.year - history_years
+    
+    dates = pd.DatetimeIndex(datetimes)
+    years = dates.year.to_numpy()
+    months = dates.month.to_numpy()
+    row_md = months * 100 + dates.day.to_numpy()
+    
+    # 第二年不是闰年时2月29日无效
+    second_is_leap = second_year % 4 == 0 and (second_year % 100 != 0 or second_year % 400 == 0)
+    date_is_valid = np.ones(len(dates), dtype=bool) if second_is_leap else row_md != 229
+    
+    if now.month < wheat_season_start_month:
+        keep = (row_md <= season_end_md) & (row_md > forecast_end_md) & (years >= first_history_year)
+    else:
+        keep = (row_md > forecast_end_md) | ((row_md <= season_end_md) & (years > first_history_year))
+    return keep & date_is_valid
+
+
+def climatology_index(months, days, first_year, second_year):
+    """add_year 的向量化版本：根据月日为历史日均值生成日期索引
+    
+    Args:
+        months, days (array-like): 月、日
+        first_year (int): 第一年年份
+        second_year (int): 第二年年份
+        
+    Returns:
+        pd.DatetimeIndex: 名为datetime的日期索引，生长季结束日之后的月日归入第一年
+    """
+    wheat_season_end_month = config.WEATHER_CONFIG.get('wheat_season_end_month', 7)
+    wheat_season_end_day = config.WEATHER_CONFIG.get('wheat_season_end_day', 31)
+    months = np.asarray(months, dtype=int)
+    days = np.asarray(days, dtype=int)
+    after_season_end = months * 100 + days > wheat_season_end_month * 100 + wheat_season_end_day
+    years = np.where(after_season_end, first_year, second_year)
+    return pd.DatetimeIndex(pd.to_datetime({'year': years, 'month': months, 'day': days}), name='datetime')
+
+
 def add_year(row, first_year, second_year):
     """根据月日为历史平均数据添加年份
     
+    逐行版本，prepare_weather_data 使用向量化的 climatology_index
+    
     Args:
         row (pd.Series): 数据行（包含月日信息）
         first_year (int): 第一年年份
@@ -275,7 +500,7 @@ def add_year(row, first_year, second_year):
 
 
 def prepare_weather_data(lat=None, lon=None, crop_type=None, output_file=None, 
-                        history_file=None):
+                        history_file=None, persist=True):
     """准备作物灌溉所需的天气数据
     
     将历史数据、当前实际数据和未来预测数据合并为完整的天气数据集
@@ -286,10 +511,20 @@ def prepare_weather_data(lat=None, lon=None, crop_type=None, output_file=None,
         crop_type (str, optional): 作物类型，默认使用配置值
         output_file (str, optional): 输出文件名
         history_file (str, optional): 历史数据文件名
+        persist (bool, optional): 是否将结果和筛选后的历史数据写入CSV文件,默认为True
         
     Returns:
-        pd.DataFrame: 准备好的天气数据,失败时返回None
+        pd.DataFrame: 准备好的天气数据,失败时返回None;
+            各阶段耗时(秒)记录在返回值的attrs['stage_timings']中
     """
+    timings = {}
+    stage_start = [time.perf_counter()]
+    
+    def _mark(stage):
+        now = time.perf_counter()
+        timings[stage] = now - stage_start[0]
+        stage_start[0] = now
+    
     try:
         # 使用配置值或提供的参数
         latitude = lat if lat is not None else config.WEATHER_CONFIG.get('latitude', 35)
@@ -326,34 +561,24 @@ def prepare_weather_data(lat=None, lon=None, crop_type=None, output_file=None,
         history_start_date = f"{first_year - history_years}{start_month:02d}{start_day:02d}"
         model_end_date = f"{second_year}{end_month:02d}{end_day:02d}"
         
-        weather_current = fetch_weather_history(latitude, longitude, model_start_date, current_date_str)
-        weather_forecast = fetch_weather_forecast(latitude, longitude)
-        weather_history = fetch_weather_history(latitude, longitude, history_start_date, current_date_str)
+        weather_current, weather_forecast, weather_history = fetch_weather_sources(
+            latitude, longitude, model_start_date, history_start_date, current_date_str)
         
         if not all([weather_current, weather_forecast, weather_history]):
             logger.error("一个或多个数据源获取失败")
             return None
+        _mark('数据获取')
         
         weather_current_data = pd.DataFrame(weather_current['data'])
         weather_current_data['datetime'] = pd.to_datetime(weather_current_data['datetime'], format='%Y%m%d')
         
-        weather_history_data = pd.DataFrame(weather_history['data'])
-        weather_history_data['datetime'] = pd.to_datetime(weather_history_data['datetime'], format='%Y%m%d')
-        
-        weather_history_data = weather_history_data[
-            weather_history_data.apply(is_after_forecast, axis=1, args=(second_year,))]
-        
-        logger.info(f"保存历史天气数据到文件: {history_file}")
-        weather_history_data.to_csv(history_file, encoding="utf-8", index=False)
-        
-        daily_avg = weather_history_data.groupby([
-            weather_history_data['datetime'].dt.month, 
-            weather_history_data['datetime'].dt.day]).mean(numeric_only=True)
+        daily_avg, weather_history_data = compute_climatology(
+            latitude, longitude, weather_history, first_year, second_year)
         
-        daily_avg["datetime"] = daily_avg.index
-        daily_avg = daily_avg.apply(add_year, axis=1, args=(first_year, second_year))
-        daily_avg.set_index("datetime", drop=True, inplace=True)
-        daily_avg = daily_avg.sort_values(by="datetime")
+        if persist:
+            logger.info(f"保存历史天气数据到文件: {history_file}")
+            weather_history_data.to_csv(history_file, encoding="utf-8", index=False)
+        _mark('历史数据筛选与日均值计算')
         
         weather_forecast_data = pd.DataFrame(weather_forecast['data'])
         weather_forecast_data['datetime'] = pd.to_datetime(weather_forecast_data['datatime'], format='%Y%m%d')
@@ -411,11 +636,16 @@ def prepare_weather_data(lat=None, lon=None, crop_type=None, output_file=None,
         output_columns = ['Date', 'Srad', 'Tmax', 'Tmin', 'Vapr',
                           'Tdew', 'RHmax', 'RHmin', 'Wndsp', 'Rain', 'Etref', 'MorP']
         full_weather_data = full_weather_data[output_columns]
+        _mark('数据合并')
         
-        logger.info(f"保存天气数据到文件: {output_file}")
-        full_weather_data.to_csv(output_file, index=False)
+        if persist:
+            logger.info(f"保存天气数据到文件: {output_file}")
+            full_weather_data.to_csv(output_file, index=False)
+            _mark('文件保存')
         
-        logger.info(f"天气数据处理完成，共{len(full_weather_data)}条记录")
+        full_weather_data.attrs['stage_timings'] = timings
+        logger.info(f"天气数据处理完成，共{len(full_weather_data)}条记录, 各阶段耗时: "
+                    + ", ".join(f"{stage} {seconds:.3f}秒" for stage, seconds in timings.items()))
         return full_weather_data
     
     except Exception as e:
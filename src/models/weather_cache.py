@@ -0,0 +1,126 @@
+"""
+天气数据本地缓存
+- WeatherArchive: 按 (纬度, 经度, 日期) 保存91weather逐日历史数据的SQLite归档,
+  只向上游请求尚未归档的日期;最近 refresh_days 天的数据可能被修订,不计入已归档区间
+- 天气预报按 (纬度, 经度) 保存在同一文件中,超过 TTL 后重新获取
+归档与预报都以原始接口记录(JSON)保存,读取时还原为与接口相同的 {'data': [...]} 结构
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import datetime
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = '%Y%m%d'
+
+def _shift(day, days):
+    return (datetime.datetime.strptime(day, DATE_FORMAT) + datetime.timedelta(days=days)).strftime(DATE_FORMAT)
+
+def location_key(lat, lon):
+    """坐标统一保留4位小数作为位置键"""
+    return f"{float(lat):.4f}", f"{float(lon):.4f}"
+
+class WeatherArchive:
+    """逐日历史天气与天气预报的本地SQLite缓存"""
+
+    def __init__(self, db_path, refresh_days=2, forecast_ttl=3600):
+        """
+        参数:
+            db_path: SQLite文件路径
+            refresh_days: 最近多少天(含当天)的历史数据视为未定稿,每次重新获取
+            forecast_ttl: 天气预报缓存秒数
+        """
+        self.db_path = db_path
+        self.refresh_days = max(1, int(refresh_days))
+        self.forecast_ttl = forecast_ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''CREATE TABLE IF NOT EXISTS daily (
+                                lat TEXT NOT NULL,
+                                lon TEXT NOT NULL,
+                                day TEXT NOT NULL,
+                                record TEXT NOT NULL,
+                                PRIMARY KEY (lat, lon, day))''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS coverage (
+                                lat TEXT NOT NULL,
+                                lon TEXT NOT NULL,
+                                start_day TEXT NOT NULL,
+                                end_day TEXT NOT NULL,
+                                PRIMARY KEY (lat, lon))''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS forecast (
+                                lat TEXT NOT NULL,
+                                lon TEXT NOT NULL,
+                                fetched_at REAL NOT NULL,
+                                payload TEXT NOT NULL,
+                                PRIMARY KEY (lat, lon))''')
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _final_day(self):
+        return (datetime.datetime.now() - datetime.timedelta(days=self.refresh_days)).strftime(DATE_FORMAT)
+
+    def get_coverage(self, lat, lon):
+        """返回已归档的日期区间 (start_day, end_day),没有时返回None"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT start_day, end_day FROM coverage WHERE lat = ? AND lon = ?',
+                               location_key(lat, lon)).fetchone()
+        return tuple(row) if row else None
+
+    def missing_ranges(self, lat, lon, start_day, end_day):
+        """计算 [start_day, end_day](YYYYMMDD) 中尚未归档的日期区间列表"""
+        coverage = self.get_coverage(lat, lon)
+        if coverage is None or coverage[0] > coverage[1]:
+            return [(start_day, end_day)]
+        ranges = []
+        if start_day < coverage[0]:
+            ranges.append((start_day, min(end_day, _shift(coverage[0], -1))))
+        if end_day > coverage[1]:
+            ranges.append((max(start_day, _shift(coverage[1], 1)), end_day))
+        return ranges
+
+    def save_history(self, lat, lon, start_day, end_day, records):
+        """保存一次历史数据请求的结果并扩展已归档区间"""
+        key = location_key(lat, lon)
+        rows = [key + (str(record['datetime']), json.dumps(record, ensure_ascii=False))
+                for record in records if record.get('datetime')]
+        covered_end = min(end_day, self._final_day())
+        with self._lock, self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO daily VALUES (?, ?, ?, ?)', rows)
+            if start_day <= covered_end:
+                row = conn.execute('SELECT start_day, end_day FROM coverage WHERE lat = ? AND lon = ?', key).fetchone()
+                if row is None:
+                    new_range = (start_day, covered_end)
+                elif start_day <= _shift(row[1], 1) and covered_end >= _shift(row[0], -1):
+                    new_range = (min(start_day, row[0]), max(covered_end, row[1]))
+                else:
+                    new_range = (start_day, covered_end) if covered_end > row[1] else tuple(row)
+                conn.execute('INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?)', key + new_range)
+        logger.info(f"天气归档写入{len(rows)}天: {start_day} 到 {end_day}")
+
+    def load_history(self, lat, lon, start_day, end_day):
+        """读取 [start_day, end_day] 内的历史数据,返回与接口相同的 {'data': [...]} 结构"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT record FROM daily WHERE lat = ? AND lon = ? AND day BETWEEN ? AND ? '
+                                'ORDER BY day', location_key(lat, lon) + (start_day, end_day)).fetchall()
+        return {'data': [json.loads(row[0]) for row in rows]}
+
+    def get_forecast(self, lat, lon):
+        """返回未过期的天气预报,没有或已过期时返回None"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT fetched_at, payload FROM forecast WHERE lat = ? AND lon = ?',
+                               location_key(lat, lon)).fetchone()
+        if row is None or time.time() - row[0] >= self.forecast_ttl:
+            return None
+        return json.loads(row[1])
+
+    def save_forecast(self, lat, lon, payload):
+        with self._lock, self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO forecast VALUES (?, ?, ?, ?)',
+                         location_key(lat, lon) + (time.time(), json.dumps(payload, ensure_ascii=False)))
@@ -1,7 +1,14 @@
 # services包初始化文件
 from .irrigation_service import IrrigationService
+from .model_refresh import ModelRefreshService, get_model_refresher
+from .model_jobs import ModelJob, ModelJobService, get_model_job_service
+from .weather_cells import WeatherCell, group_fields_by_cell, run_cell_models
+from .field_crops import group_fields_by_soil, run_field_models
 
-__all__ = ['IrrigationService']
+__all__ = ['IrrigationService', 'ModelRefreshService', 'get_model_refresher',
+           'ModelJob', 'ModelJobService', 'get_model_job_service',
+           'WeatherCell', 'group_fields_by_cell', 'run_cell_models',
+           'group_fields_by_soil', 'run_field_models']
 
 # 导出需要在其他文件中直接使用的函数
 # 这些函数在routes.py中被直接导入
@@ -0,0 +1,197 @@
+"""
+多田块AquaCrop模拟
+各田块的土壤水力参数(SAT/FC/PWP)不同,生育阶段与根系深度需要按田块分别模拟:
+田块按换算后的土壤参数分组,每组在进程池中运行一次AquaCrop整季模拟,结果写入该组每个田块的输出目录
+(AQUACROP_CONFIG['FIELD_OUTPUT_DIR']/<field_id>),灌溉服务按田块读取生育阶段与根系深度系数;
+仅在启用 PER_FIELD_ENABLED 且田块的模拟清单不早于共用模拟的清单时使用田块输出,
+关闭多田块模拟或田块所在组模拟失败后自动回退到共用输出
+主要组件:
+- group_fields_by_soil: 将田块按土壤参数分组
+- run_field_models: 在进程池中并行运行各土壤参数组的AquaCrop模拟
+- get_field_crop_output: 获取田块的AquaCrop输出文件路径
+- get_field_root_depths: 读取田块逐日根系深度,按文件修改时间/大小缓存解析结果
+"""
+import os
+import sys
+import time
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.append(project_root)
+
+import pandas as pd
+
+from src.utils.logger import logger
+from config import Config
+
+# 与 aquacrop_modeling.RUN_MANIFEST_FILE 一致;读取田块输出时不导入aquacrop模块
+RUN_MANIFEST_FILE = 'aquacrop_run_manifest.json'
+FIELD_OUTPUT_FILES = ['daily_crop_growth.csv', 'daily_water_storage.csv', 'aquacrop_daily_water_flux.csv',
+                      RUN_MANIFEST_FILE, 'growth_stages.csv']
+
+def get_field_output_dir(field_id, config=None):
+    """获取田块的AquaCrop输出目录"""
+    config = config or Config
+    output_dir = config.AQUACROP_CONFIG.get('FIELD_OUTPUT_DIR', 'data/model_output/fields')
+    if not os.path.isabs(output_dir):
+        output_dir = os.path.join(project_root, output_dir)
+    return os.path.join(output_dir, str(field_id))
+
+def _shared_manifest_path(config):
+    output_dir = config.AQUACROP_CONFIG.get('OUTPUT_DIR', 'data/model_output')
+    if not os.path.isabs(output_dir):
+        output_dir = os.path.join(project_root, output_dir)
+    return os.path.join(output_dir, RUN_MANIFEST_FILE)
+
+def get_field_crop_output(field_id, filename, config=None):
+    """获取田块的AquaCrop输出文件路径
+
+    每次模拟(包括复用上次结果)都会更新模拟清单的修改时间,田块清单早于共用模拟的清单时
+    说明田块输出未随最近一次刷新更新(田块所在组模拟失败或只刷新了共用模拟),不再使用
+    返回:
+        str: 文件路径;未启用多田块模拟、该田块尚未单独模拟或输出已过期时返回None
+    """
+    config = config or Config
+    if not field_id or not config.AQUACROP_CONFIG.get('PER_FIELD_ENABLED', False):
+        return None
+    field_dir = get_field_output_dir(field_id, config)
+    path = os.path.join(field_dir, filename)
+    try:
+        field_updated_at = os.path.getmtime(os.path.join(field_dir, RUN_MANIFEST_FILE))
+    except OSError:
+        return None
+    if not os.path.exists(path):
+        return None
+    shared_manifest = _shared_manifest_path(config)
+    if os.path.exists(shared_manifest) and field_updated_at < os.path.getmtime(shared_manifest):
+        logger.warning(f"[田块 {field_id}] 田块AquaCrop输出早于共用模拟，使用共用输出")
+        return None
+    return path
+
+_root_depth_cache = {}
+_root_depth_lock = threading.Lock()
+
+def get_field_root_depths(path):
+    """读取田块AquaCrop模拟的逐日根系深度,文件未变化(修改时间/大小)时复用上次的解析结果
+
+    返回:
+        tuple: (日期数组 datetime64[ns], 根系深度数组 m);文件不存在时返回None
+    """
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _root_depth_lock:
+        cached = _root_depth_cache.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    crop_growth = pd.read_csv(path, usecols=['Date', 'z_root'], parse_dates=['Date']).dropna()
+    depths = (crop_growth['Date'].to_numpy(dtype='datetime64[ns]'), crop_growth['z_root'].to_numpy(dtype=float))
+    with _root_depth_lock:
+        _root_depth_cache[path] = (version, depths)
+    return depths
+
+def group_fields_by_soil(fields=None, config=None):
+    """将田块按换算后的土壤参数分组
+
+    土壤参数读取方式与单田块模拟一致(传感器/手动配置,失败时使用配置文件默认值)
+    参数:
+        fields: 田块配置列表,默认使用 FIELDS_CONFIG
+    返回:
+        OrderedDict: {(thS, thFC, thWP): [田块配置, ...]},按田块首次出现顺序
+    """
+    from src.aquacrop.aquacrop_modeling import resolve_soil_values
+    from src.devices.soil_sensor import SoilSensor
+    config = config or Config
+    fields = config.FIELDS_CONFIG if fields is None else fields
+    groups = OrderedDict()
+    for field in fields:
+        field_id = field.get('field_id')
+        try:
+            soil_params = SoilSensor(field.get('device_id'), field_id).get_current_data()
+        except Exception as e:
+            logger.warning(f"[田块 {field_id}] 获取土壤传感器数据失败，使用配置文件默认值: {str(e)}")
+            soil_params = None
+        soil_values = tuple(round(float(value), 4) for value in resolve_soil_values(soil_params, config.AQUACROP_CONFIG))
+        groups.setdefault(soil_values, []).append(field)
+    return groups
+
+def _run_soil_group(weather_file, soil_values, output_dirs, force_rerun=False):
+    """在子进程中运行一组土壤参数的AquaCrop模拟,并将结果写入组内各田块的输出目录"""
+    from config import current_config
+    from src.aquacrop.aquacrop_modeling import (load_aquacrop_weather, run_soil_simulation, save_growth_stages,
+                                                get_current_growth_stage, MODEL_CHECKPOINT_FILE)
+    app_config = current_config()
+    config = app_config.AQUACROP_CONFIG
+    aquacrop_irr_config = {**config, **app_config.AQUACROP_IRRIGATION_CONFIG}
+    weather_data = load_aquacrop_weather(weather_file)
+    primary_dir = output_dirs[0]
+    run_results, reused = run_soil_simulation(config, aquacrop_irr_config, weather_data, soil_values,
+                                              primary_dir, force_rerun=force_rerun)
+    stage_results = save_growth_stages(run_results['daily_crop_growth'], primary_dir)
+    for output_dir in output_dirs[1:]:
+        os.makedirs(output_dir, exist_ok=True)
+        for filename in FIELD_OUTPUT_FILES:
+            shutil.copyfile(os.path.join(primary_dir, filename), os.path.join(output_dir, filename))
+        # 组内田块变化后首个田块可能不同,检查点一并复制以便从任一田块目录继续模拟
+        checkpoint_path = os.path.join(primary_dir, MODEL_CHECKPOINT_FILE)
+        if os.path.exists(checkpoint_path):
+            shutil.copyfile(checkpoint_path, os.path.join(output_dir, MODEL_CHECKPOINT_FILE))
+    current_stage = get_current_growth_stage(stage_results)
+    return {
+        'reused': reused,
+        'warm_start': run_results.get('warm_start'),
+        'yield': run_results['yield'],
+        'current_stage': current_stage.get('阶段') if current_stage else None
+    }
+
+def run_field_models(config=None, fields=None, max_workers=None, force_rerun=False):
+    """并行运行各田块的AquaCrop模拟
+
+    土壤参数相同的田块只模拟一次;气象文件在主进程中转换一次,各子进程共用
+    参数:
+        fields: 田块配置列表,默认使用 FIELDS_CONFIG
+        max_workers: 进程数,默认取 AQUACROP_CONFIG['FIELD_MAX_WORKERS']
+        force_rerun: 为True时忽略上次的模拟结果
+    返回:
+        dict: {'fields': {field_id: {'output_dir', 'soil', 'reused', 'warm_start', 'yield', 'current_stage'}},
+               'groups': 模拟组数, 'errors': {field_id: 错误信息}, 'duration': 秒}
+    """
+    from src.aquacrop.aquacrop_modeling import prepare_aquacrop_weather_file
+    config = config or Config
+    start = time.time()
+    weather_file = prepare_aquacrop_weather_file(config)
+    groups = group_fields_by_soil(fields, config)
+    if max_workers is None:
+        max_workers = config.AQUACROP_CONFIG.get('FIELD_MAX_WORKERS', 4)
+    logger.info(f"开始运行各田块的AquaCrop模拟: 田块数={sum(len(v) for v in groups.values())}, 土壤参数组数={len(groups)}")
+
+    results, errors = {}, {}
+    if groups:
+        with ProcessPoolExecutor(max_workers=max(1, min(max_workers, len(groups)))) as executor:
+            futures = {}
+            for soil_values, group in groups.items():
+                output_dirs = [get_field_output_dir(field.get('field_id'), config) for field in group]
+                futures[executor.submit(_run_soil_group, weather_file, soil_values, output_dirs, force_rerun)] = soil_values
+            for future in as_completed(futures):
+                soil_values = futures[future]
+                group = groups[soil_values]
+                try:
+                    result = future.result()
+                    for field in group:
+                        field_id = field.get('field_id')
+                        results[field_id] = dict(result, soil=list(soil_values),
+                                                 output_dir=get_field_output_dir(field_id, config))
+                except Exception as e:
+                    for field in group:
+                        errors[field.get('field_id')] = str(e)
+                    logger.error(f"土壤参数组 {soil_values} 的AquaCrop模拟失败: {str(e)}")
+
+    duration = time.time() - start
+    logger.info(f"各田块AquaCrop模拟完成: 成功={len(results)}, 失败={len(errors)}, 耗时{duration:.2f}秒")
+    return {'fields': results, 'groups': len(groups), 'errors': errors, 'duration': duration}
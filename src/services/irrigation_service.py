@@ -28,16 +28,18 @@
 - 生育阶段系数字典，根据当前生育阶段获取对应的系数值
 """
 import os
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import sys
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 sys.path.append(project_root)
 
 from src.utils.logger import logger
 from src.models.fao_model import FAOModel
+from src.models.model_output import get_model_output_repository
 from config import Config
 
 class IrrigationService:
@@ -100,19 +102,49 @@ class IrrigationService:
         
 
         
-    @lru_cache(maxsize=32)
-    def _get_cached_sensor_data(self, device_id, field_id, hour_timestamp):
-        """带缓存的传感器数据获取（按小时粒度缓存）
+    def _get_model_output_path(self, field_id=None):
+        """获取田块使用的模型输出文件路径
+        
+        启用多地点天气(WEATHER_CONFIG['multi_location_enabled'])且田块所在天气网格已有输出时
+        使用该网格的输出，否则使用默认模型输出
+        
+        Args:
+            field_id (str, optional): 田块ID
+            
+        Returns:
+            str: 模型输出文件路径
+        """
+        if field_id and getattr(self.config, 'WEATHER_CONFIG', {}).get('multi_location_enabled', False):
+            from src.services.weather_cells import get_field_model_output
+            cell_output = get_field_model_output(field_id, self.config)
+            if cell_output:
+                return cell_output
+            logger.warning(f"[田块 {field_id}] 所在天气网格尚无模型输出，使用默认模型输出")
+        return self._get_file_path('model_output')
+        
+    def _get_growth_stages_path(self, field_id=None):
+        """获取田块使用的生育阶段文件路径，田块未单独模拟AquaCrop时使用默认文件"""
+        if field_id:
+            from src.services.field_crops import get_field_crop_output
+            field_stages = get_field_crop_output(field_id, 'growth_stages.csv', self.config)
+            if field_stages:
+                return field_stages
+        return self._get_file_path('growth_stages')
+        
+    def _get_cached_sensor_data(self, device_id, field_id, sensor_snapshot=None):
+        """带缓存的传感器数据获取（与API路由共用 sensor_cache）
         
         Args:
             device_id (str): 设备ID
             field_id (str): 地块ID
-            hour_timestamp (str): 小时粒度时间戳，用于缓存过期控制
+            sensor_snapshot (SensorSnapshot, optional): 请求级传感器快照，传入时直接复用其读数
             
         Returns:
             dict: 传感器数据
         """
         try:
+            if sensor_snapshot is not None:
+                return sensor_snapshot.get()
             from src.devices.soil_sensor import SoilSensor
             soil_sensor = SoilSensor(device_id=device_id, field_id=field_id)
             return soil_sensor.get_current_data()
@@ -124,16 +156,23 @@ class IrrigationService:
                 'pwp': Config.DEFAULT_SOIL_PARAMS['pwp']
             }
         
-    def get_root_depth_coefficient(self, out_file=None):
+    def get_root_depth_coefficient(self, out_file=None, field_id=None):
         """从模型输出文件中读取根系深度系数
         
+        田块已单独运行AquaCrop模拟(services.field_crops)时使用该田块模拟的根系深度
+        
         Args:
             out_file (str, optional): 输出文件路径,如果为None则使用默认路径
+            field_id (str, optional): 田块ID
             
         Returns:
             float: 根系深度系数 (0.5 或 1.0)
         """
         try:
+            field_root_depth = self._get_field_root_depth(field_id)
+            if field_root_depth is not None:
+                return self._root_depth_to_coefficient(field_root_depth, field_id)
+            
             # 使用默认文件路径或传入的路径
             if out_file is None:
                 file_path = self._get_file_path('model_output')
@@ -145,41 +184,23 @@ class IrrigationService:
                 logger.warning(f"模型输出文件不存在: {file_path}")
                 return Config.DEFAULT_COEFFICIENTS['root_depth']
             
-            # 读取CSV文件
-            df = pd.read_csv(file_path, delim_whitespace=True, skiprows=10)
+            # 从共享的模型输出快照中读取
+            output = get_model_output_repository().get(file_path)
             
             # 检查是否有数据和必要的列
-            if df.empty:
-                logger.warning(f"模型输出文件为空: {file_path}")
+            if output is None or output.empty:
+                logger.warning(f"模型输出文件为空或没有有效的日期数据: {file_path}")
                 return Config.DEFAULT_COEFFICIENTS['root_depth']
                 
-            required_columns = ['Date', 'Zr']
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            missing_columns = output.has_columns(['Date', 'Zr'])
             if missing_columns:
                 logger.warning(f"模型输出文件缺少必要列: {missing_columns}")
                 return Config.DEFAULT_COEFFICIENTS['root_depth']
             
-            # 获取当前日期
-            current_date = datetime.now()
-            
-            # 将日期列转换为datetime类型
-            df['Date'] = pd.to_datetime(df['Date'], format='%m/%d/%y', errors='coerce')
-            
-            # 过滤掉无效日期
-            df = df.dropna(subset=['Date'])
-            if df.empty:
-                logger.warning("模型输出文件中没有有效的日期数据")
-                return Config.DEFAULT_COEFFICIENTS['root_depth']
-            
-            now = pd.to_datetime(current_date.date())
-            today_data = df[df['Date'] == now]
-            
-            if today_data.empty:
+            now = pd.to_datetime(datetime.now().date())
+            closest_row = output.nearest_row(now)
+            if closest_row['Date'] != now:
                 logger.warning(f"无法找到当前日期({now.strftime('%Y-%m-%d')})的数据，使用最接近的日期")
-                df['date_diff'] = abs((df['Date'] - now).dt.days)
-                closest_row = df.loc[df['date_diff'].idxmin()]
-            else:
-                closest_row = today_data.iloc[0]
                 
             # 获取根系深度
             root_depth = closest_row['Zr'] if 'Zr' in closest_row else 0.2
@@ -189,26 +210,50 @@ class IrrigationService:
                 logger.warning(f"根系深度值无效: {root_depth}")
                 return Config.DEFAULT_COEFFICIENTS['root_depth']
             
-            # 根据根系深度计算系数
-            irrigation_config = getattr(self.config, 'IRRIGATION_CONFIG', {})
-            threshold = irrigation_config.get('ROOT_DEPTH_THRESHOLD', 0.3)
-            coefficient = 0.5 if root_depth < threshold else 1.0
-            
-            logger.info(f"当前根系深度为{root_depth}m,系数为{coefficient}")
-            return coefficient
+            return self._root_depth_to_coefficient(root_depth)
                 
         except Exception as e:
             logger.error(f"获取根系深度系数时出错: {str(e)}")
             return Config.DEFAULT_COEFFICIENTS['root_depth']  
     
-    def get_growth_stage_coefficient(self):
+    def _root_depth_to_coefficient(self, root_depth, field_id=None):
+        """根据根系深度计算系数"""
+        irrigation_config = getattr(self.config, 'IRRIGATION_CONFIG', {})
+        threshold = irrigation_config.get('ROOT_DEPTH_THRESHOLD', 0.3)
+        coefficient = 0.5 if root_depth < threshold else 1.0
+        
+        prefix = f"[田块 {field_id}] " if field_id else ""
+        logger.info(f"{prefix}当前根系深度为{root_depth}m,系数为{coefficient}")
+        return coefficient
+    
+    def _get_field_root_depth(self, field_id):
+        """读取田块AquaCrop模拟中最接近今天的根系深度(m)，田块未单独模拟时返回None"""
+        if not field_id:
+            return None
+        from src.services.field_crops import get_field_crop_output, get_field_root_depths
+        crop_growth_file = get_field_crop_output(field_id, 'daily_crop_growth.csv', self.config)
+        if crop_growth_file is None:
+            return None
+        depths = get_field_root_depths(crop_growth_file)
+        if depths is None or not len(depths[0]):
+            return None
+        dates, root_depths = depths
+        now = np.datetime64(datetime.now().date(), 'ns')
+        return float(root_depths[np.abs(dates - now).argmin()])
+    
+    def get_growth_stage_coefficient(self, field_id=None):
         """获取生育阶段系数
+        
+        田块已单独运行AquaCrop模拟(services.field_crops)时使用该田块的生育阶段文件
+        
+        Args:
+            field_id (str, optional): 田块ID
+            
         Returns:
             float: 生育阶段系数
         """
         try:
-            # 使用统一的文件路径获取方法
-            growth_stages_file = self._get_file_path('growth_stages')
+            growth_stages_file = self._get_growth_stages_path(field_id)
             
             if not os.path.exists(growth_stages_file):
                 logger.warning(f"生育阶段文件不存在: {growth_stages_file},使用默认系数")
@@ -264,13 +309,14 @@ class IrrigationService:
             logger.error(f"获取生育阶段系数时出错: {str(e)}")
             return Config.DEFAULT_COEFFICIENTS['growth_stage']  
         
-    def calculate_soil_humidity_differences(self, field_id, device_id, real_humidity):
+    def calculate_soil_humidity_differences(self, field_id, device_id, real_humidity, sensor_snapshot=None):
         """计算土壤湿度指标（从传感器获取SAT/FC/PWP数据）
         
         Args:
             field_id (str): 田块ID，用于获取田块特定的传感器数据
             device_id (str): 设备ID，用于获取设备数据
             real_humidity (float): 实际土壤湿度 (%)
+            sensor_snapshot (SensorSnapshot, optional): 请求级传感器快照，避免同一请求重复拉取
             
         Returns:
             tuple: (SAT(mm), FC(mm), PWP(mm), diff_max_real_mm, diff_min_real_mm, diff_com_real_mm)
@@ -309,20 +355,19 @@ class IrrigationService:
             soil_depth = irrigation_config.get('SOIL_DEPTH_CM', Config.DEFAULT_SOIL_PARAMS['depth_cm'])
             
             # 安全获取系数
-            out_file = self._get_file_path('model_output')
+            out_file = self._get_model_output_path(field_id)
             root_depth_coefficient = self._safe_get_coefficient(
-                'get_root_depth_coefficient', out_file,
+                'get_root_depth_coefficient', out_file, field_id,
                 default_value=Config.DEFAULT_COEFFICIENTS['root_depth']
             )
             
             growth_stage_coefficient = self._safe_get_coefficient(
-                'get_growth_stage_coefficient',
+                'get_growth_stage_coefficient', field_id,
                 default_value=Config.DEFAULT_COEFFICIENTS['growth_stage']
             )
             
             # 从传感器获取田块特定的SAT/FC/PWP数据（根据田块的历史数据统计得出）
-            hour_timestamp = datetime.now().strftime('%Y-%m-%d-%H')
-            sensor_data = self._get_cached_sensor_data(device_id, field_id, hour_timestamp)
+            sensor_data = self._get_cached_sensor_data(device_id, field_id, sensor_snapshot)
             
             # 获取传感器统计的土壤参数（百分比）- 确保不为 None
             sat_percent = sensor_data.get('sat') or Config.DEFAULT_SOIL_PARAMS['sat']
@@ -377,30 +422,20 @@ class IrrigationService:
         if not os.path.exists(out_file):
             raise FileNotFoundError(f"模型输出文件不存在: {out_file}")
             
-        df = pd.read_csv(out_file, delim_whitespace=True, skiprows=10)
-        if df.empty:
-            raise ValueError("模型输出文件为空")
+        output = get_model_output_repository().get(out_file)
+        if output is None or output.empty:
+            raise ValueError("模型输出文件为空或没有有效的日期数据")
             
         # 验证必要的列
-        required_columns = ['Date', 'ETc', 'Rain']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = output.has_columns(['Date', 'ETc', 'Rain'])
         if missing_columns:
             raise ValueError(f"模型输出文件缺少必要列: {missing_columns}")
             
-        df['Date'] = pd.to_datetime(df['Date'], format='%m/%d/%y', errors='coerce')
-        df = df.dropna(subset=['Date'])
-        
-        if df.empty:
-            raise ValueError("模型输出文件中没有有效的日期数据")
-            
         now = pd.to_datetime(datetime.now().date())
         
         # 获取预测天数和数据
         max_forecast_days = getattr(self.config, 'IRRIGATION_CONFIG', {}).get('MAX_FORECAST_DAYS', 7)
-        future_data = df[
-            (df['Date'] >= now) & 
-            (df['Date'] <= (now + pd.to_timedelta(f'{max_forecast_days} days')))
-        ].copy()
+        future_data = output.frame(start=now, end=now + pd.to_timedelta(f'{max_forecast_days} days'))
         
         # 确保数据按日期排序并处理NaN值
         future_data = future_data.sort_values('Date').copy()
@@ -440,13 +475,14 @@ class IrrigationService:
         return has_rain, first_rain_day, first_rain_amount
         
 
-    def get_irrigation_decision(self, out_file, diff_min_real_mm, diff_com_real_mm):
+    def get_irrigation_decision(self, out_file, diff_min_real_mm, diff_com_real_mm, field_id=None):
         """获取灌溉决策
         
         Args:
             out_file (str): 模型输出文件路径
             diff_min_real_mm (float): 实际与最小湿度差值(mm)
             diff_com_real_mm (float): 田间持水量与实际湿度差值(mm)
+            field_id (str, optional): 田块ID，用于读取田块的生育阶段系数
             
         Returns:
             tuple: (date, irrigation_value, message)
@@ -460,7 +496,7 @@ class IrrigationService:
             
             # 获取生育阶段系数和灌溉阈值
             growth_stage_coeff = self._safe_get_coefficient(
-                'get_growth_stage_coefficient',
+                'get_growth_stage_coefficient', field_id,
                 default_value=Config.DEFAULT_COEFFICIENTS['growth_stage']
             )
             
@@ -587,13 +623,14 @@ class IrrigationService:
                 
         return irrigation_levels[-1]  # 返回最大档位
             
-    def make_irrigation_decision(self, field_id, device_id, real_humidity):
+    def make_irrigation_decision(self, field_id, device_id, real_humidity, sensor_snapshot=None):
         """生成灌溉决策
         
         Args:
             field_id (str): 地块ID
             device_id (str): 设备ID（用于获取田块的传感器数据）
             real_humidity (float): 实际土壤湿度 (%)
+            sensor_snapshot (SensorSnapshot, optional): 请求级传感器快照，避免同一请求重复拉取
             
         Returns:
             dict: 包含灌溉决策信息的字典
@@ -606,13 +643,12 @@ class IrrigationService:
             
             # 计算土壤湿度差异（自动从传感器获取 SAT/FC/PWP）
             SAT, FC, PWP, _, diff_min_real_mm, diff_com_real_mm = self.calculate_soil_humidity_differences(
-                field_id, device_id, real_humidity
+                field_id, device_id, real_humidity, sensor_snapshot
             )
             
             # 获取传感器数据用于日志
             irrigation_config = getattr(self.config, 'IRRIGATION_CONFIG', {})
-            hour_timestamp = datetime.now().strftime('%Y-%m-%d-%H')
-            sensor_data = self._get_cached_sensor_data(device_id, field_id, hour_timestamp)
+            sensor_data = self._get_cached_sensor_data(device_id, field_id, sensor_snapshot)
             
             # 确保传感器参数不为 None
             sat_percent = sensor_data.get('sat') or Config.DEFAULT_SOIL_PARAMS['sat']
@@ -636,14 +672,14 @@ class IrrigationService:
             self._ensure_model_run()
             
             # 获取灌溉决策
-            out_file = self._get_file_path('model_output')
+            out_file = self._get_model_output_path(field_id)
             date, irrigation_value, message = self.get_irrigation_decision(
-                out_file, diff_min_real_mm, diff_com_real_mm
+                out_file, diff_min_real_mm, diff_com_real_mm, field_id
             )
             
             # 获取系数（用于日志记录）
-            root_depth_coefficient = self._safe_get_coefficient('get_root_depth_coefficient', out_file)
-            growth_stage_coefficient = self._safe_get_coefficient('get_growth_stage_coefficient')
+            root_depth_coefficient = self._safe_get_coefficient('get_root_depth_coefficient', out_file, field_id)
+            growth_stage_coefficient = self._safe_get_coefficient('get_growth_stage_coefficient', field_id)
             
             # 获取关键阈值信息用于meta字段
             base_threshold = irrigation_config.get('IRRIGATION_THRESHOLD', Config.DEFAULT_COEFFICIENTS['irrigation_threshold'])
@@ -694,13 +730,296 @@ class IrrigationService:
             logger.error(f"生成灌溉决策时出错: {str(e)}")
             raise
     
+    def _quantize_irrigation_array(self, irrigation_values):
+        """量化灌溉量数组（分档），与 _quantize_irrigation 逐元素一致
+        
+        Args:
+            irrigation_values (np.ndarray): 计算的灌溉量数组
+            
+        Returns:
+            np.ndarray: 量化后的灌溉量数组
+        """
+        irrigation_config = getattr(self.config, 'IRRIGATION_CONFIG', {})
+        levels = np.asarray(irrigation_config.get('IRRIGATION_LEVELS', [0, 5, 10, 15, 20, 25, 30, 40, 50]), dtype=float)
+        values = np.asarray(irrigation_values, dtype=float)
+        fits = values[:, None] <= levels[None, :]
+        # 取配置顺序中第一个不小于灌溉量的档位，超出全部档位时取最后一档
+        quantized = np.where(fits.any(axis=1), levels[fits.argmax(axis=1)], levels[-1])
+        return np.where(values <= 0, 0.0, quantized)
+    
+    def _fetch_sensor_data_batch(self, fields, max_workers):
+        """并发获取多个田块的传感器数据
+        
+        Args:
+            fields (list): [{'field_id': ..., 'device_id': ...}, ...]
+            max_workers (int): 最大并发数
+            
+        Returns:
+            list: 与fields顺序一致的传感器数据字典，获取失败的位置为异常对象
+        """
+        from src.devices.soil_sensor import SoilSensor
+        
+        def _fetch(field):
+            return SoilSensor(field['device_id'], field['field_id']).get_current_data()
+        
+        results = [None] * len(fields)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(fields)))) as executor:
+            futures = {executor.submit(_fetch, field): i for i, field in enumerate(fields)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    results[i] = e
+        return results
+    
+    def make_batch_irrigation_decisions(self, fields=None, max_workers=None):
+        """批量生成多个田块的灌溉决策
+        
+        使用同一份模型输出的田块（启用多地点天气时即同一天气网格）共用一次FAO模型运行和天气预报：
+        模型输出、未来累积蒸散量与降雨分析每组只计算一次；根系深度与生育阶段系数按田块读取(田块已单独模拟AquaCrop时)；传感器数据并发获取；
+        各田块的储水指标与阈值判断以数组形式一次完成，判断规则与 get_irrigation_decision 一致
+        
+        Args:
+            fields (list, optional): [{'field_id': ..., 'device_id': ..., 'field_name': ...}, ...]，
+                默认使用 Config.FIELDS_CONFIG
+            max_workers (int, optional): 传感器数据并发获取数，默认取 IRRIGATION_CONFIG['BATCH_MAX_WORKERS']
+            
+        Returns:
+            dict: {'date', 'count', 'decisions': [与make_irrigation_decision相同结构的决策], 'errors': [...]}
+        """
+        irrigation_config = getattr(self.config, 'IRRIGATION_CONFIG', {})
+        if fields is None:
+            fields = getattr(self.config, 'FIELDS_CONFIG', []) or [{
+                'field_id': irrigation_config.get('DEFAULT_FIELD_ID'),
+                'device_id': irrigation_config.get('DEFAULT_DEVICE_ID')
+            }]
+        if max_workers is None:
+            max_workers = irrigation_config.get('BATCH_MAX_WORKERS', 8)
+        
+        logger.info(f"开始批量生成灌溉决策: 田块数={len(fields)}")
+        
+        # 使用同一份模型输出(同一天气网格)的田块一起计算
+        self._ensure_model_run()
+        groups = {}
+        for field in fields:
+            groups.setdefault(self._get_model_output_path(field.get('field_id')), []).append(field)
+        
+        now, decisions, errors = datetime.now(), [], []
+        for out_file, group in groups.items():
+            try:
+                now, group_decisions, group_errors = self._make_batch_decisions_for_output(group, out_file, max_workers)
+            except Exception as e:
+                # 一组田块的模型输出缺失或无效时只影响该组，其余组继续生成决策
+                logger.error(f"使用模型输出 {out_file} 的田块组生成灌溉决策失败: {str(e)}")
+                group_decisions = []
+                group_errors = [{'field_id': field.get('field_id'), 'message': f'生成灌溉决策失败: {str(e)}'}
+                                for field in group]
+            decisions.extend(group_decisions)
+            errors.extend(group_errors)
+        
+        logger.info(f"批量灌溉决策完成: 成功={len(decisions)}, 失败={len(errors)}")
+        return {
+            "date": now.strftime('%Y-%m-%d'),
+            "count": len(decisions),
+            "decisions": decisions,
+            "errors": errors
+        }
+    
+    def _make_batch_decisions_for_output(self, fields, out_file, max_workers):
+        """使用同一份模型输出为一组田块生成灌溉决策
+        
+        Args:
+            fields (list): 田块列表
+            out_file (str): 模型输出文件路径
+            max_workers (int): 传感器数据并发获取数
+            
+        Returns:
+            tuple: (当前日期, 决策列表, 错误列表)
+        """
+        irrigation_config = getattr(self.config, 'IRRIGATION_CONFIG', {})
+        
+        # 共享输入：模型输出、未来蒸散量与降雨，只计算一次
+        future_data, now = self._load_and_validate_forecast_data(out_file)
+        soil_depth = irrigation_config.get('SOIL_DEPTH_CM', Config.DEFAULT_SOIL_PARAMS['depth_cm'])
+        base_threshold = irrigation_config.get('IRRIGATION_THRESHOLD', Config.DEFAULT_COEFFICIENTS['irrigation_threshold'])
+        min_effective_irrigation = irrigation_config.get('MIN_EFFECTIVE_IRRIGATION', 5.0)
+        max_single_irrigation = irrigation_config.get('MAX_SINGLE_IRRIGATION', 30.0)
+        rain_forecast_days = irrigation_config.get('RAIN_FORECAST_DAYS', 3)
+        min_rain_amount = irrigation_config.get('MIN_RAIN_AMOUNT', 5.0)
+        min_range = irrigation_config.get('HUMIDITY_MIN_RANGE', 0.0)
+        max_range = irrigation_config.get('HUMIDITY_MAX_RANGE', 100.0)
+        
+        third_idx = min(2, len(future_data) - 1)
+        third_day_etcadj = future_data.iloc[third_idx]['Cumulative_ETcadj']
+        has_rain, first_rain_day, first_rain_amount = self._analyze_rainfall(future_data)
+        days_to_rain = (first_rain_day - now).days if first_rain_day else 7
+        first_rain_etcadj = None
+        if first_rain_day and first_rain_day >= now:
+            first_rain_data = future_data[future_data['Date'] == first_rain_day]
+            if not first_rain_data.empty:
+                first_rain_etcadj = first_rain_data['Cumulative_ETcadj'].values[0]
+        
+        # 根系深度与生育阶段系数按田块读取；未单独模拟AquaCrop的田块读取同一份文件，只计算一次
+        from src.services.field_crops import get_field_crop_output
+        coefficient_cache = {}
+        def _field_coefficients(field_id):
+            key = (self._get_growth_stages_path(field_id),
+                   get_field_crop_output(field_id, 'daily_crop_growth.csv', self.config))
+            if key not in coefficient_cache:
+                coefficient_cache[key] = (
+                    self._safe_get_coefficient('get_root_depth_coefficient', out_file, field_id,
+                                               default_value=Config.DEFAULT_COEFFICIENTS['root_depth']),
+                    self._safe_get_coefficient('get_growth_stage_coefficient', field_id,
+                                               default_value=Config.DEFAULT_COEFFICIENTS['growth_stage'])
+                )
+            return coefficient_cache[key]
+        
+        # 并发获取传感器数据
+        sensor_results = self._fetch_sensor_data_batch(fields, max_workers)
+        
+        valid_fields, errors = [], []
+        real, sat, fc, pwp, root_coefficients, stage_coefficients = [], [], [], [], [], []
+        for field, sensor_data in zip(fields, sensor_results):
+            field_id = field.get('field_id')
+            if isinstance(sensor_data, Exception) or not sensor_data:
+                errors.append({'field_id': field_id, 'message': f'获取传感器数据失败: {sensor_data}'})
+                continue
+            real_humidity = float(sensor_data.get('real_humidity') or 0.0)
+            has_valid_data = ((sensor_data.get('sat') or 0) > 0 or (sensor_data.get('fc') or 0) > 0 or
+                              (sensor_data.get('pwp') or 0) > 0 or real_humidity > 0)
+            if not has_valid_data:
+                errors.append({'field_id': field_id, 'message': '无法获取有效的土壤数据进行决策'})
+                continue
+            try:
+                sat.append(float(sensor_data.get('sat') or Config.DEFAULT_SOIL_PARAMS['sat']))
+                fc.append(float(sensor_data.get('fc') or Config.DEFAULT_SOIL_PARAMS['fc']))
+                pwp.append(float(sensor_data.get('pwp') or Config.DEFAULT_SOIL_PARAMS['pwp']))
+            except (ValueError, TypeError) as e:
+                logger.warning(f"[田块 {field_id}] 传感器参数类型转换失败: {e}，使用默认值")
+                sat.append(Config.DEFAULT_SOIL_PARAMS['sat'])
+                fc.append(Config.DEFAULT_SOIL_PARAMS['fc'])
+                pwp.append(Config.DEFAULT_SOIL_PARAMS['pwp'])
+            root_coefficient, stage_coefficient = _field_coefficients(field_id)
+            root_coefficients.append(root_coefficient)
+            stage_coefficients.append(stage_coefficient)
+            real.append(real_humidity)
+            valid_fields.append(field)
+        
+        decisions = []
+        if valid_fields:
+            real = np.clip(np.asarray(real, dtype=float), min_range, max_range)
+            sat, fc, pwp = (np.asarray(values, dtype=float) for values in (sat, fc, pwp))
+            root_coefficients = np.asarray(root_coefficients, dtype=float)
+            stage_coefficients = np.asarray(stage_coefficients, dtype=float)
+            conversion_factor = soil_depth / 10 * root_coefficients * stage_coefficients
+            irrigation_threshold = base_threshold * stage_coefficients
+            SAT, FC, PWP = sat * conversion_factor, fc * conversion_factor, pwp * conversion_factor
+            diff_min_real_mm = (real - pwp) * conversion_factor
+            diff_com_real_mm = (fc - real) * conversion_factor
+            allowance = diff_min_real_mm * irrigation_threshold
+            
+            values = np.zeros(len(real))
+            messages = np.empty(len(real), dtype=object)
+            undecided = np.ones(len(real), dtype=bool)
+            
+            def _decide(mask, irrigation_values, message):
+                mask = mask & undecided
+                values[mask] = irrigation_values[mask] if np.ndim(irrigation_values) else irrigation_values
+                messages[mask] = message
+                undecided[mask] = False
+            
+            # 规则顺序与 get_irrigation_decision 保持一致
+            critical = diff_min_real_mm <= 0
+            _decide(critical, self._quantize_irrigation_array(np.minimum(diff_com_real_mm, max_single_irrigation)),
+                    "土壤水分已达临界水平，立即灌溉")
+            _decide(third_day_etcadj <= allowance, 0, "水分充足，今日不灌溉")
+            if has_rain:
+                if days_to_rain <= rain_forecast_days and first_rain_amount >= min_rain_amount:
+                    _decide(undecided, 0, f"未来{days_to_rain}天内有{first_rain_amount:.1f}mm降雨,延迟灌溉")
+                if first_rain_day and first_rain_day > now + pd.to_timedelta('2 days'):
+                    demand = third_day_etcadj - allowance
+                    quantized = self._quantize_irrigation_array(np.minimum(demand, max_single_irrigation))
+                    for value in np.unique(quantized[(demand > min_effective_irrigation) & undecided]):
+                        _decide((demand > min_effective_irrigation) & (quantized == value), quantized,
+                                f"今日需灌溉{value:.1f}mm,降雨在三天后")
+                if first_rain_etcadj is not None:
+                    demand = first_rain_etcadj - allowance
+                    quantized = self._quantize_irrigation_array(np.minimum(demand, max_single_irrigation))
+                    for value in np.unique(quantized[(demand > min_effective_irrigation) & undecided]):
+                        _decide((demand > min_effective_irrigation) & (quantized == value), quantized,
+                                f"今日需灌溉{value:.1f}mm,近日有降雨但不足以满足需求")
+                _decide(undecided, 0, "今日有降雨预报，不灌溉")
+            else:
+                demand = np.minimum(np.minimum(diff_com_real_mm, third_day_etcadj - allowance), max_single_irrigation)
+                _decide(demand <= 0, 0, "土壤水分可支撑至第三天，今日不灌溉")
+                _decide(demand <= min_effective_irrigation, 0,
+                        f"计算灌溉量小于最小有效灌溉量({min_effective_irrigation:.1f}mm)，今日不灌溉")
+                quantized = self._quantize_irrigation_array(demand)
+                for value in np.unique(quantized[undecided]):
+                    _decide(quantized == value, quantized, f"今日需灌溉{value:.1f}mm,近期无降雨预报")
+            
+            date_str = now.strftime('%Y-%m-%d')
+            meta = {
+                "min_effective_irrigation": round(min_effective_irrigation, 2),
+                "rain_forecast_days": rain_forecast_days,
+                "min_rain_amount": round(min_rain_amount, 2)
+            }
+            for i, field in enumerate(valid_fields):
+                decisions.append({
+                    "date": date_str,
+                    "field_id": field.get('field_id'),
+                    "device_id": field.get('device_id'),
+                    "field_name": field.get('field_name'),
+                    "message": f"当前土壤体积含水量为：{real[i]:.2f} %, {messages[i]}",
+                    "irrigation_value": round(float(values[i]), 2),
+                    "soil_data": {
+                        "current_humidity": round(float(real[i]), 2),
+                        "root_depth_coefficient": float(root_coefficients[i]),
+                        "growth_stage_coefficient": float(stage_coefficients[i]),
+                        "soil_depth": soil_depth,
+                        "storage_potential": round(float(SAT[i] - PWP[i]), 2),
+                        "effective_storage": round(float(FC[i] - PWP[i]), 2),
+                        "available_storage": round(float(max(0, min(diff_com_real_mm[i], FC[i] - PWP[i]))), 2),
+                        "sat": round(float(SAT[i]), 2),
+                        "fc": round(float(FC[i]), 2),
+                        "pwp": round(float(PWP[i]), 2),
+                        "sat_percent": round(float(sat[i]), 2),
+                        "fc_percent": round(float(fc[i]), 2),
+                        "pwp_percent": round(float(pwp[i]), 2),
+                        "is_real_data": True
+                    },
+                    "meta": dict(meta, irrigation_threshold=round(float(irrigation_threshold[i]), 3))
+                })
+        
+        return now, decisions, errors
+    
     def _ensure_model_run(self):
-        """确保模型在当天已运行"""
-        now = datetime.now()
-        if (self._last_model_run is None or 
-            self._last_model_run.date() != now.date()):
-            self.fao_model.run_model()
-            self._last_model_run = now
+        """确保模型输出为最新
+        
+        模型输出未过期(未超过MAX_MODEL_AGE_HOURS且不早于天气输入文件)时直接读取,
+        由应用内后台刷新、独立刷新进程refresh_models.py或模型任务负责更新;
+        输出缺失或过期时于请求内运行FAO模型(启用多地点天气时同时运行各天气网格模型),
+        运行时持有模型运行锁,与其他刷新和任务互斥
+        (FAO模型按输入内容缓存结果,天气未变化时直接复用缓存输出)
+        """
+        from src.services.model_refresh import get_model_refresher, get_model_run_lock
+        refresher = get_model_refresher(self.config)
+        if not refresher.fao_output_stale():
+            return
+
+        with get_model_run_lock(self.config):
+            # 等锁期间其他进程或线程可能已刷新输出
+            if not refresher.fao_output_stale():
+                return
+            logger.info("模型输出不存在或已过期，在请求内运行FAO模型")
+            result = self.fao_model.run_model()
+            if result and result.get('cache_hit'):
+                logger.info("FAO模型输入未变化，已复用缓存的模型输出")
+            if getattr(self.config, 'WEATHER_CONFIG', {}).get('multi_location_enabled', False):
+                from src.services.weather_cells import run_cell_models
+                run_cell_models(self.config)
+            self._last_model_run = datetime.now()
 
 
 """
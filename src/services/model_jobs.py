@@ -0,0 +1,275 @@
+"""
+模型运行任务服务
+AquaCrop整季模拟、FAO模型运行与触发模型运行的灌溉决策耗时较长,不在HTTP请求内同步执行:
+提交后立即返回任务ID,由后台工作线程池执行,通过任务ID查询进度与结果
+主要组件:
+- ModelJob: 单个任务的状态、进度与结果
+- ModelJobService: 任务提交、去重与执行;相同类型和参数的任务在排队/运行中或
+  最近 DEDUP_SECONDS 秒内成功完成时直接返回已有任务;FAO/AquaCrop任务在模型运行锁内执行,
+  与后台刷新、请求内联运行和独立刷新进程互斥
+- get_model_job_service: 进程内共享的任务服务实例
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(project_root)
+
+from src.utils.logger import logger
+
+def _format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S') if timestamp else None
+
+class ModelJob:
+    """单个模型运行任务"""
+
+    def __init__(self, kind, params, dedup_key):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.dedup_key = dedup_key
+        self.status = 'queued'
+        self.progress = 0
+        self.message = '等待执行'
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    def report(self, progress, message=None):
+        """更新任务进度(0-100)"""
+        self.progress = max(0, min(100, int(progress)))
+        if message:
+            self.message = message
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'params': self.params,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'submitted_at': _format_time(self.submitted_at),
+            'started_at': _format_time(self.started_at),
+            'finished_at': _format_time(self.finished_at),
+            'duration': round(self.finished_at - self.started_at, 2) if self.finished_at and self.started_at else None,
+            'result': self.result,
+            'error': self.error
+        }
+
+class ModelJobService:
+    """后台执行模型运行任务的服务"""
+
+    def __init__(self, config, irrigation_service=None):
+        """
+        初始化任务服务
+
+        参数:
+            config: 配置对象,读取MODEL_JOB_CONFIG
+            irrigation_service: 决策任务使用的灌溉服务,默认在首次执行决策任务时创建
+        """
+        self.config = config
+        job_config = getattr(config, 'MODEL_JOB_CONFIG', {}) or {}
+        # 各模型写同一批输出文件,默认只用一个工作线程
+        self.max_workers = max(1, int(job_config.get('MAX_WORKERS', 1)))
+        self.dedup_seconds = float(job_config.get('DEDUP_SECONDS', 600))
+        self.retention = float(job_config.get('RETENTION_MINUTES', 60)) * 60
+        self.max_jobs = int(job_config.get('MAX_JOBS', 200))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='model-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._irrigation_service = irrigation_service
+        self._runners = {
+            'aquacrop': self._run_aquacrop,
+            'aquacrop_fields': self._run_aquacrop_fields,
+            'fao': self._run_fao,
+            'decision': self._run_decision
+        }
+        self.stats = {'submitted': 0, 'deduplicated': 0, 'succeeded': 0, 'failed': 0}
+
+    @property
+    def kinds(self):
+        return list(self._runners)
+
+    def register(self, kind, runner):
+        """注册任务类型,runner(job, **params) 返回可JSON序列化的结果"""
+        self._runners[kind] = runner
+
+    @staticmethod
+    def _dedup_key(kind, params):
+        return f"{kind}:{json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)}"
+
+    def submit(self, kind, params=None, force=False):
+        """提交任务
+
+        参数:
+            kind: 任务类型(aquacrop/aquacrop_fields/fao/decision)
+            params: 任务参数dict
+            force: 为True时不复用已有任务
+        返回:
+            tuple: (ModelJob, 是否复用了已有任务)
+        """
+        if kind not in self._runners:
+            raise ValueError(f"未知的任务类型: {kind}，可用类型: {self.kinds}")
+        params = dict(params or {})
+        dedup_key = self._dedup_key(kind, params)
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            if not force:
+                for job in reversed(self._jobs.values()):
+                    if job.dedup_key != dedup_key:
+                        continue
+                    if job.active or (job.status == 'succeeded' and now - job.finished_at < self.dedup_seconds):
+                        self.stats['deduplicated'] += 1
+                        return job, True
+            job = ModelJob(kind, params, dedup_key)
+            self._jobs[job.job_id] = job
+            self.stats['submitted'] += 1
+        self._executor.submit(self._execute, job)
+        logger.info(f"已提交模型任务 {job.job_id}: kind={kind}, params={params}")
+        return job, False
+
+    def _execute(self, job):
+        job.status = 'running'
+        job.started_at = time.time()
+        job.report(5, '开始执行')
+        try:
+            job.result = self._runners[job.kind](job, **job.params)
+            job.status = 'succeeded'
+            job.report(100, '执行完成')
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            job.message = '执行失败'
+            logger.error(f"模型任务 {job.job_id} ({job.kind}) 执行失败: {str(e)}")
+            logger.error(traceback.format_exc())
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self.stats[job.status] = self.stats.get(job.status, 0) + 1
+            logger.info(f"模型任务 {job.job_id} ({job.kind}) 结束: {job.status}，耗时{job.finished_at - job.started_at:.2f}秒")
+
+    def _prune(self, now):
+        """清除超过保留时间或超出数量上限的已结束任务(调用方持有锁)"""
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished:
+            job = self._jobs[job_id]
+            if now - job.finished_at > self.retention or len(self._jobs) > self.max_jobs:
+                del self._jobs[job_id]
+
+    def get(self, job_id):
+        """按ID获取任务,不存在时返回None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, kind=None, limit=50):
+        """获取最近提交的任务,按提交时间倒序"""
+        with self._lock:
+            jobs = [job for job in reversed(self._jobs.values()) if kind is None or job.kind == kind]
+        return jobs[:limit]
+
+    def latest_result(self, kind):
+        """获取指定类型最近一次成功任务的结果,没有时返回None"""
+        with self._lock:
+            for job in reversed(self._jobs.values()):
+                if job.kind == kind and job.status == 'succeeded':
+                    return job.result
+        return None
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['queued'] = sum(1 for job in self._jobs.values() if job.status == 'queued')
+            stats['running'] = sum(1 for job in self._jobs.values() if job.status == 'running')
+            stats['retained'] = len(self._jobs)
+        stats['max_workers'] = self.max_workers
+        return stats
+
+    def set_irrigation_service(self, irrigation_service):
+        """设置决策任务使用的灌溉服务(与请求处理共用同一实例)"""
+        self._irrigation_service = irrigation_service
+
+    def _model_run_lock(self, job):
+        """获取模型运行锁,其他刷新或任务运行中时先标记为等待"""
+        from src.services.model_refresh import get_model_run_lock
+        job.report(job.progress, '等待其他模型运行完成')
+        return get_model_run_lock(self.config)
+
+    def _run_aquacrop(self, job, force_rerun=False):
+        from src.aquacrop.aquacrop_modeling import run_model_and_save_results
+        with self._model_run_lock(job):
+            job.report(10, '运行AquaCrop模型')
+            result = run_model_and_save_results(force_rerun=force_rerun)
+        return {
+            'canopy_cover_img': result.get('canopy_cover_img'),
+            'growth_stages_img': result.get('growth_stages_img'),
+            'current_stage': result.get('current_stage'),
+            'reused': result.get('reused', False),
+            'warm_start': result.get('warm_start')
+        }
+
+    def _run_aquacrop_fields(self, job, field_ids=None, force_rerun=False):
+        from src.services.field_crops import run_field_models
+        fields = None
+        if field_ids:
+            fields = [field for field in getattr(self.config, 'FIELDS_CONFIG', []) if field.get('field_id') in field_ids]
+        with self._model_run_lock(job):
+            job.report(10, '运行各田块AquaCrop模型')
+            return run_field_models(self.config, fields, force_rerun=force_rerun)
+
+    def _run_fao(self, job):
+        from src.models.fao_model import FAOModel
+        with self._model_run_lock(job):
+            job.report(10, '运行FAO模型')
+            result = FAOModel(self.config).run_model()
+        return {key: value for key, value in (result or {}).items() if key != 'timings'}
+
+    def _run_decision(self, job, field_id, device_id, real_humidity=None):
+        from src.services.irrigation_service import IrrigationService
+        from src.devices.soil_sensor import SensorSnapshot
+        if self._irrigation_service is None:
+            self._irrigation_service = IrrigationService(self.config)
+        job.report(10, '读取传感器数据')
+        snapshot = SensorSnapshot(device_id, field_id)
+        if real_humidity is None:
+            real_humidity = float(snapshot.get().get('real_humidity') or 0.0)
+        job.report(30, '生成灌溉决策')
+        return self._irrigation_service.make_irrigation_decision(field_id, device_id, real_humidity, snapshot)
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_model_job_service(config=None, irrigation_service=None):
+    """获取进程内共享的任务服务实例
+
+    参数:
+        config: 配置对象,首次调用时使用;未提供时使用全局配置
+        irrigation_service: 应用的灌溉服务实例,提供时决策任务改用该实例
+    返回:
+        ModelJobService: 任务服务实例
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            if config is None:
+                from config import current_config
+                config = current_config()
+            _service = ModelJobService(config)
+        if irrigation_service is not None:
+            _service.set_irrigation_service(irrigation_service)
+        return _service
@@ -0,0 +1,307 @@
+"""
+模型后台刷新服务
+在请求之外定时运行FAO模型(及AquaCrop模型),避免API请求内联执行整季模拟
+主要组件:
+- ModelSnapshot: 一次刷新完成后的不可变结果快照
+- ModelRefreshService: 后台线程定时刷新,完成后在锁内整体替换当前快照
+- get_model_refresher: 进程内共享的刷新服务实例
+- get_model_run_lock: FAO/AquaCrop运行共用的跨进程文件锁
+可在应用内启动(MODEL_REFRESH_CONFIG['ENABLED']),也可通过项目根目录的refresh_models.py作为独立进程运行
+"""
+import os
+import sys
+import time
+import threading
+import traceback
+from collections import namedtuple
+from datetime import datetime
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(project_root)
+
+from src.utils.logger import logger
+from src.utils.file_lock import get_file_lock
+
+ModelSnapshot = namedtuple('ModelSnapshot', [
+    'generation',     # 刷新序号
+    'completed_at',   # 完成时间(datetime)
+    'duration',       # 刷新耗时(秒)
+    'fao_result',     # FAOModel.run_model的返回值
+    'aquacrop_ok',    # AquaCrop是否刷新成功,未刷新时为None
+    'errors'          # 刷新过程中的错误信息列表
+])
+
+def get_model_run_lock(config=None):
+    """获取FAO/AquaCrop运行共用的文件锁
+
+    后台刷新、模型任务、请求内联运行与独立刷新进程写同一批输出文件(.tmp输出、天气CSV、.par/.sol),
+    运行前需持有该锁;同一线程可重入
+    参数:
+        config: 配置对象,读取MODEL_REFRESH_CONFIG['RUN_LOCK_FILE'];未提供时使用全局配置
+    返回:
+        FileLock: 文件锁实例
+    """
+    if config is None:
+        from config import current_config
+        config = current_config()
+    refresh_config = getattr(config, 'MODEL_REFRESH_CONFIG', {}) or {}
+    lock_file = refresh_config.get('RUN_LOCK_FILE', os.path.join('data', 'model_output', '.model_run.lock'))
+    if not os.path.isabs(lock_file):
+        lock_file = os.path.join(project_root, lock_file)
+    return get_file_lock(lock_file, timeout=float(refresh_config.get('RUN_LOCK_TIMEOUT_MINUTES', 30)) * 60)
+
+class ModelRefreshService:
+    """FAO/AquaCrop模型后台刷新服务"""
+
+    def __init__(self, config):
+        """
+        初始化刷新服务
+
+        参数:
+            config: 配置对象,读取MODEL_REFRESH_CONFIG与FILE_PATHS
+        """
+        self.config = config
+        refresh_config = getattr(config, 'MODEL_REFRESH_CONFIG', {}) or {}
+        self.interval = max(1.0, float(refresh_config.get('INTERVAL_MINUTES', 180))) * 60
+        self.run_on_start = refresh_config.get('RUN_ON_START', True)
+        self.refresh_aquacrop = refresh_config.get('REFRESH_AQUACROP', True)
+        self.max_age = float(refresh_config.get('MAX_MODEL_AGE_HOURS', 24)) * 3600
+        self._snapshot = None
+        self._generation = 0
+        self._last_error = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._next_run = None
+        self._fao_model = None
+
+    @property
+    def running(self):
+        """后台线程是否正在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _get_fao_model(self):
+        if self._fao_model is None:
+            from src.models.fao_model import FAOModel
+            self._fao_model = FAOModel(self.config)
+        return self._fao_model
+
+    def refresh_now(self):
+        """立即执行一次刷新,完成后替换当前快照
+
+        同一时刻只允许一次刷新,正在刷新时直接返回当前快照;
+        其他模型任务、请求内联运行或独立刷新进程正在运行时等待其完成
+        返回:
+            ModelSnapshot: 刷新后的快照;FAO模型失败时保留上一个快照并返回它
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            logger.info("模型刷新正在进行中，跳过本次触发")
+            return self.get_snapshot()
+
+        try:
+            with get_model_run_lock(self.config):
+                return self._refresh()
+        except TimeoutError as e:
+            logger.error(f"等待其他模型运行完成超时，跳过本次刷新: {str(e)}")
+            with self._lock:
+                self._last_error = str(e)
+            return self.get_snapshot()
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh(self):
+        """运行FAO/AquaCrop模型并替换快照(调用方持有刷新锁与模型运行锁)"""
+        start = time.time()
+        errors = []
+        try:
+            fao_result = self._get_fao_model().run_model()
+        except Exception as e:
+            logger.error(f"后台刷新FAO模型失败: {str(e)}")
+            logger.error(traceback.format_exc())
+            with self._lock:
+                self._last_error = f"FAO模型: {str(e)}"
+            return self.get_snapshot()
+
+        if getattr(self.config, 'WEATHER_CONFIG', {}).get('multi_location_enabled', False):
+            try:
+                from src.services.weather_cells import run_cell_models
+                cell_result = run_cell_models(self.config)
+                errors.extend(f"天气网格 {cell_id}: {message}" for cell_id, message in cell_result['errors'].items())
+            except Exception as e:
+                errors.append(f"天气网格模型: {str(e)}")
+                logger.error(f"后台刷新各天气网格FAO模型失败: {str(e)}")
+
+        aquacrop_ok = None
+        if self.refresh_aquacrop:
+            try:
+                from src.aquacrop.aquacrop_modeling import run_model_and_save_results
+                aquacrop_ok = bool(run_model_and_save_results())
+            except Exception as e:
+                aquacrop_ok = False
+                errors.append(f"AquaCrop模型: {str(e)}")
+                logger.error(f"后台刷新AquaCrop模型失败: {str(e)}")
+
+        if getattr(self.config, 'AQUACROP_CONFIG', {}).get('PER_FIELD_ENABLED', False):
+            try:
+                from src.services.field_crops import run_field_models
+                field_result = run_field_models(self.config)
+                errors.extend(f"田块 {field_id} AquaCrop: {message}" for field_id, message in field_result['errors'].items())
+            except Exception as e:
+                errors.append(f"多田块AquaCrop模型: {str(e)}")
+                logger.error(f"后台刷新各田块AquaCrop模型失败: {str(e)}")
+
+        with self._lock:
+            self._generation += 1
+            self._last_error = errors[-1] if errors else None
+            self._snapshot = ModelSnapshot(
+                generation=self._generation,
+                completed_at=datetime.now(),
+                duration=time.time() - start,
+                fao_result=fao_result,
+                aquacrop_ok=aquacrop_ok,
+                errors=tuple(errors)
+            )
+            snapshot = self._snapshot
+        logger.info(f"模型后台刷新完成: 第{snapshot.generation}次，耗时{snapshot.duration:.2f}秒，"
+                    f"FAO缓存命中={bool(fao_result and fao_result.get('cache_hit'))}")
+        return snapshot
+
+    def _loop(self):
+        if self.run_on_start:
+            self.refresh_now()
+        while True:
+            self._next_run = datetime.fromtimestamp(time.time() + self.interval)
+            if self._stop_event.wait(self.interval):
+                break
+            self.refresh_now()
+        self._next_run = None
+
+    def start(self):
+        """启动后台刷新线程,重复调用无副作用"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='model-refresh', daemon=True)
+        self._thread.start()
+        logger.info(f"模型后台刷新已启动，刷新间隔: {self.interval / 60:.0f}分钟")
+
+    def stop(self, timeout=None):
+        """停止后台刷新线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def get_snapshot(self):
+        """获取最近一次完成的刷新快照,尚未完成刷新时返回None"""
+        with self._lock:
+            return self._snapshot
+
+    def _output_stale(self, output_path, input_path):
+        """输出文件缺失、超过MAX_MODEL_AGE_HOURS或早于输入文件时返回True"""
+        if not os.path.exists(output_path):
+            return True
+        updated_at = os.path.getmtime(output_path)
+        if time.time() - updated_at > self.max_age:
+            return True
+        return os.path.exists(input_path) and os.path.getmtime(input_path) > updated_at
+
+    def fao_output_stale(self):
+        """FAO模型输出需要刷新时返回True
+
+        默认输出(FILE_PATHS['model_output'])缺失、超过MAX_MODEL_AGE_HOURS或早于天气输入文件
+        (FAO_CONFIG['WEATHER_FILE'])时视为过期;启用多地点天气时各天气网格的输出与网格天气文件同样检查
+        """
+        fao_config = getattr(self.config, 'FAO_CONFIG', {}) or {}
+        weather_file = fao_config.get('WEATHER_FILE', 'data/weather/irrigation_weather.csv')
+        weather_path = weather_file if os.path.isabs(weather_file) else os.path.join(project_root, weather_file)
+        if self._output_stale(self._output_path(), weather_path):
+            return True
+
+        weather_config = getattr(self.config, 'WEATHER_CONFIG', {}) or {}
+        if not weather_config.get('multi_location_enabled', False):
+            return False
+        from src.models.fao_model import FAOModel
+        from src.services.weather_cells import group_fields_by_cell
+        output_dir = weather_config.get('cell_output_dir', 'data/model_output/cells')
+        if not os.path.isabs(output_dir):
+            output_dir = os.path.join(project_root, output_dir)
+        output_file = fao_config.get('OUTPUT_FILE', 'wheat2024.out')
+        for cell in group_fields_by_cell(config=self.config):
+            cell_output = os.path.join(output_dir, FAOModel._location_filename(output_file, cell))
+            cell_weather = os.path.join(os.path.dirname(weather_path),
+                                        FAOModel._location_filename(weather_path, cell))
+            if self._output_stale(cell_output, cell_weather):
+                return True
+        return False
+
+    def aquacrop_output_stale(self):
+        """AquaCrop输出需要刷新时返回True
+
+        冠层覆盖度图或生育阶段文件缺失、生育阶段文件(每次运行都会重写)超过MAX_MODEL_AGE_HOURS
+        或早于AquaCrop气象输入文件时视为过期
+        """
+        aquacrop_config = getattr(self.config, 'AQUACROP_CONFIG', {}) or {}
+        canopy_path = os.path.join(project_root, aquacrop_config.get('IMAGES_DIR', 'src/static/images'), 'canopy_cover.png')
+        stages_path = os.path.join(project_root, aquacrop_config.get('OUTPUT_DIR', 'data/model_output'), 'growth_stages.csv')
+        if not os.path.exists(canopy_path):
+            return True
+        weather_path = os.path.join(project_root, aquacrop_config.get('WEATHER_INPUT_CSV', 'data/weather/irrigation_weather.csv'))
+        return self._output_stale(stages_path, weather_path)
+
+    def _output_path(self):
+        relative_path = getattr(self.config, 'FILE_PATHS', {}).get(
+            'model_output', os.path.join('data', 'model_output', 'wheat2024.out'))
+        return os.path.join(project_root, relative_path)
+
+    def get_status(self):
+        """获取模型刷新状态,供健康检查使用
+
+        进程内尚无快照时(例如由独立进程refresh_models.py刷新),按输出文件的修改时间计算模型年龄
+        """
+        snapshot = self.get_snapshot()
+        output_path = self._output_path()
+        if snapshot is not None:
+            updated_at = snapshot.completed_at
+            source = 'snapshot'
+        elif os.path.exists(output_path):
+            updated_at = datetime.fromtimestamp(os.path.getmtime(output_path))
+            source = 'file'
+        else:
+            updated_at = None
+            source = None
+
+        age_seconds = (datetime.now() - updated_at).total_seconds() if updated_at else None
+        return {
+            'scheduler_running': self.running,
+            'generation': snapshot.generation if snapshot else 0,
+            'updated_at': updated_at.strftime('%Y-%m-%d %H:%M:%S') if updated_at else None,
+            'age_seconds': round(age_seconds, 1) if age_seconds is not None else None,
+            'age_source': source,
+            'stale': age_seconds is None or age_seconds > self.max_age,
+            'next_refresh_at': self._next_run.strftime('%Y-%m-%d %H:%M:%S') if self._next_run else None,
+            'last_duration': round(snapshot.duration, 2) if snapshot else None,
+            'aquacrop_ok': snapshot.aquacrop_ok if snapshot else None,
+            'last_error': self._last_error
+        }
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+def get_model_refresher(config=None):
+    """获取进程内共享的模型刷新服务实例
+
+    参数:
+        config: 配置对象,首次调用时使用;未提供时使用全局配置
+    返回:
+        ModelRefreshService: 刷新服务实例
+    """
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            if config is None:
+                from config import current_config
+                config = current_config()
+            _refresher = ModelRefreshService(config)
+        return _refresher
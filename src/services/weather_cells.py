@@ -0,0 +1,117 @@
+"""
+多地点天气网格服务
+田块按坐标归入天气网格(WEATHER_CONFIG['grid_resolution']),每个网格只获取一份天气数据、
+运行一次FAO模型,网格内的田块共用该网格的模型输出;新增田块的开销随网格数而不是田块数增长
+主要组件:
+- WeatherCell: 网格标识与网格中心坐标
+- group_fields_by_cell: 将田块按网格分组
+- run_cell_models: 在进程池中并行运行各网格的FAO模型
+- get_field_model_output: 获取田块所在网格的模型输出文件路径
+"""
+import os
+import sys
+import time
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.append(project_root)
+
+from src.utils.logger import logger
+from config import Config
+
+WeatherCell = namedtuple('WeatherCell', ['cell_id', 'latitude', 'longitude'])
+
+def get_weather_cell(latitude, longitude, resolution=None):
+    """获取坐标所在的天气网格
+
+    参数:
+        latitude, longitude: 坐标(度)
+        resolution: 网格分辨率(度),默认取 WEATHER_CONFIG['grid_resolution']
+    返回:
+        WeatherCell: 网格中心坐标四舍五入到分辨率的整数倍
+    """
+    resolution = resolution or Config.WEATHER_CONFIG.get('grid_resolution', 0.1)
+    cell_lat = round(round(float(latitude) / resolution) * resolution, 6)
+    cell_lon = round(round(float(longitude) / resolution) * resolution, 6)
+    cell_id = f"{cell_lat:.4f}_{cell_lon:.4f}".replace('-', 'm')
+    return WeatherCell(cell_id, cell_lat, cell_lon)
+
+def group_fields_by_cell(fields=None, config=None):
+    """将田块按天气网格分组
+
+    参数:
+        fields: 田块配置列表,默认使用 FIELDS_CONFIG
+    返回:
+        OrderedDict: {WeatherCell: [田块配置, ...]},按田块首次出现顺序
+    """
+    config = config or Config
+    fields = config.FIELDS_CONFIG if fields is None else fields
+    resolution = config.WEATHER_CONFIG.get('grid_resolution', 0.1)
+    cells = OrderedDict()
+    for field in fields:
+        latitude, longitude = field.get('latitude'), field.get('longitude')
+        if latitude is None or longitude is None:
+            latitude, longitude = config.get_field_location(field.get('field_id'))
+        cells.setdefault(get_weather_cell(latitude, longitude, resolution), []).append(field)
+    return cells
+
+def _run_cell_model(cell):
+    """在子进程中运行单个网格的FAO模型"""
+    from src.models.fao_model import FAOModel
+    return FAOModel().run_model(location=cell)
+
+def run_cell_models(config=None, fields=None, max_workers=None):
+    """并行运行各天气网格的FAO模型
+
+    参数:
+        fields: 田块配置列表,默认使用 FIELDS_CONFIG
+        max_workers: 进程数,默认取 WEATHER_CONFIG['cell_max_workers']
+    返回:
+        dict: {'cells': {cell_id: {'latitude', 'longitude', 'fields', 'output_file', 'cache_hit'}},
+               'errors': {cell_id: 错误信息}, 'duration': 秒}
+    """
+    config = config or Config
+    start = time.time()
+    cells = group_fields_by_cell(fields, config)
+    if max_workers is None:
+        max_workers = config.WEATHER_CONFIG.get('cell_max_workers', 4)
+    logger.info(f"开始运行各天气网格的FAO模型: 田块数={sum(len(v) for v in cells.values())}, 网格数={len(cells)}")
+
+    results, errors = {}, {}
+    if cells:
+        with ProcessPoolExecutor(max_workers=max(1, min(max_workers, len(cells)))) as executor:
+            futures = {executor.submit(_run_cell_model, cell): cell for cell in cells}
+            for future in as_completed(futures):
+                cell = futures[future]
+                try:
+                    result = future.result()
+                    results[cell.cell_id] = {
+                        'latitude': cell.latitude,
+                        'longitude': cell.longitude,
+                        'fields': [field.get('field_id') for field in cells[cell]],
+                        'output_file': result['output_file'],
+                        'cache_hit': result.get('cache_hit', False)
+                    }
+                except Exception as e:
+                    errors[cell.cell_id] = str(e)
+                    logger.error(f"天气网格 {cell.cell_id} 的FAO模型运行失败: {str(e)}")
+
+    duration = time.time() - start
+    logger.info(f"各天气网格FAO模型运行完成: 成功={len(results)}, 失败={len(errors)}, 耗时{duration:.2f}秒")
+    return {'cells': results, 'errors': errors, 'duration': duration}
+
+def get_field_model_output(field_id, config=None):
+    """获取田块所在天气网格的模型输出文件路径
+
+    返回:
+        str: 网格模型输出路径;该网格尚未生成输出时返回None
+    """
+    from src.models.fao_model import FAOModel
+    config = config or Config
+    cell = get_weather_cell(*config.get_field_location(field_id), config.WEATHER_CONFIG.get('grid_resolution', 0.1))
+    output_dir = config.WEATHER_CONFIG.get('cell_output_dir', 'data/model_output/cells')
+    if not os.path.isabs(output_dir):
+        output_dir = os.path.join(project_root, output_dir)
+    path = os.path.join(output_dir, FAOModel._location_filename(config.FAO_CONFIG['OUTPUT_FILE'], cell))
+    return path if os.path.exists(path) else None
@@ -725,6 +725,44 @@ async function updateHistoryChart(buttonElement = null) {
     }
 }
 
+/**
+ * 轮询模型任务直到结束
+ * @param {string} jobId 任务ID
+ * @param {function} onProgress (可选) 每次查询后回调，参数为任务信息
+ * @returns {Promise<object>} 结束(成功或失败)时的任务信息
+ */
+async function waitForJob(jobId, onProgress = null, intervalMs = 2000) {
+    while (true) {
+        const response = await fetch(`/api/jobs/${jobId}`);
+        if (!response.ok) {
+            throw new Error(`查询任务失败: ${response.status}`);
+        }
+        const job = (await response.json()).data;
+        if (onProgress) onProgress(job);
+        if (job.status === 'succeeded' || job.status === 'failed') {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+}
+
+/** 仪表盘提交了AquaCrop任务时，任务完成后刷新冠层覆盖度图片 */
+async function watchCanopyCoverJob() {
+    const imgElement = document.getElementById('canopy-cover-img');
+    const jobId = imgElement?.dataset.modelJob;
+    if (!jobId) return;
+    try {
+        const job = await waitForJob(jobId, null, 5000);
+        if (job.status === 'succeeded') {
+            imgElement.src = `/static/images/canopy_cover.png?t=${Date.now()}`;
+        } else {
+            console.error('AquaCrop模型任务失败:', job.error);
+        }
+    } catch (error) {
+        console.error('查询AquaCrop模型任务出错:', error);
+    }
+}
+
 /** 处理"生成今日决策"按钮点击 */
 async function handleMakeDecision(buttonElement) {
     const statusElement = document.getElementById('make-decision-status');
@@ -734,10 +772,25 @@ async function handleMakeDecision(buttonElement) {
 
     try {
         // 调用make_decision API生成灌溉决策
-        const url = currentFieldId ? `/make_decision?field_id=${currentFieldId}` : '/make_decision';
-        const result = await fetchData(url, { method: 'POST' }, buttonElement);
+        const url = currentFieldId ? `/make_decision?field_id=${currentFieldId}&async=1` : '/make_decision?async=1';
+        let result = await fetchData(url, { method: 'POST' }, buttonElement);
         console.log('生成灌溉决策响应:', result);
 
+        // 决策以后台任务执行，轮询任务状态直到完成
+        if (result && result.status === 'accepted' && result.job_id) {
+            if (buttonElement) buttonElement.disabled = true;
+            try {
+                const job = await waitForJob(result.job_id, (job) => {
+                    statusElement.textContent = `正在生成决策... ${job.progress}%`;
+                });
+                result = job.status === 'succeeded'
+                    ? { status: 'success' }
+                    : { status: 'error', message: job.error || '决策任务失败' };
+            } finally {
+                if (buttonElement) buttonElement.disabled = false;
+            }
+        }
+
         if (result && result.status === 'success') {
             showToast('灌溉决策已生成，正在更新展示...', 'success');
             statusElement.textContent = '决策生成成功!';
@@ -927,6 +980,7 @@ document.addEventListener('DOMContentLoaded', () => {
         updateHistoryChart();
     });
     updateETChart();
+    watchCanopyCoverJob();
 
     // 绑定刷新按钮事件
     document.getElementById('refresh-soil-data')?.addEventListener('click', (e) => updateSoilCard(e.currentTarget));
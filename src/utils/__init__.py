@@ -1,6 +1,7 @@
 """工具模块"""
 
 from .logger import logger
+from .file_lock import FileLock, get_file_lock
 
 from .email_sender import EmailSender
 from .auth import token_required, api_key_required
@@ -8,6 +9,8 @@ from .validators import validate_irrigation_request
 
 __all__ = [
     'logger',
+    'FileLock',
+    'get_file_lock',
     'EmailSender',
     'token_required',
     'api_key_required',
@@ -0,0 +1,122 @@
+"""
+跨进程文件锁
+后台刷新线程、模型任务线程、请求内联运行与独立刷新进程(refresh_models.py)写同一批模型输出文件,
+进程内的threading.Lock无法互斥其他进程,使用锁文件上的系统锁(POSIX flock / Windows msvcrt.locking):
+- 同一线程可重入,嵌套获取同一把锁不会死锁
+- 进程退出时系统自动释放锁,不会留下失效的锁
+主要组件:
+- FileLock: 锁文件上的互斥锁
+- get_file_lock: 按路径获取进程内共享的FileLock实例
+"""
+import os
+import time
+import threading
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+class FileLock:
+    """基于锁文件的跨进程互斥锁(同一线程可重入)"""
+
+    def __init__(self, path, timeout=None, poll_interval=0.1):
+        """
+        参数:
+            path: 锁文件路径,所在目录不存在时自动创建
+            timeout: 获取锁的最长等待时间(秒),None表示一直等待
+            poll_interval: 等待时的轮询间隔(秒)
+        """
+        self.path = os.path.abspath(path)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+
+    @staticmethod
+    def _try_lock(fd):
+        try:
+            if os.name == 'nt':
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _unlock(fd):
+        if os.name == 'nt':
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    @property
+    def held(self):
+        """当前线程是否持有该锁"""
+        return getattr(self._local, 'depth', 0) > 0
+
+    def acquire(self, timeout=None):
+        """获取锁,超时抛出TimeoutError
+
+        参数:
+            timeout: 本次等待时间(秒),默认使用构造时的timeout
+        """
+        depth = getattr(self._local, 'depth', 0)
+        if depth:
+            self._local.depth = depth + 1
+            return True
+        timeout = self.timeout if timeout is None else timeout
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        start = time.monotonic()
+        while not self._try_lock(fd):
+            if timeout is not None and time.monotonic() - start >= timeout:
+                os.close(fd)
+                raise TimeoutError(f"等待文件锁超时({timeout}秒): {self.path}")
+            time.sleep(self.poll_interval)
+        self._local.fd = fd
+        self._local.depth = 1
+        return True
+
+    def release(self):
+        """释放锁,嵌套获取时只减少计数"""
+        depth = getattr(self._local, 'depth', 0)
+        if not depth:
+            raise RuntimeError(f"当前线程未持有文件锁: {self.path}")
+        if depth > 1:
+            self._local.depth = depth - 1
+            return
+        fd = self._local.fd
+        self._local.fd = None
+        self._local.depth = 0
+        try:
+            self._unlock(fd)
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.release()
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+def get_file_lock(path, timeout=None):
+    """按路径获取进程内共享的FileLock实例,同一路径的嵌套获取才能识别为重入
+
+    参数:
+        path: 锁文件路径
+        timeout: 首次创建时使用的等待时间(秒)
+    返回:
+        FileLock: 文件锁实例
+    """
+    path = os.path.abspath(path)
+    with _locks_lock:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = FileLock(path, timeout=timeout)
+        return lock
@@ -0,0 +1,93 @@
+"""
+SensorDataCache 失效测试
+失效时正在进行的拉取(未命中的同步拉取与过期后的后台刷新)结果不能写回缓存
+"""
+import os
+import sys
+import time
+import threading
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.devices.sensor_cache import SensorDataCache
+
+
+class BlockingLoader:
+    """每次拉取返回递增的版本号,block为True时阻塞到release被设置为止"""
+
+    def __init__(self):
+        self.version = 0
+        self.block = False
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, device_id, field_id):
+        self.version += 1
+        version = self.version
+        if self.block:
+            self.started.set()
+            assert self.release.wait(5)
+        return {'version': version, 'is_real_data': True}
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_invalidate_discards_inflight_miss():
+    loader = BlockingLoader()
+    loader.block = True
+    cache = SensorDataCache(loader)
+    results = {}
+    thread = threading.Thread(target=lambda: results.setdefault('first', cache.get('d1', 'f1')))
+    thread.start()
+    assert loader.started.wait(5)
+
+    cache.invalidate(field_id='f1')
+    loader.release.set()
+    thread.join(5)
+
+    # 等待方仍拿到本次拉取的结果,但失效前发起的拉取不写回缓存
+    assert results['first']['version'] == 1
+    loader.block = False
+    assert cache.get('d1', 'f1')['version'] == 2
+
+
+def test_invalidate_discards_inflight_background_refresh():
+    loader = BlockingLoader()
+    cache = SensorDataCache(loader, ttl=0.05, stale_ttl=60)
+    assert cache.get('d1', 'f1')['version'] == 1
+    time.sleep(0.06)
+
+    loader.block = True
+    # 过期后先返回旧值并触发后台刷新
+    assert cache.get('d1', 'f1')['version'] == 1
+    assert loader.started.wait(5)
+    assert cache.invalidate(field_id='f1') == 1
+    loader.release.set()
+    wait_until(lambda: not cache._inflight)
+
+    assert cache.get_stats()['size'] == 0
+    loader.block = False
+    assert cache.get('d1', 'f1')['version'] == 3
+
+
+def test_invalidate_keeps_inflight_load_for_other_field():
+    loader = BlockingLoader()
+    loader.block = True
+    cache = SensorDataCache(loader)
+    thread = threading.Thread(target=cache.get, args=('d1', 'f1'))
+    thread.start()
+    assert loader.started.wait(5)
+
+    cache.invalidate(field_id='f2')
+    loader.release.set()
+    thread.join(5)
+
+    loader.block = False
+    assert cache.get('d1', 'f1')['version'] == 1
+    assert cache.get_stats()['hits'] == 1
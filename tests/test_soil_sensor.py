@@ -0,0 +1,100 @@
+"""
+APIClient 在途请求合并测试
+同步 make_request 与异步 make_request_async 共用在途请求表,相同请求只向上游发起一次;
+异步调用在线程池中执行HTTP请求时仍能记录到当前请求的上游调用统计
+"""
+import os
+import sys
+import asyncio
+import threading
+
+import pytest
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.devices import soil_sensor
+from src.devices.soil_sensor import APIClient
+
+ENDPOINT = 'zlapi/irrigationApi/v2/getSoilLast'
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def record_upstream_call(self, endpoint):
+        self.calls.append(endpoint)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """上游请求阻塞到release被设置为止,记录实际发起的请求次数"""
+    client = APIClient(base_url='http://sensor.test', api_key='test-key')
+    client.started = threading.Event()
+    client.release = threading.Event()
+    client.posts = []
+
+    def post(url, headers=None, data=None, timeout=None):
+        client.posts.append(dict(data))
+        client.started.set()
+        assert client.release.wait(5)
+        return FakeResponse({'code': 200, 'data': {'deviceId': data.get('deviceId')}})
+
+    monkeypatch.setattr(client.session, 'post', post)
+    return client
+
+
+def test_async_call_joins_inflight_sync_request(client):
+    results = {}
+    thread = threading.Thread(target=lambda: results.setdefault(
+        'sync', client.make_request(ENDPOINT, {'deviceId': 'd1'})))
+    thread.start()
+    assert client.started.wait(5)
+
+    async def follower():
+        task = asyncio.ensure_future(client.make_request_async(ENDPOINT, {'deviceId': 'd1'}))
+        await asyncio.sleep(0.05)
+        client.release.set()
+        return await task
+
+    results['async'] = asyncio.run(follower())
+    thread.join(5)
+
+    assert len(client.posts) == 1
+    assert results['async'] == results['sync'] == {'code': 200, 'data': {'deviceId': 'd1'}}
+    assert client.get_latency_stats()[ENDPOINT.lstrip('/')]['coalesced'] == 1
+
+
+def test_sync_call_joins_inflight_async_request(client):
+    results = {}
+    recorder = Recorder()
+
+    async def leader():
+        soil_sensor._upstream_recorder.set(recorder)
+        return await client.make_request_async(ENDPOINT, {'deviceId': 'd2'})
+
+    def follower():
+        assert client.started.wait(5)
+        results['sync'] = client.make_request(ENDPOINT, {'deviceId': 'd2'})
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    threading.Timer(0.1, client.release.set).start()
+    results['async'] = asyncio.run(leader())
+    thread.join(5)
+
+    assert len(client.posts) == 1
+    assert results['sync'] == results['async'] == {'code': 200, 'data': {'deviceId': 'd2'}}
+    # 线程池中的HTTP请求在调用方上下文的副本中执行,上游调用记录到发起异步调用的请求
+    assert recorder.calls == [ENDPOINT]
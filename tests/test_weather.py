@@ -0,0 +1,102 @@
+"""
+WeatherET.customload 回归测试
+批量构建wdata并向量化计算ETref的实现与旧版逐行写入、逐日调用pyfao56 compute_etref的实现
+保存的.wth内容一致(时间戳行除外)
+基准测试默认跳过,设置环境变量 RUN_BENCHMARK=1 后运行:
+    RUN_BENCHMARK=1 python -m pytest -q -s tests/test_weather.py -k benchmark
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.models.weather import WeatherET, WDATA_COLUMNS
+
+WEATHER_FILE = os.path.join(project_root, 'data', 'weather', 'irrigation_weather.csv')
+
+
+def legacy_customload_wdata(weather_et, df):
+    """旧版实现:逐行写入wdata并逐日计算ETref"""
+    for _, row in df.iterrows():
+        date_value = row['Date']
+        if pd.isna(date_value):
+            continue
+        index = f"{date_value.year:04d}-{date_value.timetuple().tm_yday:03d}"
+        weather_et.weather.wdata.loc[index] = [row[col] for col in WDATA_COLUMNS]
+        if pd.isna(weather_et.weather.wdata.loc[index, 'ETref']):
+            weather_et.weather.wdata.loc[index, 'ETref'] = weather_et.weather.compute_etref(index)
+
+
+def replay_seasons(seasons):
+    """将单季天气数据按年平移复制为多季数据"""
+    base = pd.read_csv(WEATHER_FILE)
+    base['Date'] = pd.to_datetime(base['Date'], format='%Y-%j', errors='coerce')
+    frames = []
+    for offset in range(seasons - 1, -1, -1):
+        season = base.copy()
+        season['Date'] = season['Date'] - pd.DateOffset(years=offset)
+        frames.append(season)
+    df = pd.concat(frames, ignore_index=True)
+    for col in ['Vapr', 'Tdew', 'ETref']:
+        if col not in df.columns:
+            df[col] = np.nan
+    if 'MorP' not in df.columns:
+        df['MorP'] = 'M'
+    return df
+
+
+@pytest.fixture(scope='module')
+def weather_frame():
+    """两季数据,覆盖跨年与闰年的年序日"""
+    return replay_seasons(2)
+
+
+def read_wth(path):
+    with open(path, 'r') as f:
+        return [line for line in f if not line.startswith('Timestamp:')]
+
+
+def test_customload_matches_row_wise_loader(weather_frame, tmp_path):
+    legacy = WeatherET(comment='regression')
+    legacy_customload_wdata(legacy, weather_frame)
+    bulk = WeatherET(comment='regression')
+    bulk.customload(weather_frame)
+
+    assert list(bulk.weather.wdata.index) == list(legacy.weather.wdata.index)
+    np.testing.assert_allclose(bulk.weather.wdata['ETref'].to_numpy(dtype=float),
+                               legacy.weather.wdata['ETref'].to_numpy(dtype=float), rtol=1e-12)
+
+    legacy.savefile(str(tmp_path / 'legacy.wth'))
+    bulk.savefile(str(tmp_path / 'bulk.wth'))
+    assert read_wth(tmp_path / 'bulk.wth') == read_wth(tmp_path / 'legacy.wth')
+
+
+@pytest.mark.skipif(os.getenv('RUN_BENCHMARK') != '1', reason='设置 RUN_BENCHMARK=1 运行基准测试')
+def test_customload_benchmark(tmp_path):
+    """五季数据上对比逐行加载与批量加载的耗时(各取三次中最快一次)"""
+    df = replay_seasons(5)
+
+    def best_of(loader, repeat=3):
+        best, weather_et = float('inf'), None
+        for _ in range(repeat):
+            weather_et = WeatherET(comment='benchmark')
+            start = time.perf_counter()
+            loader(weather_et)
+            best = min(best, time.perf_counter() - start)
+        return best, weather_et
+
+    legacy_time, legacy = best_of(lambda w: legacy_customload_wdata(w, df))
+    bulk_time, bulk = best_of(lambda w: w.customload(df))
+    print(f"\nWeatherET.customload {len(df)}行: 逐行 {legacy_time:.3f}s, 批量 {bulk_time:.3f}s, "
+          f"加速 {legacy_time / bulk_time:.1f}x")
+
+    legacy.savefile(str(tmp_path / 'legacy.wth'))
+    bulk.savefile(str(tmp_path / 'bulk.wth'))
+    assert read_wth(tmp_path / 'bulk.wth') == read_wth(tmp_path / 'legacy.wth')
+    assert bulk_time < legacy_time
@@ -0,0 +1,118 @@
+"""
+weather_api 历史数据筛选与日均值日期索引的回归测试
+向量化的 after_forecast_mask / climatology_index 与逐行的 is_after_forecast / add_year
+在 data/weather/weather_history_data.csv 上对固定的当前日期输出一致
+"""
+import os
+import sys
+import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.models import weather_api
+
+HISTORY_FILE = os.path.join(project_root, 'data', 'weather', 'weather_history_data.csv')
+
+# 覆盖生长季内外两个分支、跨越2月29日的预报期、闰年与非闰年第二年,以及筛选结果为空的日期
+NOW_DATES = [
+    datetime.datetime(2023, 12, 1, 8, 0),
+    datetime.datetime(2024, 2, 20, 8, 0),
+    datetime.datetime(2024, 2, 29, 8, 0),
+    datetime.datetime(2024, 12, 31, 8, 0),
+    datetime.datetime(2025, 1, 15, 8, 0),
+    datetime.datetime(2025, 2, 20, 8, 0),
+    datetime.datetime(2025, 6, 10, 8, 0),
+    datetime.datetime(2025, 9, 1, 8, 0),
+    datetime.datetime(2025, 11, 20, 8, 0),
+]
+EMPTY_NOW_DATES = [datetime.datetime(2025, 6, 10, 8, 0), datetime.datetime(2025, 9, 1, 8, 0)]
+
+
+@pytest.fixture(scope='module')
+def history():
+    data = pd.read_csv(HISTORY_FILE)
+    data['datetime'] = pd.to_datetime(data['datetime'])
+    # 历史文件中没有2月29日,补两行以覆盖闰日的处理
+    leap_days = data[data['datetime'].dt.strftime('%m-%d') == '02-28'].head(2).copy()
+    leap_days['datetime'] = pd.to_datetime(['2024-02-29', '2020-02-29'][:len(leap_days)])
+    return pd.concat([data, leap_days], ignore_index=True)
+
+
+def freeze_now(monkeypatch, now):
+    """让 weather_api 中的 datetime.datetime.now() 返回固定时间"""
+    class FrozenDatetime(datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+
+    monkeypatch.setattr(weather_api, 'datetime', SimpleNamespace(
+        datetime=FrozenDatetime, timedelta=datetime.timedelta, date=datetime.date))
+
+
+def season_years(now):
+    start_month = weather_api.config.WEATHER_CONFIG.get('wheat_season_start_month', 8)
+    first_year = now.year if now.month >= start_month else now.year - 1
+    return first_year, first_year + 1
+
+
+def daily_average(filtered):
+    return filtered.groupby([filtered['datetime'].dt.month,
+                             filtered['datetime'].dt.day]).mean(numeric_only=True)
+
+
+@pytest.mark.parametrize('now', NOW_DATES, ids=lambda now: now.strftime('%Y-%m-%d'))
+def test_after_forecast_mask_matches_row_wise(monkeypatch, history, now):
+    freeze_now(monkeypatch, now)
+    for second_year in sorted({season_years(now)[1], 2024, 2025}):
+        expected = history.apply(weather_api.is_after_forecast, axis=1, args=(second_year,)).to_numpy(dtype=bool)
+        actual = weather_api.after_forecast_mask(history['datetime'], second_year, now=now)
+        np.testing.assert_array_equal(actual, expected)
+        # 未传入now时使用系统时间(此处为固定时间)
+        np.testing.assert_array_equal(weather_api.after_forecast_mask(history['datetime'], second_year), expected)
+
+
+@pytest.mark.parametrize('now', NOW_DATES, ids=lambda now: now.strftime('%Y-%m-%d'))
+def test_climatology_index_matches_add_year(monkeypatch, history, now):
+    freeze_now(monkeypatch, now)
+    first_year, second_year = season_years(now)
+    filtered = history[weather_api.after_forecast_mask(history['datetime'], second_year, now=now)]
+
+    expected = daily_average(filtered)
+    expected['datetime'] = expected.index
+    expected = expected.apply(weather_api.add_year, axis=1, args=(first_year, second_year))
+    expected = expected.set_index('datetime', drop=True).sort_values(by='datetime')
+
+    actual = daily_average(filtered)
+    actual.index = weather_api.climatology_index(actual.index.get_level_values(0),
+                                                 actual.index.get_level_values(1), first_year, second_year)
+    actual = actual.sort_values(by='datetime')
+
+    if expected.empty:
+        # 逐行版本在空结果上得到object类型的索引,只比较列与行数
+        assert actual.empty
+        assert list(actual.columns) == list(expected.columns)
+        assert isinstance(actual.index, pd.DatetimeIndex)
+    else:
+        pd.testing.assert_frame_equal(actual, expected, check_freq=False)
+
+
+@pytest.mark.parametrize('now', EMPTY_NOW_DATES, ids=lambda now: now.strftime('%Y-%m-%d'))
+def test_after_forecast_mask_empty_filter(monkeypatch, history, now):
+    freeze_now(monkeypatch, now)
+    second_year = season_years(now)[1]
+    mask = weather_api.after_forecast_mask(history['datetime'], second_year, now=now)
+    assert not mask.any()
+    assert not history.apply(weather_api.is_after_forecast, axis=1, args=(second_year,)).any()
+
+
+def test_leap_day_dropped_for_non_leap_second_year(history):
+    leap_day = history['datetime'] == pd.Timestamp('2024-02-29')
+    now = datetime.datetime(2025, 2, 1, 8, 0)
+    assert not weather_api.after_forecast_mask(history['datetime'], 2025, now=now)[leap_day.to_numpy()].any()
+    assert weather_api.after_forecast_mask(history['datetime'], 2024, now=now)[leap_day.to_numpy()].all()